@@ -0,0 +1,88 @@
+"""Per-query cost of the nutrition classifier over a synthetic query corpus.
+
+Usage: python -m benchmarks.bench_classifier [--queries 100000]
+
+Compares the compiled matcher with the old approach (three linear substring
+scans over the keyword list), then grows the keyword list with synthetic terms
+to show the compiled matcher's cost does not depend on the number of keywords.
+"""
+import argparse
+import json
+import random
+import string
+import time
+from pathlib import Path
+
+from nutrition_classifier import NutritionClassifier
+
+TRANSLATIONS = json.loads((Path(__file__).resolve().parent.parent / "translations.json").read_text(encoding="utf-8"))
+
+TEMPLATES = [
+    "How much {kw} should I get every day?",
+    "tell me something about {kw} and {kw2}",
+    "Quelle quantité de {kw} dois-je manger ?",
+    "my neighbour keeps talking about {kw2} at the football match",
+    "Please write a poem about the ocean and the {kw2}",
+    "is {kw} better than {kw2} for breakfast",
+]
+FILLER = ["ocean", "weather", "football", "music", "holiday", "guitar", "movie", "train", "paris", "laptop"]
+
+
+def build_corpus(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    keywords = TRANSLATIONS["en"]["classifier"]["keywords"] + TRANSLATIONS["fr"]["classifier"]["keywords"]
+    return [
+        rng.choice(TEMPLATES).format(kw=rng.choice(keywords + FILLER), kw2=rng.choice(FILLER))
+        for _ in range(size)
+    ]
+
+
+def linear_scan(terms):
+    keywords = terms["keywords"]
+    question_words = terms["question_words"]
+    adjectives = terms["health_adjectives"]
+
+    def classify(query):
+        query_lower = query.lower()
+        return (any(k in query_lower for k in keywords)
+                or any(query_lower.startswith(q) for q in question_words)
+                or any(a in query_lower for a in adjectives))
+
+    return classify
+
+
+def synthetic_terms(count: int, seed: int = 11):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12))) for _ in range(count)]
+
+
+def per_query_us(classify, corpus) -> float:
+    start = time.perf_counter()
+    for query in corpus:
+        classify(query)
+    return (time.perf_counter() - start) / len(corpus) * 1e6
+
+
+def main(args):
+    corpus = build_corpus(args.queries)
+    terms = {rule: TRANSLATIONS["en"]["classifier"][rule] + TRANSLATIONS["fr"]["classifier"][rule]
+             for rule in ("question_words", "keywords", "health_adjectives")}
+    print(f"{len(corpus)} queries")
+    print(f"{'keywords':>9} {'linear us/query':>16} {'compiled us/query':>18}")
+    for extra in args.extra_keywords:
+        grown = dict(terms, keywords=terms["keywords"] + synthetic_terms(extra))
+        build_start = time.perf_counter()
+        classifier = NutritionClassifier(**grown)
+        build_ms = (time.perf_counter() - build_start) * 1e3
+        linear = per_query_us(linear_scan(grown), corpus[:args.linear_sample])
+        compiled = per_query_us(classifier.classify, corpus)
+        print(f"{len(grown['keywords']):>9} {linear:>16.2f} {compiled:>18.2f}   (compiled in {build_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=100000)
+    parser.add_argument("--linear-sample", type=int, default=10000,
+                        help="queries timed with the slow linear scan")
+    parser.add_argument("--extra-keywords", type=int, nargs="+", default=[0, 1000, 10000])
+    main(parser.parse_args())
@@ -0,0 +1,72 @@
+"""Single-flight coalescing of identical concurrent completions.
+
+Usage: python -m benchmarks.bench_coalescing [--sessions 100] [--unique 0.2]
+
+Simulates a burst of sessions clicking the same quick action: a fraction
+``--unique`` send a distinct prompt, the rest an identical one. The mock
+server counts upstream requests; the run is repeated with coalescing off and
+every reply is checked to be complete.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+from benchmarks.mock_openai import DEFAULT_REPLY, MockServer
+from llm_client import CompletionBackend
+
+QUICK_ACTION = [{"role": "user", "content": "Can you suggest a healthy meal plan for today?"}]
+
+
+async def burst(backend: CompletionBackend, sessions: int, unique: float, stream: bool):
+    latencies = []
+    replies = []
+    unique_sessions = int(sessions * unique)
+
+    async def session(i: int):
+        messages = QUICK_ACTION if i >= unique_sessions else [{"role": "user", "content": f"Question {i}"}]
+        start = time.perf_counter()
+        if stream:
+            reply = "".join([delta async for delta in backend.stream(messages=messages, model="gpt-3.5-turbo",
+                                                                    max_tokens=500)])
+        else:
+            reply = await backend.complete(messages=messages, model="gpt-3.5-turbo", max_tokens=500)
+        latencies.append(time.perf_counter() - start)
+        replies.append(reply)
+
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    return latencies, replies
+
+
+async def main(args):
+    with MockServer(port=args.port, latency=args.latency, token_delay=args.token_delay) as server:
+        print(f"{args.sessions} concurrent sessions, {args.unique:.0%} unique prompts")
+        print(f"{'mode':<22} {'upstream':>9} {'dedup':>7} {'p50 ms':>8} {'p95 ms':>8} {'complete':>9}")
+        for stream in (True, False):
+            for coalesce in (False, True):
+                backend = CompletionBackend(base_url=server.base_url, coalesce=coalesce)
+                server.app.state.requests = 0
+                latencies, replies = await burst(backend, args.sessions, args.unique, stream)
+                await backend.aclose()
+                summary = backend.coalescing_summary()
+                ordered = sorted(latencies)
+                name = f"{'stream' if stream else 'complete'}, {'coalesced' if coalesce else 'direct'}"
+                complete = sum(reply == DEFAULT_REPLY for reply in replies)
+                print(f"{name:<22} {server.app.state.requests:>9} {summary['dedup_ratio']:>7.1%} "
+                      f"{statistics.median(latencies) * 1e3:>8.1f} {ordered[int(0.95 * len(ordered))] * 1e3:>8.1f} "
+                      f"{complete:>5}/{len(replies)}")
+                if complete != len(replies):
+                    raise SystemExit("some callers received a truncated reply")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--unique", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--port", type=int, default=8001)
+    asyncio.run(main(parser.parse_args()))
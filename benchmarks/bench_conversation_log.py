@@ -0,0 +1,99 @@
+"""Append and load latency of the conversation log as one conversation grows.
+
+Usage: python -m benchmarks.bench_conversation_log [--turns 1000,10000,50000] [--window 20]
+
+Appends alternating user/assistant turns of realistic length to a single
+conversation and, each time it reaches a size in ``--turns``, measures:
+
+- append latency (p50/p99 over the appends since the previous size)
+- loading the prompt window (``load`` with the last ``--window`` turns)
+- reading the whole conversation back (``export``)
+- the same window read from a JSON-lines file holding the same turns, which
+  appends as cheaply but has to scan the file to find the last turns
+
+Then compacts the log down to ``--keep`` turns and reports the time taken.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import deque
+
+from conversation_log import ConversationLog
+from metrics import percentile
+
+WORDS = ("protein fiber breakfast lentils oats vegetables calories hydration snack dinner yogurt salmon quinoa "
+         "almonds spinach energy balance portion").split()
+
+
+def turn_text(rng: random.Random, role: str) -> str:
+    return " ".join(rng.choices(WORDS, k=12 if role == "user" else 120))
+
+
+def timed(function, repeat: int = 5) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def jsonl_window(path: str, window: int):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in deque(f, maxlen=window)]
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "conversations.db")
+        jsonl_path = os.path.join(directory, "conversation.jsonl")
+        # Compaction off while growing, so every size is measured in full
+        log = ConversationLog(db_path, max_turns=0)
+        print(f"{'turns':>8} {'append p50':>11} {'append p99':>11} {'window':>9} {'export':>10} "
+              f"{'jsonl window':>13} {'db size':>9}")
+        appends = []
+        count = 0
+        with open(jsonl_path, "a", encoding="utf-8") as jsonl:
+            for size in args.turns:
+                while count < size:
+                    role = "user" if count % 2 == 0 else "assistant"
+                    content = turn_text(rng, role)
+                    start = time.perf_counter()
+                    log.append("user-1", role, content)
+                    appends.append(time.perf_counter() - start)
+                    jsonl.write(json.dumps({"role": role, "content": content}) + "\n")
+                    count += 1
+                jsonl.flush()
+                window = timed(lambda: log.load("user-1", args.window))
+                export = timed(lambda: list(log.export("user-1")), repeat=1)
+                jsonl_read = timed(lambda: jsonl_window(jsonl_path, args.window), repeat=3)
+                size_mb = sum(os.path.getsize(db_path + suffix) for suffix in ("", "-wal")
+                              if os.path.exists(db_path + suffix)) / 1e6
+                print(f"{size:>8,} {percentile(appends, 0.5) * 1e6:>9.0f}µs {percentile(appends, 0.99) * 1e6:>9.0f}µs "
+                      f"{window * 1e3:>7.2f}ms {export * 1e3:>8.1f}ms {jsonl_read * 1e3:>11.1f}ms {size_mb:>7.1f}MB")
+                appends = []
+
+        log.max_turns = args.keep
+        start = time.perf_counter()
+        deleted = log.compact()
+        print(f"\ncompaction to the newest {args.keep:,} turns: {deleted:,} deleted in "
+              f"{(time.perf_counter() - start) * 1e3:.1f} ms; window load then "
+              f"{timed(lambda: log.load('user-1', args.window)) * 1e3:.2f} ms")
+
+
+def int_list(text: str):
+    return [int(part) for part in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int_list, default=[1000, 10000, 50000])
+    parser.add_argument("--window", type=int, default=20, help="turns loaded for the prompt")
+    parser.add_argument("--keep", type=int, default=10000, help="turns kept by the final compaction")
+    parser.add_argument("--seed", type=int, default=5)
+    main(parser.parse_args())
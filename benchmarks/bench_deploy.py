@@ -0,0 +1,165 @@
+"""Hub requests and commits made by ``upload_to_hf.py`` against a local fake Hub API.
+
+Usage: python -m benchmarks.bench_deploy [--port 8005] [--failures 2]
+
+Copies the deployed files to a temporary directory and deploys them to an
+in-process fake of the Hub endpoints a commit uses (preupload, README
+validation, commit, file download), which counts requests per endpoint.
+Scenarios, run in order against the same fake Space:
+
+- ``legacy``: one ``upload_file`` commit per file, as before the manifest
+- ``first``: first deploy, every file in one commit
+- ``unchanged``: a redeploy with nothing changed
+- ``one_change``: a redeploy after editing one file
+- ``dry_run``: a dry run after editing another file
+- ``flaky``: that deploy while the first ``--failures`` commit requests fail with 503
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+REPO_ID = "nutribot/fake-space"
+
+
+def git_blob_oid(content: bytes) -> str:
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def create_hub() -> FastAPI:
+    app = FastAPI()
+    app.state.files = {}
+    app.state.commits = 0
+    app.state.requests = Counter()
+    app.state.fail_commits = 0
+
+    @app.middleware("http")
+    async def count(request: Request, call_next):
+        path = request.url.path
+        endpoint = "resolve" if "/resolve/" in path else "validate-yaml" if path.endswith("/validate-yaml") else \
+            path.rsplit("/", 2)[-2]
+        app.state.requests[endpoint] += 1
+        return await call_next(request)
+
+    @app.get("/spaces/{namespace}/{name}/resolve/{revision}/{path:path}")
+    async def resolve(namespace: str, name: str, revision: str, path: str):
+        if path not in app.state.files:
+            return JSONResponse({"error": "Entry not found"}, status_code=404, headers={"X-Error-Code": "EntryNotFound"})
+        return Response(app.state.files[path])
+
+    @app.post("/api/validate-yaml")
+    async def validate_yaml():
+        return {}
+
+    @app.post("/api/spaces/{namespace}/{name}/preupload/{revision}")
+    async def preupload(namespace: str, name: str, revision: str, request: Request):
+        files = (await request.json())["files"]
+        return {"files": [{"path": file["path"], "uploadMode": "regular", "shouldIgnore": False,
+                           "oid": git_blob_oid(app.state.files[file["path"]]) if file["path"] in app.state.files
+                           else None} for file in files]}
+
+    @app.post("/api/spaces/{namespace}/{name}/commit/{revision}")
+    async def commit(namespace: str, name: str, revision: str, request: Request):
+        if app.state.fail_commits:
+            app.state.fail_commits -= 1
+            return JSONResponse({"error": "Service unavailable"}, status_code=503)
+        for line in (await request.body()).splitlines():
+            item = json.loads(line)
+            if item["key"] == "file":
+                app.state.files[item["value"]["path"]] = base64.b64decode(item["value"]["content"])
+        app.state.commits += 1
+        oid = f"{app.state.commits:040x}"
+        # huggingface_hub parses commit URLs as huggingface.co ones
+        return {"commitUrl": f"https://huggingface.co/spaces/{namespace}/{name}/commit/{oid}", "commitOid": oid}
+
+    return app
+
+
+class FakeHub:
+    """Runs the fake Hub on a background thread for the duration of a ``with`` block."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8005):
+        self.app = create_hub()
+        self.endpoint = f"http://{host}:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
+
+
+def main(args):
+    from huggingface_hub import HfApi
+
+    from resilience import RetryPolicy
+    import upload_to_hf
+
+    root = tempfile.mkdtemp()
+    try:
+        for path in upload_to_hf.FILES_TO_UPLOAD:
+            if os.path.exists(path):
+                os.makedirs(os.path.join(root, os.path.dirname(path)), exist_ok=True)
+                shutil.copyfile(path, os.path.join(root, path))
+        files = [path for path in upload_to_hf.FILES_TO_UPLOAD if os.path.exists(os.path.join(root, path))]
+        retry_policy = RetryPolicy(max_attempts=upload_to_hf.DEPLOY_MAX_ATTEMPTS, base_delay=0.05)
+
+        def edit(path):
+            with open(os.path.join(root, path), "a") as file:
+                file.write("\n")
+
+        print(f"{len(files)} files; {args.failures} failing commit requests in the flaky scenario")
+        print(f"{'scenario':<11} {'uploaded':>8} {'commits':>8} {'requests':>9}  by endpoint")
+        with FakeHub(port=args.port) as hub:
+            api = HfApi(endpoint=hub.endpoint, token="hf_fake")
+            for name in ["legacy", "first", "unchanged", "one_change", "dry_run", "flaky"]:
+                if name == "first":
+                    # Start from an empty Space so the first deploy has no manifest
+                    hub.app.state.files.clear()
+                elif name == "one_change":
+                    edit("prompts.py")
+                elif name == "dry_run":
+                    edit("i18n.py")
+                elif name == "flaky":
+                    hub.app.state.fail_commits = args.failures
+                hub.app.state.requests.clear()
+                commits = hub.app.state.commits
+                if name == "legacy":
+                    for path in files:
+                        api.upload_file(path_or_fileobj=os.path.join(root, path), path_in_repo=path,
+                                        repo_id=REPO_ID, repo_type="space")
+                    uploaded = len(files)
+                else:
+                    uploaded = len(upload_to_hf.deploy(api, REPO_ID, files, root, dry_run=name == "dry_run",
+                                                       retry_policy=retry_policy).changed)
+                requests = hub.app.state.requests
+                print(f"{name:<11} {uploaded:>8} {hub.app.state.commits - commits:>8} {sum(requests.values()):>9}  "
+                      f"{dict(requests)}")
+            deployed = json.loads(hub.app.state.files[upload_to_hf.MANIFEST_PATH])["files"]
+            stale = [path for path in files if deployed[path] != upload_to_hf.file_sha256(os.path.join(root, path))]
+            print(f"manifest matches the local files: {not stale}")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8005)
+    parser.add_argument("--failures", type=int, default=2, help="commit requests failing with 503 when flaky")
+    main(parser.parse_args())
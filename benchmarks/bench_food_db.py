@@ -0,0 +1,95 @@
+"""Lookup latency and memory of the food-composition store.
+
+Usage: python -m benchmarks.bench_food_db [--rows 100000]
+
+Measures the bundled table, then a synthetic table of ``--rows`` foods (the
+order of magnitude of a USDA FoodData Central export) built from the bundled
+names with generated variants. Memory is what the store allocates, measured with
+tracemalloc.
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+
+from food_db import NUTRIENTS, FoodTable
+
+QUERIES = ["lentils", "chicken breast", "oeufs", "brocolli", "greek yogurt", "pommes de terre", "salmom"]
+TEXTS = ["How much protein is in lentils and chickpeas?", "Is oatmeal with blueberries a healthy breakfast?",
+         "Combien de calories dans une banane ?"]
+VARIANTS = ["raw", "cooked", "frozen", "canned", "dried", "organic", "roasted", "steamed", "boiled", "fried"]
+
+
+def load_measured(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    table = build()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return table, seconds, current, peak
+
+
+def synthetic(base: FoodTable, rows: int, seed: int = 5) -> FoodTable:
+    rng = random.Random(seed)
+    names, names_fr, aliases, diets = [], [], [], []
+    for i in range(rows):
+        row = i % len(base)
+        variant = f"{rng.choice(VARIANTS)} {i // len(base)}"
+        names.append(f"{base.names[row].split(',')[0]}, {variant}")
+        names_fr.append(f"{base.names_fr[row].split(',')[0]}, {variant}")
+        aliases.append([])
+        diets.append(base.diets[row])
+    noise = np.random.default_rng(seed).uniform(0.8, 1.2, (len(NUTRIENTS), rows)).astype(np.float32)
+    values = np.tile(base.values, (1, rows // len(base) + 1))[:, :rows] * noise
+    return FoodTable(names, names_fr, aliases, diets, np.zeros(rows, dtype=bool), values)
+
+
+def time_lookups(table: FoodTable, repeat: int):
+    rows = [table.exact(q) for q in QUERIES]
+    rows = [r for r in rows if r is not None] or [0]
+    operations = {
+        "nutrients (per 100 g)": lambda i: table.nutrients(rows[i % len(rows)]),
+        "exact name": lambda i: table.exact(QUERIES[i % len(QUERIES)]),
+        "prefix (complete)": lambda i: table.complete(QUERIES[i % len(QUERIES)][:4], limit=10),
+        "fuzzy": lambda i: table.fuzzy(QUERIES[i % len(QUERIES)]),
+        "mentions in text": lambda i: table.mentions(TEXTS[i % len(TEXTS)]),
+    }
+    results = {}
+    for name, operation in operations.items():
+        samples = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            operation(i)
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        results[name] = (statistics.median(samples) * 1e6, samples[int(0.99 * len(samples))] * 1e6)
+    return results
+
+
+def report(title, table, seconds, current, peak, repeat):
+    print(f"\n{title}: {len(table):,} foods, built in {seconds * 1e3:.0f} ms, "
+          f"{current / 2 ** 20:.1f} MiB resident ({peak / 2 ** 20:.1f} MiB peak), "
+          f"nutrient columns {table.values.nbytes / 2 ** 20:.2f} MiB")
+    print(f"{'operation':<24} {'p50 us':>9} {'p99 us':>9}")
+    for name, (p50, p99) in time_lookups(table, repeat).items():
+        print(f"{name:<24} {p50:>9.1f} {p99:>9.1f}")
+
+
+def main(args):
+    base, seconds, current, peak = load_measured(FoodTable.load)
+    report("bundled table", base, seconds, current, peak, args.repeat)
+    if args.rows:
+        table, seconds, current, peak = load_measured(lambda: synthetic(base, args.rows))
+        report("synthetic table", table, seconds, current, peak, args.repeat // 10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20000)
+    main(parser.parse_args())
@@ -0,0 +1,84 @@
+"""Per-profile NutritionBot calculations vs. the vectorized batch API.
+
+Usage: python -m benchmarks.bench_health_batch [--rows 1000000] [--object-rows 20000]
+
+Also checks that both paths agree on every metric for the timed sample.
+"""
+import argparse
+import io
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+from nutrition_bot import NutritionBot
+from health import ALIGNMENT_LEVELS, BMI_CATEGORIES, assess_batch, assess_csv
+
+
+def synthetic_cohort(rows: int, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    return {
+        "age": rng.integers(18, 80, rows).astype(float),
+        "weight": np.round(rng.uniform(45, 130, rows), 1),
+        "height": np.round(rng.uniform(150, 200, rows), 0),
+        "calories": rng.choice([1600, 2000, 2400, 3000], rows).astype(float),
+        "protein": rng.choice([60, 100, 150], rows).astype(float),
+        "water": rng.choice([1.5, 2.5, 3.5], rows),
+    }
+
+
+def per_object(cohort, rows: int):
+    bot = NutritionBot()
+    results = []
+    for i in range(rows):
+        bot.user_data = {}
+        bot.update_user_data("", cohort["age"][i], cohort["weight"][i], cohort["height"][i], [],
+                             cohort["calories"][i], cohort["protein"][i], cohort["water"][i])
+        results.append((bot.user_data["bmi"], bot._get_bmi_category(), bot._calculate_tdee(),
+                        bot._calculate_protein_needs(), bot._calculate_water_needs()))
+    return results
+
+
+def main(args):
+    cohort = synthetic_cohort(args.rows)
+
+    start = time.perf_counter()
+    objects = per_object(cohort, args.object_rows)
+    object_rate = args.object_rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batch = assess_batch(cohort["age"], cohort["weight"], cohort["height"],
+                         cohort["calories"], cohort["protein"], cohort["water"])
+    batch_rate = args.rows / (time.perf_counter() - start)
+
+    for i, (bmi, category, tdee, protein, water) in enumerate(objects):
+        assert batch["bmi"][i] == bmi and BMI_CATEGORIES[batch["bmi_category"][i]] == category
+        assert np.isclose(batch["tdee"][i], tdee) and np.isclose(batch["protein_needs"][i], protein)
+        assert np.isclose(batch["water_needs"][i], water)
+
+    csv_rows = min(args.rows, args.csv_rows)
+    source = io.StringIO()
+    source.write("age,weight,height,calorie_target,protein_target,water_target\n")
+    for i in range(csv_rows):
+        source.write(f"{cohort['age'][i]:.0f},{cohort['weight'][i]},{cohort['height'][i]:.0f},"
+                     f"{cohort['calories'][i]:.0f},{cohort['protein'][i]:.0f},{cohort['water'][i]}\n")
+    source.seek(0)
+    start = time.perf_counter()
+    assess_csv(source, io.StringIO(), chunk_size=100000)
+    csv_rate = csv_rows / (time.perf_counter() - start)
+
+    print(f"{'per-object (NutritionBot)':<28} {object_rate:>14,.0f} profiles/s")
+    print(f"{'assess_batch (NumPy)':<28} {batch_rate:>14,.0f} profiles/s  ({batch_rate / object_rate:.0f}x)")
+    print(f"{'assess_csv (CSV in/out)':<28} {csv_rate:>14,.0f} profiles/s")
+    levels = np.bincount(batch["calorie_alignment"], minlength=len(ALIGNMENT_LEVELS))
+    print("calorie target alignment:", dict(zip(ALIGNMENT_LEVELS, levels.tolist())))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--object-rows", type=int, default=20000)
+    parser.add_argument("--csv-rows", type=int, default=200000)
+    main(parser.parse_args())
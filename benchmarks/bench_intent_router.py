@@ -0,0 +1,82 @@
+"""Local fast path vs. LLM round trips on a mixed English/French workload.
+
+Usage: python -m benchmarks.bench_intent_router [--requests 400] [--latency 0.3]
+
+Replays a labelled mix of computable questions (TDEE, BMR, protein, water,
+BMI) and open-ended ones through NutritionBot.get_response against the mock
+server. Reports routing mistakes, the share of traffic served locally and the
+latency distribution of each path.
+"""
+import argparse
+import asyncio
+import os
+import random
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+from benchmarks.mock_openai import MockServer
+
+# (query, language, expected local intents)
+WORKLOAD = [
+    ("How many calories should I eat per day?", "en", ("calories",)),
+    ("What's my BMI?", "en", ("bmi",)),
+    ("What is my BMR?", "en", ("bmr",)),
+    ("How much water do I need?", "en", ("water",)),
+    ("How much protein should I eat daily?", "en", ("protein",)),
+    ("How much protein and water do I need?", "en", ("protein", "water")),
+    ("Based on my age, weight, and activity level, how many calories should I consume daily?", "en", ("calories",)),
+    ("Combien de calories dois-je manger par jour ?", "fr", ("calories",)),
+    ("Quel est mon IMC ?", "fr", ("bmi",)),
+    ("Combien d'eau dois-je boire ?", "fr", ("water",)),
+    ("Combien de protéines me faut-il par jour ?", "fr", ("protein",)),
+    ("How many calories are in a banana?", "en", ()),
+    ("How many calories should I eat to lose weight?", "en", ()),
+    ("What is BMI?", "en", ()),
+    ("How can I lower my BMI?", "en", ()),
+    ("Is oatmeal a healthy breakfast?", "en", ()),
+    ("What should I eat before a workout?", "en", ()),
+    ("Can you suggest some healthy meals that fit my dietary preferences and calorie goals?", "en", ()),
+    ("Combien de calories dans une pomme ?", "fr", ()),
+    ("Quels aliments sont riches en fer ?", "fr", ()),
+]
+
+
+async def replay(nutrition_bot, requests: int, seed: int):
+    rng = random.Random(seed)
+    bot = nutrition_bot.NutritionBot()
+    bot.update_user_data("Sam", 30, 70, 175, [], 2000, 120, 2.5)
+    for _ in range(requests):
+        query, lang, _ = rng.choice(WORKLOAD)
+        bot.set_language(lang)
+        async for _text in bot.get_response(query):
+            pass
+
+
+def main(args):
+    with MockServer(port=args.port, latency=args.latency, token_delay=0.0) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        import nutrition_bot
+
+        mistakes = [(query, expected, nutrition_bot.intent_router.route(query))
+                    for query, _, expected in WORKLOAD if nutrition_bot.intent_router.route(query) != expected]
+        asyncio.run(replay(nutrition_bot, args.requests, args.seed))
+
+    for query, expected, routed in mistakes:
+        print(f"misrouted: {query!r} expected {expected} got {routed}")
+    summary = nutrition_bot.route_stats.summary()
+    print(f"{args.requests} requests, {summary.get('local', {}).get('share', 0):.1%} served locally, "
+          f"{server.app.state.requests} upstream calls")
+    print(f"{'path':<10} {'share':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for path, stats in sorted(summary.items()):
+        print(f"{path:<10} {stats['share']:>7.1%} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+    if mistakes:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--port", type=int, default=8001)
+    main(parser.parse_args())
@@ -0,0 +1,83 @@
+"""Concurrent sessions toggling languages through the full Gradio app.
+
+Usage: python -m benchmarks.bench_language_sessions [--sessions 16] [--iterations 10]
+
+Each simulated browser session (its own gradio_client session) repeatedly
+switches language, clicks a quick action and sends a message, checking that the
+prompt and the reply prefix are in the language that session selected. Any
+mismatch is cross-talk between sessions. Latency per endpoint is reported.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+from gradio_client import Client
+
+from benchmarks.mock_openai import MockServer
+from metrics import percentile
+
+
+def run_session(url: str, iterations: int, seed: int, ui):
+    rng = random.Random(seed)
+    client = Client(url, verbose=False)
+    client.predict("Sam", 30, 70, 175, [], 2000, 120, 2.5, api_name="/update_profile")
+    latencies = {"update_language": [], "handle_quick_action": [], "respond": []}
+    mismatches = 0
+    for _ in range(iterations):
+        lang = rng.choice(["en", "fr"])
+        start = time.perf_counter()
+        client.predict(lang, api_name="/update_language")
+        latencies["update_language"].append(time.perf_counter() - start)
+
+        label, expected_prompt = rng.choice(list(ui.QUICK_ACTION_MAPS[lang].items()))
+        start = time.perf_counter()
+        prompt = client.predict(label, api_name="/handle_quick_action")
+        latencies["handle_quick_action"].append(time.perf_counter() - start)
+        mismatches += prompt != expected_prompt
+
+        start = time.perf_counter()
+        history = client.predict("Is oatmeal a healthy breakfast?", [], api_name="/respond")
+        latencies["respond"].append(time.perf_counter() - start)
+        mismatches += not history[-1]["content"].startswith(ui.get_text("bot.greeting_intro", lang))
+    return latencies, mismatches
+
+
+def main(args):
+    with MockServer(port=args.mock_port, latency=args.latency, token_delay=0.0) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        import app
+        import ui
+
+        app.demo.queue().launch(prevent_thread_lock=True, server_port=args.port, quiet=True)
+        url = f"http://127.0.0.1:{args.port}/"
+        try:
+            with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+                results = list(pool.map(lambda seed: run_session(url, args.iterations, seed, ui),
+                                        range(args.sessions)))
+        finally:
+            app.demo.close()
+
+    mismatches = sum(m for _, m in results)
+    print(f"{args.sessions} sessions x {args.iterations} language toggles")
+    print(f"{'endpoint':<22} {'p50 ms':>8} {'p95 ms':>8}")
+    for endpoint in ("update_language", "handle_quick_action", "respond"):
+        samples = [s for latencies, _ in results for s in latencies[endpoint]]
+        print(f"{endpoint:<22} {statistics.median(samples) * 1e3:>8.1f} {percentile(samples, 0.95) * 1e3:>8.1f}")
+    print(f"cross-session language mismatches: {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=7861)
+    parser.add_argument("--mock-port", type=int, default=8001)
+    main(parser.parse_args())
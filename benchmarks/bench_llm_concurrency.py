@@ -0,0 +1,69 @@
+"""Throughput of the async completion backend vs. number of concurrent sessions.
+
+Usage: python -m benchmarks.bench_llm_concurrency [--latency 0.2] [--requests 4] [--stream]
+
+With a fixed upstream latency, throughput should grow linearly with the number
+of sessions until ``OPENAI_MAX_CONCURRENT_REQUESTS`` is reached. With
+``--stream`` the time-to-first-token and total latency are reported separately.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+from benchmarks.mock_openai import MockServer
+from llm_client import CompletionBackend
+
+MESSAGES = [{"role": "user", "content": "Is oatmeal a good breakfast?"}]
+
+
+async def run_sessions(backend: CompletionBackend, sessions: int, requests_per_session: int,
+                       stream: bool = False) -> float:
+    async def session():
+        for _ in range(requests_per_session):
+            if stream:
+                async for _delta in backend.stream(messages=MESSAGES, model="gpt-3.5-turbo", max_tokens=500):
+                    pass
+            else:
+                await backend.complete(messages=MESSAGES, model="gpt-3.5-turbo", max_tokens=500)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(sessions)))
+    return time.perf_counter() - start
+
+
+async def main(args):
+    with MockServer(port=args.port, latency=args.latency, token_delay=args.token_delay) as server:
+        backend = CompletionBackend(base_url=server.base_url, coalesce=False)
+        await run_sessions(backend, 1, 1, args.stream)  # warm up the connection pool
+        header = f"{'sessions':>8} {'requests':>8} {'seconds':>8} {'req/s':>8} {'speedup':>8}"
+        if args.stream:
+            header += f" {'ttft p50':>9} {'total p50':>9}"
+        print(header)
+        baseline = None
+        for sessions in args.sessions:
+            backend.ttft_samples.clear()
+            backend.total_samples.clear()
+            elapsed = await run_sessions(backend, sessions, args.requests, args.stream)
+            throughput = sessions * args.requests / elapsed
+            baseline = baseline or throughput
+            row = (f"{sessions:>8} {sessions * args.requests:>8} {elapsed:>8.2f} "
+                   f"{throughput:>8.1f} {throughput / baseline:>7.1f}x")
+            if args.stream:
+                summary = backend.latency_summary()
+                row += f" {summary['ttft_p50']:>8.3f}s {summary['total_p50']:>8.3f}s"
+            print(row)
+        await backend.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--stream", action="store_true", help="use streamed completions")
+    parser.add_argument("--requests", type=int, default=4, help="requests per session")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--port", type=int, default=8001)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+"""Solve time and target accuracy of the weekly meal planner vs. plan size.
+
+Usage: python -m benchmarks.bench_meal_planner [--profiles 1,100,1000] [--recipes 1,4]
+
+Plans weeks for batches of random profiles (1200-3500 kcal, 0.8-2 g protein per
+kg, random dietary preferences) against the bundled recipe table and against
+tables with every recipe repeated ``--recipes`` times under perturbed
+portions, which grows the breakfast x lunch x dinner search space cubically.
+Reports solve time per plan and how far daily totals land from the targets.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from food_db import FoodTable
+from meal_planner import MealPlanner, RecipeTable
+
+DIET_CHOICES = [(), (), ("vegetarian",), ("vegan",), ("gluten_free",), ("dairy_free",), ("keto",), ("paleo",),
+                ("vegetarian", "gluten_free")]
+
+
+def scaled_table(base: RecipeTable, copies: int, seed: int) -> RecipeTable:
+    """``base`` with each recipe repeated ``copies`` times at 80-120 % of its portion"""
+    table = RecipeTable.__new__(RecipeTable)
+    factors = np.random.default_rng(seed).uniform(0.8, 1.2, len(base) * copies)
+    factors[:len(base)] = 1
+    table.names = base.names * copies
+    table.names_fr = base.names_fr * copies
+    table.meal = np.tile(base.meal, copies)
+    table.nutrients = np.tile(base.nutrients, (copies, 1)) * factors[:, None]
+    table.energy = np.tile(base.energy, copies) * factors
+    table.protein = np.tile(base.protein, copies) * factors
+    table.diets = base.diets * copies
+    return table
+
+
+def random_profiles(count: int, seed: int):
+    rng = random.Random(seed)
+    profiles = []
+    for _ in range(count):
+        calories = rng.uniform(1200, 3500)
+        weight = rng.uniform(45, 120)
+        profiles.append((calories, weight * rng.uniform(0.8, 2.0), rng.choice(DIET_CHOICES)))
+    return profiles
+
+
+def run(planner: MealPlanner, profiles):
+    """Plan every profile, one plan_batch call per set of dietary preferences"""
+    groups = {}
+    for calories, protein, diets in profiles:
+        groups.setdefault(diets, []).append((calories, protein))
+    energy_error, protein_short = [], []
+    start = time.perf_counter()
+    for diets, targets in groups.items():
+        calories, protein = np.array(targets).T
+        plans = planner.plan_batch(calories, protein, diets)
+        energy_error.append(np.abs(plans["energy_kcal"] - calories[:, None]) / calories[:, None])
+        protein_short.append(np.maximum(0, protein[:, None] - plans["protein_g"]) / protein[:, None])
+    seconds = time.perf_counter() - start
+    return seconds, np.concatenate(energy_error, axis=None), np.concatenate(protein_short, axis=None)
+
+
+def main(args):
+    base = RecipeTable.load(FoodTable.load())
+    print(f"{'recipes':>8} {'combos':>9} {'profiles':>9} {'total ms':>10} {'ms/plan':>9} "
+          f"{'kcal err p50':>13} {'kcal err p95':>13} {'protein met':>12}")
+    for copies in args.recipes:
+        table = scaled_table(base, copies, args.seed)
+        planner = MealPlanner(table, days=args.days)
+        combos = np.prod([np.count_nonzero(table.meal == meal) for meal in range(3)])
+        for count in args.profiles:
+            seconds, energy_error, protein_short = run(planner, random_profiles(count, args.seed))
+            print(f"{len(table):>8} {combos:>9,} {count:>9,} {seconds * 1e3:>10.1f} {seconds * 1e3 / count:>9.3f} "
+                  f"{np.percentile(energy_error, 50):>13.1%} {np.percentile(energy_error, 95):>13.1%} "
+                  f"{np.mean(protein_short == 0):>12.1%}")
+        # Sequential single-profile solves, as the chat path does
+        sample = random_profiles(min(args.profiles[-1], 200), args.seed)
+        start = time.perf_counter()
+        for calories, protein, diets in sample:
+            planner.plan_week(calories, protein, diets)
+        print(f"{'':>8} plan_week one at a time: {(time.perf_counter() - start) * 1e3 / len(sample):.3f} ms/plan")
+
+
+def int_list(text: str):
+    return [int(part) for part in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profiles", type=int_list, default=[1, 100, 1000])
+    parser.add_argument("--recipes", type=int_list, default=[1, 4])
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=11)
+    main(parser.parse_args())
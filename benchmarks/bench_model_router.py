@@ -0,0 +1,152 @@
+"""Latency, cost and availability of routing replies between the remote model and a local one.
+
+Usage: python -m benchmarks.bench_model_router [--sessions 8] [--messages 6] [--local-url http://127.0.0.1:8080/v1]
+
+Runs ``NutritionBot.get_response`` for ``--sessions`` concurrent sessions, each
+sending a mix of quick actions, food questions, short questions and long
+open-ended ones, against two mock servers: a remote model (``--remote-latency``,
+``--remote-token-delay``) priced as gpt-3.5-turbo, and a slower, free local
+model standing in for a small GGUF model on CPU. ``--local-url`` points the
+local backend at a real OpenAI-compatible server instead, e.g. llama.cpp's
+``llama-server -m qwen2.5-0.5b-instruct-q4_k_m.gguf --port 8080``.
+
+Scenarios:
+
+- ``remote_only``: every reply from the remote model, as without a local backend
+- ``routed``: the router sends the cheap cases to the local model
+- ``remote_down``: the remote mock fails every request; replies fall back to
+  the local model, then go there directly once the remote circuit is open
+
+Reports replies, failed replies, reply latency, per-backend stream latency,
+routes, fallbacks and estimated cost per backend.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from metrics import percentile
+
+REMOTE_PORT = 8003
+LOCAL_PORT = 8004
+QUICK_ACTION_KEYS = ["meal_suggestions", "daily_calories", "exercise_tips"]
+FOOD_QUESTIONS = ["Is salmon a good source of protein?", "Tell me about lentils", "Are almonds healthy?"]
+SHORT_QUESTIONS = ["Is rice healthy?", "What about pasta?", "Any snack ideas?", "Is coffee ok?"]
+OPEN_QUESTIONS = [
+    "I train for a half marathon three times a week and often feel exhausted in the afternoon, how should I adjust "
+    "my breakfast and lunch to keep my energy up without gaining weight?",
+    "My doctor said my cholesterol is a bit high and I am vegetarian, which changes to my usual meals would help the "
+    "most, and how quickly could I expect to see a difference?",
+    "I work night shifts and end up snacking on sweets around 3am, how can I plan my meals around this schedule so I "
+    "eat better and sleep well during the day?",
+]
+REMOTE_REPLY = ("A balanced plate is half vegetables, a quarter lean protein and a quarter whole grains. " * 6).strip()
+ROUTE_REASONS = ["default", "remote_open", "local_busy", "quick_action", "grounded", "short", "open_ended"]
+
+
+def workload(sessions: int, messages: int, quick_prompts, seed: int):
+    rng = random.Random(seed)
+    pools = [quick_prompts, FOOD_QUESTIONS, SHORT_QUESTIONS, OPEN_QUESTIONS]
+    return [[rng.choice(rng.choice(pools)) for _ in range(messages)] for _ in range(sessions)]
+
+
+async def run_scenario(nutrition_bot, conversations, failures):
+    latencies, failed = [], 0
+
+    async def session(index: int, questions):
+        nonlocal failed
+        bot = nutrition_bot.NutritionBot()
+        bot.update_user_data(f"User {index}", 25 + index, 60 + index, 170, [], 2000 + 10 * index, 100, 2.5)
+        for question in questions:
+            start = time.perf_counter()
+            reply = ""
+            async for reply in bot.get_response(question):
+                pass
+            latencies.append(time.perf_counter() - start)
+            failed += reply in failures
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i, questions) for i, questions in enumerate(conversations)))
+    return time.perf_counter() - start, latencies, failed
+
+
+def counters(llm_client, model_router, backends):
+    values = {}
+    for backend, other in (backends, backends[::-1]):
+        values[("cost", backend.name)] = llm_client.LLM_COST.value(backend=backend.name, model=backend.model)
+        values[("fallbacks", backend.name)] = model_router.LLM_FALLBACKS.value(failed=other.name, backend=backend.name)
+        for reason in ROUTE_REASONS:
+            values[("route", backend.name, reason)] = model_router.LLM_ROUTES.value(backend=backend.name, reason=reason)
+    return values
+
+
+async def main(args):
+    from benchmarks.mock_openai import MockServer
+
+    os.environ.update(OPENAI_API_KEY="sk-mock", OPENAI_BASE_URL=f"http://127.0.0.1:{REMOTE_PORT}/v1",
+                      LOCAL_LLM_BASE_URL=args.local_url or f"http://127.0.0.1:{LOCAL_PORT}/v1",
+                      SEMANTIC_CACHE="0")
+    with MockServer(port=REMOTE_PORT, latency=args.remote_latency, token_delay=args.remote_token_delay,
+                    reply=REMOTE_REPLY) as remote, \
+            MockServer(port=LOCAL_PORT, latency=args.local_latency, token_delay=args.local_token_delay,
+                       reply=REMOTE_REPLY):
+        import llm_client
+        import model_router
+        import nutrition_bot
+        from i18n import get_text, get_translations
+        from response_cache import ResponseCache
+
+        text_tables = get_translations()[1]
+        quick_prompts = [text_tables["en"][f"quick_actions.prompts.{key}"] for key in QUICK_ACTION_KEYS]
+        failures = {get_text(key, "en") for key in ("bot.error", "bot.unavailable", "bot.high_demand")}
+        router = nutrition_bot.model_router
+        local = router.local
+        # Fail fast once down; the default retries would dominate the remote_down numbers
+        router.remote.retry_policy.base_delay = 0.05
+
+        print(f"{args.sessions} sessions x {args.messages} messages; remote {args.remote_latency}s + "
+              f"{args.remote_token_delay * 1e3:.0f} ms/token, local {args.local_latency}s + "
+              f"{args.local_token_delay * 1e3:.0f} ms/token{' (' + args.local_url + ')' if args.local_url else ''}")
+        for scenario in args.scenarios:
+            router.local = None if scenario == "remote_only" else local
+            remote.app.state.error_rate = 1.0 if scenario == "remote_down" else 0.0
+            for backend in (router.remote, local):
+                backend.total_samples.clear()
+                backend.ttft_samples.clear()
+            conversations = workload(args.sessions, args.messages, quick_prompts, args.seed)
+            # Fresh answers: the quick-action cache would otherwise hide the later scenarios' model calls
+            nutrition_bot.response_cache = ResponseCache(path="")
+            before = counters(llm_client, model_router, (router.remote, local))
+            seconds, latencies, failed = await run_scenario(nutrition_bot, conversations, failures)
+            after = counters(llm_client, model_router, (router.remote, local))
+            delta = {key: after[key] - before[key] for key in after}
+
+            print(f"\n{scenario}: {len(latencies)} replies in {seconds:.1f}s, {failed} failed, reply p50 "
+                  f"{statistics.median(latencies) * 1e3:.0f} ms / p95 {percentile(latencies, 0.95) * 1e3:.0f} ms")
+            for backend in (router.remote, local):
+                routes = {reason: int(delta[("route", backend.name, reason)]) for reason in ROUTE_REASONS
+                          if delta[("route", backend.name, reason)]}
+                summary = backend.latency_summary()
+                print(f"  {backend.name:<7} {len(backend.total_samples):>4} streams  ttft p50 "
+                      f"{summary['ttft_p50'] * 1e3:6.0f} ms  total p50 {summary['total_p50'] * 1e3:6.0f} ms  "
+                      f"cost ${delta[('cost', backend.name)]:.5f}  fallbacks in "
+                      f"{int(delta[('fallbacks', backend.name)])}  routes {routes or '-'}")
+        for backend in (router.remote, local):
+            await backend.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=6, help="messages per session")
+    parser.add_argument("--remote-latency", type=float, default=0.5)
+    parser.add_argument("--remote-token-delay", type=float, default=0.01)
+    parser.add_argument("--local-latency", type=float, default=0.8, help="prompt processing on CPU")
+    parser.add_argument("--local-token-delay", type=float, default=0.03)
+    parser.add_argument("--local-url", help="real OpenAI-compatible local server instead of the mock")
+    parser.add_argument("--scenarios", nargs="+", default=["remote_only", "routed", "remote_down"],
+                        choices=["remote_only", "routed", "remote_down"])
+    parser.add_argument("--seed", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+"""Cost of a keystroke storm on the profile form, before and after coalescing.
+
+Usage: python -m benchmarks.bench_profile_updates [--repeat 200]
+
+"before" replays the old wiring: every keystroke in the name box fired all 8
+``.change`` listeners, each doing a full profile rebuild. "after" replays the
+coalesced listener: at most one update per committed edit, and a name-only edit
+skips the BMR/TDEE/assessment rebuild.
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+from nutrition_bot import NutritionBot
+
+NAME = "Alexandra Fitzgerald"
+PROFILE = (30, 64.0, 168.0, ["🥬 Vegetarian", "🌾 Gluten-Free"], 2100, 110, 2.4)
+
+
+def before(bot: NutritionBot):
+    for i in range(1, len(NAME) + 1):
+        for _listener in range(8):
+            bot._profile_inputs = None  # the old update_user_data always rebuilt everything
+            bot.update_user_data(NAME[:i], *PROFILE)
+
+
+def after_per_keystroke(bot: NutritionBot):
+    # Worst case: the browser still delivers every keystroke, but to one listener
+    for i in range(1, len(NAME) + 1):
+        bot.update_user_data(NAME[:i], *PROFILE)
+
+
+def after_committed(bot: NutritionBot):
+    # Name committed on blur: a single update for the whole word
+    bot.update_user_data(NAME, *PROFILE)
+
+
+def measure(fn, repeat: int) -> float:
+    bot = NutritionBot()
+    bot.update_user_data("", *PROFILE)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        bot.user_data["name"] = ""
+        fn(bot)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(args):
+    baseline = measure(before, args.repeat)
+    print(f"typing {len(NAME)} characters into the name box")
+    print(f"{'before (8 listeners, full rebuild)':<40} {baseline * 1e3:>8.3f} ms")
+    for label, fn in [("after (1 listener, per keystroke)", after_per_keystroke),
+                      ("after (1 listener, on blur)", after_committed)]:
+        elapsed = measure(fn, args.repeat)
+        print(f"{label:<40} {elapsed * 1e3:>8.3f} ms  ({baseline / elapsed:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200)
+    main(parser.parse_args())
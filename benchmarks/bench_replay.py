@@ -0,0 +1,421 @@
+"""Replays recorded or synthetic conversations against the bot or the whole web app, with an offline model.
+
+Usage: python -m benchmarks.bench_replay [--target bot|app] [--sessions 40] [--messages 6] [--trace FILE ...]
+                                         [--output results.json] [--compare baseline.json]
+
+Starts ``benchmarks.mock_openai`` in a subprocess (``--latency``,
+``--token-rate``, ``--error-rate``, ``--drop-rate``...), then replays a trace:
+
+- ``--target bot`` calls ``NutritionBot.update_user_data`` and
+  ``get_response`` in this process, one asyncio task per session;
+- ``--target app`` launches ``app.py`` and drives the Gradio app with one
+  gradio_client per session (``/update_profile`` and ``/respond``).
+
+A trace is JSON lines of events ``{"session", "at", "type": "profile" |
+"message", ...}``; without ``--trace`` a synthetic one is generated (profile
+questions, food lookups, quick actions, open questions, off-topic messages)
+and ``--save-trace`` keeps it for later runs. Conversations exported with
+``python conversation_log.py export`` are accepted as well: each file is one
+session whose user turns are replayed at their recorded offsets. Sessions run
+concurrently; within a session an event waits for its offset (divided by
+``--speed``, 0 replays back to back) and for the previous reply.
+
+Reports p50/p95/p99 latency per operation (and time to first token in the
+bot), replies per second, failed replies, memory per session, event-loop lag
+and the share of prompt tokens the mock reports as cached, after one warm-up
+message. In the bot, memory is what the finished sessions' state takes to
+rebuild (tracemalloc) and lag is probed on the replay loop; in the app,
+memory is the server's RSS growth per session and lag comes from its
+``nutribot_event_loop_lag_seconds`` histogram (bucket upper bounds).
+``--output`` writes the report as JSON with the commit and settings, and
+``--compare`` prints the change against an earlier report.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from i18n import get_text, get_translations
+from metrics import percentile
+
+LOCAL_QUESTIONS = ["What is my TDEE?", "How much protein do I need?", "How much water should I drink?",
+                   "What is my BMI?"]
+FOOD_QUESTIONS = ["How much protein is in 150 g of salmon?", "How many calories in 100 g of rice?",
+                  "How much fiber in 200 g of lentils?", "How much fat is in 30 g of almonds?"]
+OPEN_QUESTIONS = ["What should I eat after a workout?", "Is oatmeal a good breakfast?", "How can I eat more fiber?",
+                  "Is rice healthy?", "What are good snacks for weight loss?", "How do I get enough iron as a vegan?",
+                  "Are eggs bad for cholesterol?", "What should I eat before running?",
+                  "How can I reduce my sugar cravings?", "Is intermittent fasting a good idea?"]
+OFF_TOPIC = ["What's the weather like tomorrow?", "Can you recommend a good movie?"]
+DIET_KEYS = {"vegetarian": "🥬", "vegan": "🌱", "gluten_free": "🌾", "dairy_free": "🥛", "keto": "🥑", "paleo": "🍖"}
+# Share of synthetic messages per kind; quick actions use the app's own prompts
+MIX = {"local": 0.25, "food": 0.15, "quick": 0.15, "open": 0.4, "off_topic": 0.05}
+# Asked once before measuring, so first-use costs (SDK import, connection pool) stay out of the results
+WARM_UP_QUESTION = "What makes a balanced lunch?"
+# Replies that stand for a failure rather than an answer
+FAILURE_KEYS = ("bot.error", "bot.unavailable", "bot.high_demand")
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Count and p50/p95/p99/mean in milliseconds"""
+    if not samples:
+        return {"n": 0}
+    return {"n": len(samples), "p50": percentile(samples, 0.5) * 1e3, "p95": percentile(samples, 0.95) * 1e3,
+            "p99": percentile(samples, 0.99) * 1e3, "mean": statistics.fmean(samples) * 1e3}
+
+
+def synthetic_trace(args) -> Dict[str, List[dict]]:
+    rng = random.Random(args.seed)
+    quick_prompts = [text for key, text in get_translations()[1]["en"].items()
+                     if key.startswith("quick_actions.prompts.")]
+    pools = {"local": LOCAL_QUESTIONS, "food": FOOD_QUESTIONS, "quick": quick_prompts, "open": OPEN_QUESTIONS,
+             "off_topic": OFF_TOPIC}
+    sessions = {}
+    for index in range(args.sessions):
+        name = f"session-{index}"
+        at = rng.uniform(0, args.ramp)
+        diets = [f"{DIET_KEYS[key]} {get_text('dietary_prefs.' + key)}" for key in DIET_KEYS if rng.random() < 0.1]
+        profile = [f"User {index}", rng.randint(18, 75), round(rng.uniform(50, 110), 1), rng.randint(150, 195),
+                   diets, rng.choice([1800, 2000, 2200, 2500]), rng.choice([80, 100, 120]), 2.5]
+        events = [{"session": name, "at": round(at, 3), "type": "profile", "profile": profile}]
+        for _ in range(args.messages):
+            at += rng.expovariate(1 / args.think) if args.think else 0
+            kind = rng.choices(list(MIX), weights=list(MIX.values()))[0]
+            events.append({"session": name, "at": round(at, 3), "type": "message", "text": rng.choice(pools[kind]),
+                           "lang": "en"})
+        sessions[name] = events
+    return sessions
+
+
+def load_trace(paths) -> Dict[str, List[dict]]:
+    sessions = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        if lines and "role" in lines[0]:
+            # One conversation from `conversation_log.py export`: its user turns at their recorded offsets
+            name = os.path.splitext(os.path.basename(path))[0]
+            sessions[name] = [{"session": name, "at": turn["ts"] - lines[0]["ts"], "type": "message",
+                               "text": turn["content"]} for turn in lines if turn["role"] == "user"]
+        else:
+            for event in lines:
+                sessions.setdefault(event["session"], []).append(event)
+    for events in sessions.values():
+        events.sort(key=lambda event: event["at"])
+    return sessions
+
+
+def save_trace(sessions: Dict[str, List[dict]], path: str):
+    events = sorted((event for events in sessions.values() for event in events), key=lambda event: event["at"])
+    with open(path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+def wait_for(url: str, seconds: float, process: subprocess.Popen):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        try:
+            return urllib.request.urlopen(url, timeout=1).read()
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{url} did not answer")
+
+
+def start_mock(args) -> subprocess.Popen:
+    command = [sys.executable, "-m", "benchmarks.mock_openai", "--port", str(args.mock_port),
+               "--latency", str(args.latency), "--jitter", str(args.jitter), "--token-rate", str(args.token_rate),
+               "--error-rate", str(args.error_rate), "--drop-rate", str(args.drop_rate),
+               "--reply-words", str(args.reply_words), "--cache-min-tokens", str(args.cache_min_tokens)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for(f"http://127.0.0.1:{args.mock_port}/stats", 30, process)
+    return process
+
+
+def failure_texts() -> set:
+    return {get_text(key, lang) for key in FAILURE_KEYS for lang in get_translations()[0]}
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {"profile": [], "message": [], "first_token": []}
+        self.failed = 0
+        self.busy = 0
+        self.exceptions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, seconds: float):
+        with self._lock:
+            self.samples[kind].append(seconds)
+
+    def exception(self, error: Exception):
+        with self._lock:
+            name = type(error).__name__
+            self.exceptions[name] = self.exceptions.get(name, 0) + 1
+
+    def reply(self, text: str, failures: set, busy_text: Optional[str] = None):
+        with self._lock:
+            if text in failures:
+                self.failed += 1
+            elif busy_text is not None and text == busy_text:
+                self.busy += 1
+
+
+async def replay_bot(sessions: Dict[str, List[dict]], args, recorder: Recorder) -> dict:
+    import nutrition_bot
+    from metrics import LoopLagProbe
+
+    failures = failure_texts()
+    loop = asyncio.get_running_loop()
+    bots = {}
+
+    async def session(name: str, events: List[dict]):
+        bot = bots[name] = nutrition_bot.NutritionBot()
+        for event in events:
+            if args.speed:
+                await asyncio.sleep(max(0.0, begin + event["at"] / args.speed - loop.time()))
+            start = time.perf_counter()
+            try:
+                if event["type"] == "profile":
+                    bot.update_user_data(*event["profile"])
+                    recorder.add("profile", time.perf_counter() - start)
+                    continue
+                bot.set_language(event.get("lang", "en"))
+                first_token, text = None, ""
+                async for text in bot.get_response(event["text"]):
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                recorder.add("message", time.perf_counter() - start)
+                recorder.add("first_token", first_token)
+                recorder.reply(text, failures)
+            except Exception as error:
+                recorder.exception(error)
+
+    async for _ in nutrition_bot.NutritionBot().get_response(WARM_UP_QUESTION):
+        pass
+    probe = LoopLagProbe(keep=True)
+    begin = loop.time()
+    probe.start()
+    await asyncio.gather(*(session(name, events) for name, events in sessions.items()))
+    probe.stop()
+
+    # Memory per session: what rebuilding the finished sessions from their state allocates
+    states = [json.dumps(bot.to_state()) for bot in bots.values()]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rebuilt = [nutrition_bot.NutritionBot.from_state(json.loads(state)) for state in states]
+    per_session = (tracemalloc.get_traced_memory()[0] - before) / max(1, len(rebuilt))
+    tracemalloc.stop()
+    return {
+        "memory": {"per_session_kb": per_session / 1024, "method": "tracemalloc of sessions rebuilt from state"},
+        "event_loop_lag_ms": summarize(probe.samples),
+        "paths": nutrition_bot.route_stats.summary(),
+    }
+
+
+def scrape(url: str) -> Dict[str, float]:
+    """Samples of a Prometheus text page, keyed by name and labels"""
+    samples = {}
+    for line in urllib.request.urlopen(url, timeout=10).read().decode("utf-8").splitlines():
+        if line and not line.startswith("#"):
+            key, _, value = line.rpartition(" ")
+            samples[key] = float(value.replace("+Inf", "inf"))
+    return samples
+
+
+def histogram_summary(name: str, before: Dict[str, float], after: Dict[str, float]) -> Dict[str, float]:
+    """Count, p50/p95/p99 as bucket upper bounds and mean (ms) of a histogram between two scrapes"""
+    prefix = name + '_bucket{le="'
+    buckets = sorted((float(key[len(prefix):-2]), after[key] - before.get(key, 0))
+                     for key in after if key.startswith(prefix))
+    count = after.get(name + "_count", 0) - before.get(name + "_count", 0)
+    if not count:
+        return {"n": 0}
+    summary = {"n": int(count)}
+    for label, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        summary[label] = next(bound for bound, cumulative in buckets if cumulative >= q * count) * 1e3
+    summary["mean"] = (after[name + "_sum"] - before.get(name + "_sum", 0)) / count * 1e3
+    return summary
+
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def replay_app(sessions: Dict[str, List[dict]], args, recorder: Recorder, mock_url: str) -> dict:
+    from gradio_client import Client
+
+    env = dict(os.environ, OPENAI_API_KEY="sk-mock", OPENAI_BASE_URL=mock_url, GRADIO_ANALYTICS_ENABLED="False")
+    process = subprocess.Popen([sys.executable, "app.py", "--host", "127.0.0.1", "--port", str(args.port)],
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{args.port}/"
+    failures = failure_texts()
+    busy_text = get_text("bot.busy", "en")
+    try:
+        wait_for(url, 90, process)
+        with ThreadPoolExecutor(len(sessions)) as pool:
+            # Connect every client before the clock starts; the first scrape starts the server's lag probe
+            clients = dict(zip(sessions, pool.map(lambda _: Client(url, verbose=False), sessions)))
+            Client(url, verbose=False).predict(WARM_UP_QUESTION, [], "en", api_name="/respond")
+            before = scrape(url + "metrics")
+            rss_before = rss_bytes(process.pid)
+
+            def session(name: str):
+                client = clients[name]
+                for event in sessions[name]:
+                    if args.speed:
+                        time.sleep(max(0.0, begin + event["at"] / args.speed - time.perf_counter()))
+                    start = time.perf_counter()
+                    try:
+                        if event["type"] == "profile":
+                            client.predict(*event["profile"], api_name="/update_profile")
+                            recorder.add("profile", time.perf_counter() - start)
+                            continue
+                        history = client.predict(event["text"], [], event.get("lang", "en"), api_name="/respond")
+                        recorder.add("message", time.perf_counter() - start)
+                        recorder.reply(history[-1]["content"], failures, busy_text)
+                    except Exception as error:
+                        recorder.exception(error)
+
+            begin = time.perf_counter()
+            list(pool.map(session, sessions))
+        after = scrape(url + "metrics")
+        return {
+            "memory": {"per_session_kb": (rss_bytes(process.pid) - rss_before) / len(sessions) / 1024,
+                       "method": "server RSS growth per session"},
+            "event_loop_lag_ms": histogram_summary("nutribot_event_loop_lag_seconds", before, after),
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def git_commit() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                    text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def compare(report: dict, baseline: dict):
+    print(f"\nagainst {baseline.get('commit')} ({baseline.get('target')}, {baseline.get('created')}):")
+    rows = [("replies/s", ("throughput", "replies_per_s")), ("memory/session KB", ("memory", "per_session_kb")),
+            ("cached prompt %", ("prompt_cache", "cached_percent"))]
+    rows += [(f"{kind} {q} ms", ("latency_ms", kind, q)) for kind in report["latency_ms"] for q in ("p50", "p95", "p99")]
+    rows += [(f"loop lag {q} ms", ("event_loop_lag_ms", q)) for q in ("p50", "p95", "p99")]
+    for label, path in rows:
+        old, new = baseline, report
+        for key in path:
+            old, new = (old or {}).get(key), (new or {}).get(key)
+        if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+            change = f"{(new - old) / old:+.1%}" if old else "n/a"
+            print(f"  {label:<22} {old:>10.1f} -> {new:>10.1f}  {change}")
+
+
+def main(args):
+    sessions = load_trace(args.trace) if args.trace else synthetic_trace(args)
+    if args.save_trace:
+        save_trace(sessions, args.save_trace)
+    events = sum(len(events) for events in sessions.values())
+    messages = sum(event["type"] == "message" for events in sessions.values() for event in events)
+    mock = start_mock(args)
+    mock_url = f"http://127.0.0.1:{args.mock_port}/v1"
+    recorder = Recorder()
+    try:
+        start = time.perf_counter()
+        if args.target == "bot":
+            os.environ.update(OPENAI_API_KEY="sk-mock", OPENAI_BASE_URL=mock_url)
+            measured = asyncio.run(replay_bot(sessions, args, recorder))
+        else:
+            measured = replay_app(sessions, args, recorder, mock_url)
+        seconds = time.perf_counter() - start
+        mock_stats = json.loads(urllib.request.urlopen(f"http://127.0.0.1:{args.mock_port}/stats").read())
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    replies = len(recorder.samples["message"])
+    report = {
+        "benchmark": "replay",
+        **git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "target": args.target,
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "sessions": len(sessions),
+        "events": events,
+        "seconds": seconds,
+        "throughput": {"replies_per_s": replies / seconds, "events_per_s": events / seconds},
+        "latency_ms": {kind: summarize(samples) for kind, samples in recorder.samples.items() if samples},
+        "errors": {"failed_replies": recorder.failed, "busy_replies": recorder.busy,
+                   "exceptions": recorder.exceptions, "unanswered": messages - replies},
+        "mock": mock_stats,
+        "prompt_cache": {"prompt_tokens": mock_stats["prompt_tokens"], "cached_tokens": mock_stats["cached_tokens"],
+                         "cached_percent": 100 * mock_stats["cached_tokens"] / max(1, mock_stats["prompt_tokens"])},
+        **measured,
+    }
+
+    print(f"{args.target}: {len(sessions)} sessions, {events} events in {seconds:.1f}s "
+          f"({report['throughput']['replies_per_s']:.1f} replies/s), {mock_stats['requests']} model requests")
+    for kind, stats in report["latency_ms"].items():
+        print(f"  {kind:<12} n={stats['n']:<5} p50 {stats['p50']:8.1f} ms   p95 {stats['p95']:8.1f} ms   "
+              f"p99 {stats['p99']:8.1f} ms")
+    lag = report["event_loop_lag_ms"]
+    if lag["n"]:
+        print(f"  event loop lag  p50 {lag['p50']:.1f} ms   p95 {lag['p95']:.1f} ms   p99 {lag['p99']:.1f} ms")
+    print(f"  prompt tokens {mock_stats['prompt_tokens']}, {report['prompt_cache']['cached_percent']:.1f}% "
+          f"reported as cached")
+    print(f"  memory per session {report['memory']['per_session_kb']:.1f} KB ({report['memory']['method']})")
+    print(f"  failed replies {recorder.failed}, busy {recorder.busy}, exceptions {recorder.exceptions or 'none'}")
+    for path, stats in report.get("paths", {}).items():
+        print(f"  path {path:<15} {stats['share']:6.1%}  p50 {stats['p50_ms']:8.1f} ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--target", choices=["bot", "app"], default="bot")
+    parser.add_argument("--trace", nargs="*", default=[], help="JSON-lines traces or conversation exports")
+    parser.add_argument("--save-trace", help="write the synthetic trace here")
+    parser.add_argument("--sessions", type=int, default=40, help="synthetic sessions")
+    parser.add_argument("--messages", type=int, default=6, help="synthetic messages per session")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which synthetic sessions start")
+    parser.add_argument("--think", type=float, default=2.0, help="mean seconds between a session's messages")
+    parser.add_argument("--speed", type=float, default=1.0, help="trace time divisor; 0 sends back to back")
+    parser.add_argument("--latency", type=float, default=0.3, help="mock seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--token-rate", type=float, default=100.0, help="mock tokens per second")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of mock streams cut off halfway")
+    parser.add_argument("--reply-words", type=int, default=120, help="length of the mock's replies")
+    parser.add_argument("--cache-min-tokens", type=int, default=768,
+                        help="mock prompt-cache minimum; mock tokens are words, 768 of them about 1024 real tokens")
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    parser.add_argument("--port", type=int, default=7863)
+    parser.add_argument("--mock-port", type=int, default=8002)
+    parser.add_argument("--seed", type=int, default=11)
+    main(parser.parse_args())
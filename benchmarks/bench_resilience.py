@@ -0,0 +1,86 @@
+"""Fault injection against the completion backend's retry, rate-limit and breaker logic.
+
+Usage: python -m benchmarks.bench_resilience [--sessions 50] [--requests 4]
+
+Runs concurrent sessions against the mock server while it is healthy, failing
+a fraction of requests with 500s, fully down, and answering 429 with
+Retry-After. For each scenario the user-visible success rate, the number of
+upstream calls and latency are reported. The outage scenario is run with and
+without the circuit breaker to show how many upstream calls it saves.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+from benchmarks.mock_openai import MockServer
+from llm_client import CompletionBackend
+from resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+MESSAGES = [{"role": "user", "content": "Is oatmeal a good breakfast?"}]
+
+
+async def run_scenario(backend: CompletionBackend, sessions: int, requests_per_session: int):
+    outcomes = {"ok": 0, "circuit_open": 0, "failed": 0}
+    latencies = []
+
+    async def session():
+        for _ in range(requests_per_session):
+            start = time.perf_counter()
+            try:
+                async for _delta in backend.stream(messages=MESSAGES, model="gpt-3.5-turbo", max_tokens=50):
+                    pass
+                outcomes["ok"] += 1
+            except CircuitOpenError:
+                outcomes["circuit_open"] += 1
+            except Exception:
+                outcomes["failed"] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(sessions)))
+    return outcomes, latencies, time.perf_counter() - start
+
+
+async def main(args):
+    scenarios = [
+        ("healthy", dict(error_rate=0.0), True),
+        (f"{args.flaky_rate:.0%} 500s", dict(error_rate=args.flaky_rate, error_status=500), True),
+        ("outage, no breaker", dict(error_rate=1.0, error_status=500), False),
+        ("outage, breaker", dict(error_rate=1.0, error_status=500), True),
+        ("429 + Retry-After", dict(error_rate=args.flaky_rate, error_status=429, retry_after=args.retry_after), True),
+    ]
+    total = args.sessions * args.requests
+    print(f"{args.sessions} sessions x {args.requests} requests")
+    print(f"{'scenario':<20} {'success':>8} {'fast-fail':>10} {'upstream':>9} {'p50 ms':>8} {'max ms':>8} {'wall s':>7}")
+    with MockServer(port=args.port, latency=args.latency, token_delay=0.0) as server:
+        for name, faults, use_breaker in scenarios:
+            backend = CompletionBackend(base_url=server.base_url, coalesce=False)
+            backend.retry_policy = RetryPolicy(base_delay=args.base_delay)
+            if not use_breaker:
+                backend.breaker = CircuitBreaker(failure_threshold=10 ** 9)
+            server.app.state.requests = 0
+            server.app.state.error_rate = faults.get("error_rate", 0.0)
+            server.app.state.error_status = faults.get("error_status", 500)
+            server.app.state.retry_after = faults.get("retry_after")
+
+            outcomes, latencies, wall = await run_scenario(backend, args.sessions, args.requests)
+            await backend.aclose()
+            print(f"{name:<20} {outcomes['ok'] / total:>8.1%} {outcomes['circuit_open']:>10} "
+                  f"{server.app.state.requests:>9} {statistics.median(latencies) * 1e3:>8.1f} "
+                  f"{max(latencies) * 1e3:>8.1f} {wall:>7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--flaky-rate", type=float, default=0.3)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--base-delay", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8001)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,141 @@
+"""Load test of the Gradio queue and concurrency settings through gradio_client.
+
+Usage: python -m benchmarks.bench_scheduler [--users 40] [--messages 3] [--latency 1.0]
+
+Starts the mock completion server, then for each scenario launches
+``python app.py`` with the scenario's scheduler flags and drives it with
+``--users`` concurrent gradio_client sessions. Each user sets a profile, then
+alternates quick actions (local events) with chat messages (LLM events); every
+``--burst-every``-th user sends its messages all at once. Reports throughput,
+latency percentiles per event kind, refused events ("queue is full") and
+messages turned away by the per-session limit.
+
+The ``legacy`` scenario mirrors the previous launcher: a 20-event queue and
+Gradio's default limit of one running event per listener. The clients run in
+this process, so on a small machine their own overhead is part of the
+local-event latency.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from gradio_client import Client
+
+from benchmarks.mock_openai import MockServer
+from metrics import percentile
+
+SCENARIOS = {
+    "legacy": ["--queue-size", "20", "--llm-concurrency", "1", "--local-concurrency", "1", "--session-max-active", "100"],
+    "grouped": [],
+}
+QUESTIONS = ["What should I eat after a workout?", "Is oatmeal a good breakfast?", "How can I eat more fiber?"]
+QUICK_ACTION = "🍽️ Meal Suggestions"
+
+
+def launch(port: int, flags, mock_url: str) -> subprocess.Popen:
+    env = dict(os.environ, OPENAI_API_KEY="sk-mock", OPENAI_BASE_URL=mock_url, GRADIO_ANALYTICS_ENABLED="False")
+    process = subprocess.Popen([sys.executable, "app.py", "--host", "127.0.0.1", "--port", str(port)] + flags,
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.3)
+    process.kill()
+    raise RuntimeError("app did not start")
+
+
+class Results:
+    def __init__(self):
+        self.latencies = {"local": [], "llm": []}
+        self.errors = {}
+        self.busy = 0
+        self._lock = threading.Lock()
+
+    def timed(self, kind: str, call):
+        start = time.perf_counter()
+        try:
+            result = call()
+        except Exception as error:
+            with self._lock:
+                name = "queue full" if "queue" in str(error).lower() else type(error).__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+            return None
+        with self._lock:
+            self.latencies[kind].append(time.perf_counter() - start)
+        return result
+
+
+def user(url: str, index: int, args, results: Results, busy_text: str):
+    client = Client(url, verbose=False)
+    # The first call of a client opens its event stream; keep that out of the samples
+    client.predict(QUICK_ACTION, "en", api_name="/handle_quick_action")
+    results.timed("local", lambda: client.predict(f"User {index}", 30, 70, 175, [], 2000, 100, 2.5,
+                                                  api_name="/update_profile"))
+    if args.burst_every and index % args.burst_every == 0:
+        jobs = [client.submit(QUESTIONS[i % len(QUESTIONS)], [], "en", api_name="/respond")
+                for i in range(args.messages)]
+        for job in jobs:
+            history = results.timed("llm", job.result)
+            if history and history[-1]["content"] == busy_text:
+                results.busy += 1
+        return
+    for i in range(args.messages):
+        results.timed("local", lambda: client.predict(QUICK_ACTION, "en", api_name="/handle_quick_action"))
+        history = results.timed("llm", lambda: client.predict(QUESTIONS[(index + i) % len(QUESTIONS)], [], "en",
+                                                               api_name="/respond"))
+        if history and history[-1]["content"] == busy_text:
+            results.busy += 1
+
+
+def run_scenario(name: str, flags, args, mock_url: str, busy_text: str):
+    process = launch(args.port, flags, mock_url)
+    url = f"http://127.0.0.1:{args.port}/"
+    results = Results()
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.users) as pool:
+            for future in [pool.submit(user, url, i, args, results, busy_text) for i in range(args.users)]:
+                future.result()
+        seconds = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+    replies = len(results.latencies["llm"]) - results.busy
+    print(f"\n{name}: {' '.join(flags) or 'defaults'}")
+    print(f"  {replies} replies in {seconds:.1f}s ({replies / seconds:.1f}/s), {results.busy} turned away as busy, "
+          f"errors: {results.errors or 'none'}")
+    for kind, samples in results.latencies.items():
+        if samples:
+            print(f"  {kind:<6} n={len(samples):<5} p50 {statistics.median(samples) * 1e3:8.0f} ms   "
+                  f"p95 {percentile(samples, 0.95) * 1e3:8.0f} ms   p99 {percentile(samples, 0.99) * 1e3:8.0f} ms")
+
+
+def main(args):
+    with open("translations.json", encoding="utf-8") as f:
+        busy_text = json.load(f)["en"]["bot"]["busy"]
+    with MockServer(port=args.mock_port, latency=args.latency, token_delay=args.token_delay) as server:
+        for name in args.scenarios:
+            run_scenario(name, SCENARIOS[name], args, server.base_url, busy_text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--messages", type=int, default=3, help="chat messages per user")
+    parser.add_argument("--burst-every", type=int, default=5, help="every n-th user sends all messages at once")
+    parser.add_argument("--latency", type=float, default=1.0, help="mock seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--port", type=int, default=7862)
+    parser.add_argument("--mock-port", type=int, default=8001)
+    main(parser.parse_args())
@@ -0,0 +1,131 @@
+"""Hit rate, lookup latency and index memory of the semantic response cache.
+
+Usage: python -m benchmarks.bench_semantic_cache [--queries 20000] [--entries 1000000] [--partition-entries 5000]
+
+Quality: replays ``--queries`` questions drawn Zipf-like from nutrition topics,
+each asked in one of several phrasings, through one cache partition per
+threshold. Every miss stores its answer, labelled with the topic it
+answers, so a hit is either correct (same topic) or a misfire. Reports hit
+rate and misfire rate per threshold; the ceiling is the share of repeated
+topics.
+
+Scale: fills caches to ``--entries`` answers (random unit vectors: search
+cost does not depend on content) and reports lookup latency and memory, with
+the index split into partitions of ``--partition-entries`` as in the app and
+as a single flat partition. Also reports the cost of vectorizing a question.
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from metrics import percentile
+from semantic_cache import SemanticCache, VECTOR_DIMENSIONS
+
+FOODS = ["rice", "brown rice", "oatmeal", "eggs", "salmon", "tofu", "lentils", "bananas", "avocado", "almonds",
+         "greek yogurt", "quinoa", "sweet potatoes", "chicken breast", "spinach", "whole wheat bread", "peanut butter",
+         "cottage cheese", "chickpeas", "blueberries"]
+# Topic -> phrasings of the same question
+TOPICS = {
+    "healthy": ["is {food} healthy", "Is {food} healthy?", "how healthy is {food}", "is {food} a healthy food",
+                "are {food} healthy for me?"],
+    "weight_loss": ["is {food} good for weight loss", "can I eat {food} when losing weight?",
+                    "{food} for weight loss", "does {food} help with weight loss?"],
+    "breakfast": ["is {food} good for breakfast", "Is {food} a good breakfast?", "{food} for breakfast?",
+                  "should I eat {food} at breakfast"],
+    "post_workout": ["is {food} good after a workout", "should I eat {food} after the gym?",
+                     "{food} after workout", "is {food} a good post workout snack"],
+    "daily_amount": ["how much {food} can I eat per day", "how much {food} per day is ok?",
+                     "daily amount of {food}", "how many servings of {food} a day"],
+    "diabetes": ["is {food} ok for diabetics", "can diabetics eat {food}?", "{food} and blood sugar",
+                 "does {food} raise blood sugar"],
+}
+THRESHOLDS = [0.75, 0.8, 0.85, 0.9, 0.95]
+
+
+def workload(count: int, seed: int):
+    """(question, topic label) pairs, popular topics first"""
+    rng = random.Random(seed)
+    labels = [(topic, food) for topic in TOPICS for food in FOODS]
+    rng.shuffle(labels)
+    weights = [1 / (rank + 1) for rank in range(len(labels))]
+    queries = []
+    for topic, food in rng.choices(labels, weights=weights, k=count):
+        queries.append((rng.choice(TOPICS[topic]).format(food=food), (topic, food)))
+    return queries
+
+
+def quality(args):
+    queries = workload(args.queries, args.seed)
+    ceiling = 1 - len({label for _, label in queries}) / len(queries)
+    print(f"{args.queries:,} questions over {len(TOPICS) * len(FOODS)} topics; at most {ceiling:.1%} can hit")
+    print(f"{'threshold':>10} {'hit rate':>9} {'misfires':>9} {'correct':>8}")
+    for threshold in THRESHOLDS:
+        cache = SemanticCache(threshold=threshold, max_entries=len(queries), partition_entries=len(queries))
+        labels = {}
+        correct = wrong = 0
+        for question, label in queries:
+            answer, vector = cache.lookup("en", question)
+            if answer is None:
+                if vector is not None:
+                    cache.add("en", vector, str(len(labels)))
+                    labels[str(len(labels))] = label
+            elif labels[answer] == label:
+                correct += 1
+            else:
+                wrong += 1
+        print(f"{threshold:>10.2f} {(correct + wrong) / len(queries):>9.1%} {wrong / len(queries):>9.1%} "
+              f"{correct / max(1, correct + wrong):>8.1%}")
+
+
+def fill(entries: int, partition_entries: int, seed: int):
+    rng = np.random.default_rng(seed)
+    partitions = max(1, entries // partition_entries)
+    cache = SemanticCache(max_entries=entries, partition_entries=partition_entries)
+    for start in range(0, entries, 10000):
+        block = rng.standard_normal((min(10000, entries - start), VECTOR_DIMENSIONS)).astype(np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        for offset, vector in enumerate(block):
+            cache.add((start + offset) % partitions, vector, "answer")
+    return cache, partitions
+
+
+def scale(args):
+    questions = [question for question, _ in workload(2000, args.seed)]
+    start = time.perf_counter()
+    vectors = [SemanticCache().vectorizer.transform(question) for question in questions]
+    vectorize_us = (time.perf_counter() - start) / len(vectors) * 1e6
+    print(f"\nvectorizing a question: {vectorize_us:.0f} µs")
+    print(f"{'entries':>10} {'partitions':>11} {'p50 lookup':>11} {'p99 lookup':>11} {'index memory':>13}")
+    layouts = [(args.entries, args.partition_entries)]
+    if not args.skip_flat:
+        layouts.append((args.entries, args.entries))
+    for entries, partition_entries in layouts:
+        cache, partitions = fill(entries, partition_entries, args.seed)
+        samples = []
+        rng = random.Random(args.seed)
+        for question in questions[:500]:
+            partition = rng.randrange(partitions)
+            begin = time.perf_counter()
+            cache.lookup(partition, question)
+            samples.append(time.perf_counter() - begin)
+        print(f"{cache.entries:>10,} {partitions:>11,} {statistics.median(samples) * 1e3:>9.3f}ms "
+              f"{percentile(samples, 0.99) * 1e3:>9.3f}ms {cache.memory_bytes() / 1e6:>10.0f} MB")
+        del cache
+
+
+def main(args):
+    quality(args)
+    scale(args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--partition-entries", type=int, default=5000)
+    parser.add_argument("--skip-flat", action="store_true", help="skip the single-partition layout (needs ~1 GB)")
+    parser.add_argument("--seed", type=int, default=3)
+    main(parser.parse_args())
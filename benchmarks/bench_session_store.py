@@ -0,0 +1,51 @@
+"""Memory footprint of the session store while sessions churn.
+
+Usage: python -m benchmarks.bench_session_store [--sessions 100000] [--max-sessions 2000] [--max-bytes 50000000]
+
+Every simulated visitor fills in a profile and chats for a few turns, then never
+comes back. Traced memory should level off once ``max_sessions`` is reached
+instead of growing with the total number of visitors; ``--max-bytes`` caps the
+sessions' estimated size as well.
+"""
+import argparse
+import os
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+from nutrition_bot import NutritionBot
+from session_store import SessionStore
+
+
+def simulate_visit(store: SessionStore, session_id: str, turns: int):
+    bot = store.get(session_id)
+    bot.update_user_data(f"user {session_id}", 30, 70.0, 175.0, ["🥬 Vegetarian"], 2200, 120, 2.5)
+    for turn in range(turns):
+        bot.conversation_history.append({"role": "user", "content": f"Question {turn} about lentil recipes?"})
+        bot.conversation_history.append({"role": "assistant", "content": "Lentils are rich in protein and fibre. " * 8})
+        bot._trim_history()
+    store.save(session_id, bot)
+
+
+def main(args):
+    store = SessionStore(NutritionBot, max_sessions=args.max_sessions, max_bytes=args.max_bytes,
+                         sizer=NutritionBot.approximate_size)
+    tracemalloc.start()
+    print(f"{'visitors':>9} {'live':>6} {'evicted':>8} {'traced MiB':>11} {'estimated MiB':>14}")
+    for i in range(1, args.sessions + 1):
+        simulate_visit(store, f"session-{i}", args.turns)
+        if i % args.report_every == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            print(f"{i:>9} {len(store):>6} {store.evictions:>8} {current / 2 ** 20:>11.1f} "
+                  f"{store.total_bytes / 2 ** 20:>14.1f}")
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--max-sessions", type=int, default=2000)
+    parser.add_argument("--max-bytes", type=int, default=50_000_000)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--report-every", type=int, default=10000)
+    main(parser.parse_args())
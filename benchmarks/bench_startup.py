@@ -0,0 +1,66 @@
+"""Cold-start cost of the app's modules, measured with ``python -X importtime``.
+
+Usage: python -m benchmarks.bench_startup [--runs 5] [--top 10] [--budget nutrition_bot=0.5]
+
+Each target runs in a fresh interpreter, without OPENAI_API_KEY, so nothing is
+cached between runs: importing ``nutrition_bot`` (chat logic and data
+tables), ``ui`` (adds Gradio), ``app`` (the entry point), and ``app.demo``
+(builds the interface as a launch does). Reports the median wall time per
+target and the slowest imports by cumulative time for each. ``--budget``
+exits non-zero when a target's median exceeds its limit in seconds, so the
+check can run in CI.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+TARGETS = {
+    "nutrition_bot": "import nutrition_bot",
+    "ui": "import ui",
+    "app": "import app",
+    "app.demo": "import app; app.demo",
+}
+
+
+def run_target(code: str):
+    """Wall seconds and the -X importtime lines (cumulative microseconds, module) of one cold run"""
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    env["GRADIO_ANALYTICS_ENABLED"] = "False"
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, capture_output=True,
+                            text=True, check=True)
+    seconds = time.perf_counter() - start
+    imports = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, module = line[len("import time:"):].split("|")
+            # Only top-level imports of the target; nested ones are included in their parent
+            if module.startswith("   ") and not module.startswith("     "):
+                imports.append((int(cumulative), module.strip()))
+    return seconds, imports
+
+
+def main(args):
+    budgets = dict((name, float(limit)) for name, limit in (item.split("=") for item in args.budget))
+    over = []
+    for name, code in TARGETS.items():
+        runs = [run_target(code) for _ in range(args.runs)]
+        median = statistics.median(seconds for seconds, _ in runs)
+        print(f"\n{name}: {median * 1e3:.0f} ms median wall time over {args.runs} runs")
+        for cumulative, module in sorted(runs[-1][1], reverse=True)[:args.top]:
+            print(f"  {cumulative / 1e3:8.1f} ms  {module}")
+        if name in budgets and median > budgets[name]:
+            over.append(f"{name} {median:.2f}s > {budgets[name]:.2f}s")
+    if over:
+        sys.exit("over budget: " + ", ".join(over))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest direct imports listed per target")
+    parser.add_argument("--budget", nargs="*", default=[], metavar="TARGET=SECONDS")
+    main(parser.parse_args())
@@ -0,0 +1,139 @@
+"""Throughput of ``serve.py`` as the number of worker processes grows.
+
+Usage: python -m benchmarks.bench_workers [--workers 1,2,4] [--users 32] [--messages 20]
+
+For each worker count, starts ``serve.py`` against the mock completion server
+with a SQLite state backend and drives it with ``--users`` gradio_client
+sessions, pinned round-robin to the worker ports as a sticky proxy would. Users
+ask profile questions that are answered locally, so each reply costs CPU in the
+worker (queueing, routing, streaming) rather than waiting on the model; every
+``--llm-every``-th message goes to the mock model instead. The clients run in
+``--client-processes`` processes of their own so they do not share one
+interpreter lock. Reports replies per second, latency percentiles and the
+speedup over the first worker count. Scaling is bounded by the cores of the
+machine, which the clients share with the workers.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from gradio_client import Client
+
+from benchmarks.mock_openai import MockServer
+from metrics import percentile
+
+LOCAL_QUESTIONS = ["What is my TDEE?", "How much protein do I need?", "How much water should I drink?",
+                   "What is my BMI?"]
+LLM_QUESTION = "What should I eat after a workout?"
+
+
+def start_workers(workers: int, port: int, mock_url: str, state_path: str) -> subprocess.Popen:
+    env = dict(os.environ, OPENAI_API_KEY="sk-mock", OPENAI_BASE_URL=mock_url, GRADIO_ANALYTICS_ENABLED="False",
+               STATE_BACKEND=f"sqlite:///{state_path}")
+    process = subprocess.Popen([sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1",
+                                "--port", str(port)], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    for worker_port in range(port, port + workers):
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{worker_port}/", timeout=1)
+                break
+            except OSError:
+                if time.time() > deadline:
+                    process.send_signal(signal.SIGTERM)
+                    raise RuntimeError("workers did not start")
+                time.sleep(0.3)
+    return process
+
+
+def question(user_index: int, message_index: int, llm_every: int) -> str:
+    if llm_every and message_index % llm_every == llm_every - 1:
+        return LLM_QUESTION
+    return LOCAL_QUESTIONS[(user_index + message_index) % len(LOCAL_QUESTIONS)]
+
+
+def client_process(urls, users, messages: int, llm_every: int, ready, go):
+    """Runs ``users`` (indexes) against ``urls`` in threads; returns all reply latencies"""
+    with ThreadPoolExecutor(len(users)) as pool:
+        # Connect and set profiles before the clock starts
+        clients = list(pool.map(lambda i: Client(urls[i % len(urls)], verbose=False), users))
+        for client, i in zip(clients, users):
+            client.predict(f"User {i}", 30, 70, 175, [], 2000, 100, 2.5, api_name="/update_profile")
+        ready.wait()
+        go.wait()
+
+        def run(pair):
+            client, index = pair
+            latencies = []
+            for i in range(messages):
+                start = time.perf_counter()
+                client.predict(question(index, i, llm_every), [], "en", api_name="/respond")
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        return [latency for latencies in pool.map(run, zip(clients, users)) for latency in latencies]
+
+
+def run(workers: int, args, mock_url: str):
+    state_path = f"bench_workers_{workers}.db"
+    process = start_workers(workers, args.port, mock_url, state_path)
+    urls = [f"http://127.0.0.1:{args.port + i}/" for i in range(workers)]
+    processes = min(args.client_processes, args.users)
+    try:
+        with multiprocessing.Manager() as manager, multiprocessing.Pool(processes) as pool:
+            ready, go = manager.Barrier(processes + 1), manager.Event()
+            pending = pool.starmap_async(client_process, [
+                (urls, list(range(p, args.users, processes)), args.messages, args.llm_every, ready, go)
+                for p in range(processes)
+            ])
+            ready.wait()
+            start = time.perf_counter()
+            go.set()
+            latencies = [latency for part in pending.get() for latency in part]
+            seconds = time.perf_counter() - start
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(state_path + suffix):
+                os.remove(state_path + suffix)
+    return len(latencies) / seconds, latencies
+
+
+def main(args):
+    print(f"{os.cpu_count()} cores, {args.users} users x {args.messages} messages, "
+          f"{args.client_processes} client processes")
+    print(f"{'workers':>8} {'replies/s':>10} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    baseline = None
+    with MockServer(port=args.mock_port, latency=args.latency, token_delay=args.token_delay) as server:
+        for workers in args.workers:
+            throughput, latencies = run(workers, args, server.base_url)
+            baseline = baseline or throughput
+            print(f"{workers:>8} {throughput:>10.1f} {throughput / baseline:>7.2f}x "
+                  f"{statistics.median(latencies) * 1e3:>8.0f} {percentile(latencies, 0.95) * 1e3:>8.0f} "
+                  f"{percentile(latencies, 0.99) * 1e3:>8.0f}")
+
+
+def int_list(text: str):
+    return [int(part) for part in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int_list, default=[1, 2, 4])
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--messages", type=int, default=20, help="chat messages per user")
+    parser.add_argument("--llm-every", type=int, default=0, help="every n-th message goes to the model (0: none)")
+    parser.add_argument("--client-processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--port", type=int, default=7870)
+    parser.add_argument("--mock-port", type=int, default=8001)
+    main(parser.parse_args())
@@ -0,0 +1,191 @@
+"""Minimal OpenAI-compatible chat completion server for offline benchmarks.
+
+Run standalone with ``python -m benchmarks.mock_openai --latency 0.2`` and point
+the app at it with ``OPENAI_BASE_URL=http://127.0.0.1:8001/v1``.
+
+Faults can be injected with ``--error-rate``/``--error-status``/``--retry-after``,
+and streams cut off halfway with ``--drop-rate``, or at runtime by changing the
+same fields on ``app.state``. ``--token-rate`` sets the streaming speed in
+tokens per second and ``--jitter`` spreads the first-token latency.
+
+Prompt caching is simulated as OpenAI reports it: ``cached_tokens`` in
+``usage.prompt_tokens_details`` counts the longest run of leading messages
+already seen, from ``--cache-min-tokens`` and in steps of 128 tokens.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_REPLY = (
+    "A balanced plate is half vegetables, a quarter lean protein and a quarter whole grains. "
+    "What does a typical lunch look like for you?"
+)
+
+
+def create_app(latency: float = 0.2, token_delay: float = 0.01, reply: str = DEFAULT_REPLY,
+               error_rate: float = 0.0, error_status: int = 500, retry_after: float = None,
+               jitter: float = 0.0, drop_rate: float = 0.0, cache_min_tokens: int = 1024) -> FastAPI:
+    """``latency`` is the delay before the first token, ``token_delay`` the gap between streamed tokens.
+
+    The first-token delay is drawn uniformly from ``latency`` +/- ``jitter``. A
+    fraction ``error_rate`` of requests fails with ``error_status``, carrying a
+    Retry-After header when ``retry_after`` is set, and a fraction ``drop_rate``
+    of streams stops halfway without a final chunk, as a dropped connection does.
+    """
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.errors = 0
+    app.state.error_rate = error_rate
+    app.state.error_status = error_status
+    app.state.retry_after = retry_after
+    app.state.drop_rate = drop_rate
+    app.state.drops = 0
+    app.state.prompt_tokens = 0
+    app.state.cached_tokens = 0
+    seen_prefixes = set()
+
+    def cached_tokens(messages) -> int:
+        digest = hashlib.sha256()
+        tokens = cached = 0
+        for message in messages:
+            digest.update(json.dumps(message, sort_keys=True).encode("utf-8"))
+            tokens += len(message.get("content", "").split())
+            key = digest.hexdigest()
+            if key in seen_prefixes:
+                cached = tokens
+            seen_prefixes.add(key)
+        return cached - cached % 128 if cached >= cache_min_tokens else 0
+
+    def usage(messages) -> dict:
+        # Whitespace-separated words stand in for tokens
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in messages)
+        completion_tokens = len(reply.split())
+        cached = cached_tokens(messages)
+        app.state.prompt_tokens += prompt_tokens
+        app.state.cached_tokens += cached
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+
+    async def stream_reply(completion_id: str, model: str, final_usage: dict = None):
+        words = reply.split(" ")
+        drop_at = len(words) // 2 if app.state.drop_rate and random.random() < app.state.drop_rate else None
+        for i, word in enumerate(words):
+            if i == drop_at:
+                app.state.drops += 1
+                raise ConnectionResetError("injected stream drop")
+            if i:
+                await asyncio.sleep(token_delay)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        if final_usage is not None:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": final_usage,
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests, "errors": app.state.errors, "drops": app.state.drops,
+                "prompt_tokens": app.state.prompt_tokens, "cached_tokens": app.state.cached_tokens}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        if app.state.error_rate and random.random() < app.state.error_rate:
+            app.state.errors += 1
+            headers = {"retry-after": str(app.state.retry_after)} if app.state.retry_after is not None else None
+            error = {"message": "Injected failure", "type": "mock_error", "param": None, "code": None}
+            return JSONResponse({"error": error}, status_code=app.state.error_status, headers=headers)
+        await asyncio.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            return StreamingResponse(
+                stream_reply(f"chatcmpl-{uuid.uuid4().hex}", body.get("model", "mock"),
+                             usage(body.get("messages", [])) if include_usage else None),
+                media_type="text/event-stream",
+            )
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+            }],
+            "usage": usage(body.get("messages", [])),
+        }
+
+    return app
+
+
+class MockServer:
+    """Runs the mock server on a background thread for the duration of a ``with`` block."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8001, **app_kwargs):
+        self.app = create_app(**app_kwargs)
+        self.base_url = f"http://{host}:{port}/v1"
+        config = uvicorn.Config(self.app, host=host, port=port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="first-token latency varies by up to this +/-")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed tokens")
+    parser.add_argument("--token-rate", type=float, default=None, help="streamed tokens per second (overrides --token-delay)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After seconds on injected failures")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of streams cut off halfway")
+    parser.add_argument("--reply-words", type=int, default=None, help="repeat the canned reply to this many words")
+    parser.add_argument("--cache-min-tokens", type=int, default=1024, help="shortest prompt prefix reported as cached")
+    args = parser.parse_args()
+    token_delay = 1 / args.token_rate if args.token_rate else args.token_delay
+    words = DEFAULT_REPLY.split(" ")
+    reply = " ".join(words[i % len(words)] for i in range(args.reply_words)) if args.reply_words else DEFAULT_REPLY
+    app = create_app(latency=args.latency, reply=reply, token_delay=token_delay, error_rate=args.error_rate,
+                     error_status=args.error_status, retry_after=args.retry_after, jitter=args.jitter,
+                     drop_rate=args.drop_rate, cache_min_tokens=args.cache_min_tokens)
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,114 @@
+import os
+import logging
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prompt tokens available for the pinned system message, summary and recent turns
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))
+# Fold turns that no longer fit into a short summary instead of dropping them silently
+CONTEXT_SUMMARY = os.getenv("CONTEXT_SUMMARY", "1") == "1"
+SUMMARY_MAX_TOPICS = 8
+SUMMARY_TOPIC_CHARS = 80
+# Upper bound on the summary message: header plus SUMMARY_MAX_TOPICS topics of at most SUMMARY_TOPIC_CHARS
+SUMMARY_RESERVE_TOKENS = 200
+
+# The first turn of the window moves in steps of this many messages, so consecutive prompts
+# keep the same prefix (and the provider's prompt cache) until the window next moves
+WINDOW_STEP = 4
+
+# Per-message framing tokens used by the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+
+try:
+    import tiktoken
+    _encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+except Exception:  # tiktoken missing or its encoding files unavailable offline
+    _encoding = None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when available, else a ~4 characters per token estimate"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages) + REPLY_PRIMING_TOKENS
+
+
+def _topic(message: str, max_chars: int = SUMMARY_TOPIC_CHARS) -> str:
+    first_line = message.strip().splitlines()[0] if message.strip() else ""
+    return first_line if len(first_line) <= max_chars else first_line[:max_chars - 1].rstrip() + "…"
+
+
+def fold_into_summary(summary: str, turns: List[Dict[str, str]]) -> str:
+    """Extend a rolling summary with the user questions from ``turns``, keeping the newest topics"""
+    topics = summary.split("\n- ")[1:] if summary else []
+    topics.extend(_topic(turn["content"]) for turn in turns if turn["role"] == "user")
+    topics = topics[-SUMMARY_MAX_TOPICS:]
+    if not topics:
+        return ""
+    return "Earlier in this conversation the user asked about:\n- " + "\n- ".join(topics)
+
+
+class ContextWindow:
+    """Builds the prompt for a completion within a token budget.
+
+    The merged system prompt + user profile is always sent first. The remaining
+    budget is filled with the most recent turns, starting on a multiple of
+    ``step``; older turns are folded into a short summary message when
+    ``summarize`` is on.
+    """
+
+    def __init__(self, budget_tokens: int = CONTEXT_TOKEN_BUDGET, summarize: bool = CONTEXT_SUMMARY,
+                 step: int = WINDOW_STEP):
+        self.budget_tokens = budget_tokens
+        self.summarize = summarize
+        self.step = step
+        self.requests = 0
+        self.tokens_saved = 0
+
+    def build(self, system_content: str, history: List[Dict[str, str]],
+              summary: str = "") -> Tuple[List[Dict[str, str]], int]:
+        """Return the messages to send and their prompt token count"""
+        pinned = {"role": "system", "content": system_content}
+        used = count_message_tokens([pinned])
+        turn_tokens = [count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in history]
+        if self.summarize and (summary or used + sum(turn_tokens) > self.budget_tokens):
+            used += SUMMARY_RESERVE_TOKENS
+
+        # Newest turns first; the latest message is always sent even if it overflows the budget
+        start = len(history)
+        while start > 0 and (start == len(history) or used + turn_tokens[start - 1] <= self.budget_tokens):
+            used += turn_tokens[start - 1]
+            start -= 1
+        if start and self.step > 1:
+            start = min(len(history) - 1, -(-start // self.step) * self.step)
+
+        messages = [pinned]
+        if self.summarize:
+            summary = fold_into_summary(summary, history[:start]) if start else summary
+            if summary:
+                messages.append({"role": "system", "content": summary})
+        messages.extend(history[start:])
+        return messages, count_message_tokens(messages)
+
+    def record_savings(self, messages: List[Dict[str, str]], prompt_tokens: int,
+                       previous_prefix: List[Dict[str, str]]):
+        """Log the prompt tokens saved against the previous layout for the same turns.
+
+        That layout sent the system prompt, then a second copy of it merged with the
+        profile, then the assessment greeting, ahead of the conversation turns.
+        """
+        turns = [m for m in messages if m["role"] != "system"]
+        previous_layout_tokens = count_message_tokens(previous_prefix + turns)
+        saved = previous_layout_tokens - prompt_tokens
+        self.requests += 1
+        self.tokens_saved += saved
+        logger.info("prompt tokens: %d (previous layout %d, saved %d; %d saved over %d requests)",
+                    prompt_tokens, previous_layout_tokens, saved, self.tokens_saved, self.requests)
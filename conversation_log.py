@@ -0,0 +1,161 @@
+"""Durable, append-only conversation log in SQLite.
+
+Each conversation (a signed-in user, or else a browser session) keeps its
+profile, rolling summary and every turn. Appends are a single indexed insert
+whatever the length of the log, and sessions load only the recent window they
+put in the prompt, so a resumed session does not hold its full history in
+memory. Every ``compact_every`` appends, turns beyond the newest ``max_turns``
+of each conversation are deleted.
+
+Export or compact from the command line:
+
+    python conversation_log.py export <conversation_id> > conversation.jsonl
+    python conversation_log.py compact
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+from state_backend import connect_sqlite
+
+load_dotenv()
+
+# SQLite file for conversation logs; empty keeps conversations in memory only
+CONVERSATION_LOG_PATH = os.getenv("CONVERSATION_LOG_PATH", "")
+# Turns kept per conversation by compaction (0 keeps them all)
+CONVERSATION_LOG_MAX_TURNS = int(os.getenv("CONVERSATION_LOG_MAX_TURNS", "10000"))
+# Appends between two compaction passes
+COMPACT_EVERY = 1000
+
+
+class Conversation(NamedTuple):
+    profile: Optional[list]
+    summary: str
+    turns: List[Dict[str, str]]
+
+
+class ConversationLog:
+    def __init__(self, path: str, max_turns: int = CONVERSATION_LOG_MAX_TURNS, compact_every: int = COMPACT_EVERY):
+        self.path = path
+        self.max_turns = max_turns
+        self.compact_every = compact_every
+        self._local = threading.local()
+        self._appends = 0
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS conversations (id TEXT PRIMARY KEY, profile TEXT, "
+            "summary TEXT NOT NULL DEFAULT '', turns INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS turns (conversation TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, "
+            "content TEXT NOT NULL, ts REAL NOT NULL, PRIMARY KEY (conversation, seq)) WITHOUT ROWID"
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = connect_sqlite(self.path)
+        return connection
+
+    def append(self, conversation_id: str, role: str, content: str) -> int:
+        """Add a turn and return its sequence number (1 for the first turn)"""
+        now = time.time()
+        connection = self._connection()
+        # The per-conversation counter gives the next sequence number without scanning the turns
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT INTO conversations (id, turns, updated_at) VALUES (?, 1, ?) "
+                "ON CONFLICT (id) DO UPDATE SET turns = turns + 1, updated_at = excluded.updated_at",
+                (conversation_id, now),
+            )
+            seq = connection.execute("SELECT turns FROM conversations WHERE id = ?", (conversation_id,)).fetchone()[0]
+            connection.execute("INSERT INTO turns (conversation, seq, role, content, ts) VALUES (?, ?, ?, ?, ?)",
+                               (conversation_id, seq, role, content, now))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self._appends += 1
+        if self.compact_every and self._appends % self.compact_every == 0:
+            self.compact()
+        return seq
+
+    def _update(self, conversation_id: str, column: str, value: str):
+        self._connection().execute(
+            f"INSERT INTO conversations (id, {column}, updated_at) VALUES (?, ?, ?) "
+            f"ON CONFLICT (id) DO UPDATE SET {column} = excluded.{column}, updated_at = excluded.updated_at",
+            (conversation_id, value, time.time()),
+        )
+
+    def save_profile(self, conversation_id: str, profile: list):
+        self._update(conversation_id, "profile", json.dumps(profile, ensure_ascii=False))
+
+    def save_summary(self, conversation_id: str, summary: str):
+        self._update(conversation_id, "summary", summary)
+
+    def recent(self, conversation_id: str, limit: int) -> List[Dict[str, str]]:
+        """The last ``limit`` turns, oldest first"""
+        rows = self._connection().execute(
+            "SELECT role, content FROM turns WHERE conversation = ? ORDER BY seq DESC LIMIT ?", (conversation_id, limit)
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def load(self, conversation_id: str, window: int) -> Optional[Conversation]:
+        """Profile, summary and the last ``window`` turns, or None for an unknown conversation"""
+        row = self._connection().execute(
+            "SELECT profile, summary FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        profile = json.loads(row[0]) if row[0] else None
+        return Conversation(profile, row[1], self.recent(conversation_id, window))
+
+    def export(self, conversation_id: str) -> Iterator[Dict]:
+        """Every retained turn, oldest first, streamed from the database"""
+        cursor = self._connection().execute(
+            "SELECT seq, role, content, ts FROM turns WHERE conversation = ? ORDER BY seq", (conversation_id,)
+        )
+        for seq, role, content, ts in cursor:
+            yield {"seq": seq, "role": role, "content": content, "ts": ts}
+
+    def compact(self) -> int:
+        """Delete turns beyond the newest ``max_turns`` of each conversation; returns the number deleted"""
+        if not self.max_turns:
+            return 0
+        connection = self._connection()
+        deleted = 0
+        # Primary-key range deletes, so a pass costs little once the long conversations are trimmed
+        for conversation_id, turns in connection.execute(
+            "SELECT id, turns FROM conversations WHERE turns > ?", (self.max_turns,)
+        ).fetchall():
+            deleted += connection.execute("DELETE FROM turns WHERE conversation = ? AND seq <= ?",
+                                          (conversation_id, turns - self.max_turns)).rowcount
+        return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or compact the conversation log")
+    parser.add_argument("--path", default=CONVERSATION_LOG_PATH or "conversations.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write one conversation as JSON lines to stdout")
+    export.add_argument("conversation_id")
+    commands.add_parser("compact", help=f"keep the newest {CONVERSATION_LOG_MAX_TURNS} turns of each conversation")
+    args = parser.parse_args()
+
+    log = ConversationLog(args.path)
+    if args.command == "export":
+        for turn in log.export(args.conversation_id):
+            sys.stdout.write(json.dumps(turn, ensure_ascii=False) + "\n")
+    else:
+        print(f"deleted {log.compact()} turns")
+
+
+if __name__ == "__main__":
+    main()
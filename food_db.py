@@ -0,0 +1,218 @@
+"""Bundled food-composition table with name lookups.
+
+Nutrient values are per 100 g (USDA-style, see data/foods.csv) and are held in
+one contiguous float32 array per nutrient; missing values are NaN. Names and
+aliases in every language are indexed for exact, prefix and fuzzy lookups and
+for spotting foods mentioned in free text.
+"""
+import bisect
+import csv
+import os
+import re
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from nutrition_classifier import words_pattern
+
+FOOD_DB_PATH = os.getenv("FOOD_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "foods.csv"))
+
+NUTRIENTS = ("energy_kcal", "protein_g", "carbohydrate_g", "fat_g", "fiber_g", "sugars_g",
+             "calcium_mg", "iron_mg", "potassium_mg", "sodium_mg", "vitamin_c_mg")
+NUTRIENT_UNITS = {nutrient: nutrient.rsplit("_", 1)[1] for nutrient in NUTRIENTS}
+
+# Questions about a larger amount than this are treated as a typo rather than scaled
+MAX_PORTION_GRAMS = 5000
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation so "Œufs," and "oeufs" compare equal"""
+    text = text.lower().replace("œ", "oe").replace("æ", "ae")
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodTable:
+    """Columnar per-100 g nutrient store with a name index"""
+
+    def __init__(self, names: List[str], names_fr: List[str], aliases: List[List[str]], diets: List[set],
+                 staple: np.ndarray, values: np.ndarray):
+        self.names = names
+        self.names_fr = names_fr
+        self.diets = diets
+        self.staple = staple
+        # Shape (len(NUTRIENTS), rows): each nutrient is one contiguous column
+        self.values = values
+
+        keys: Dict[str, int] = {}
+        short_keys: Dict[str, int] = {}
+        for row, terms in enumerate(aliases):
+            for term in [names[row].split(",")[0]] + terms:
+                short_keys.setdefault(normalize(term), row)
+        # Singular/plural variants never override a name or alias
+        for key, row in list(short_keys.items()):
+            variant = key[:-1] if key.endswith("s") and len(key) > 3 else key + "s"
+            short_keys.setdefault(variant, row)
+        for row in range(len(names)):
+            for term in (names[row], names_fr[row]):
+                keys.setdefault(normalize(term), row)
+        for key, row in short_keys.items():
+            keys.setdefault(key, row)
+        keys.pop("", None)
+        self._keys = keys
+        self._max_key_words = max(len(key.split()) for key in keys)
+
+        self._sorted_keys = sorted(keys)
+        self._sorted_rows = np.array([keys[key] for key in self._sorted_keys], dtype=np.int32)
+        # Fuzzy matching only considers short names and aliases, which is what people type
+        self._fuzzy_keys = sorted(key for key in short_keys if key)
+        self._fuzzy_rows = np.array([short_keys[key] for key in self._fuzzy_keys], dtype=np.int32)
+        postings: Dict[str, List[int]] = {}
+        for index, key in enumerate(self._fuzzy_keys):
+            for gram in _trigrams(key):
+                postings.setdefault(gram, []).append(index)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._trigram_counts = np.array([len(_trigrams(key)) for key in self._fuzzy_keys], dtype=np.int32)
+
+    @classmethod
+    def load(cls, path: str = FOOD_DB_PATH) -> "FoodTable":
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        values = np.array([[float(row[n]) if row[n] != "" else np.nan for row in rows] for n in NUTRIENTS],
+                          dtype=np.float32)
+        return cls(
+            names=[row["name"] for row in rows],
+            names_fr=[row["name_fr"] for row in rows],
+            aliases=[[a for a in row["aliases"].split(";") if a] for row in rows],
+            diets=[set(row["diets"].split()) for row in rows],
+            staple=np.array([row["staple"] == "1" for row in rows]),
+            values=values,
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def display_name(self, row: int, lang: str = "en") -> str:
+        return self.names_fr[row] if lang == "fr" else self.names[row]
+
+    def nutrients(self, row: int, grams: float = 100) -> Dict[str, float]:
+        """Known nutrient values of ``row`` for a portion of ``grams``"""
+        column = self.values[:, row] * (grams / 100)
+        return {nutrient: float(v) for nutrient, v in zip(NUTRIENTS, column) if not np.isnan(v)}
+
+    def exact(self, name: str) -> Optional[int]:
+        return self._keys.get(normalize(name))
+
+    def complete(self, prefix: str, limit: int = 10) -> List[int]:
+        """Rows whose name or an alias starts with ``prefix``, in name order"""
+        prefix = normalize(prefix)
+        rows = []
+        index = bisect.bisect_left(self._sorted_keys, prefix)
+        while index < len(self._sorted_keys) and self._sorted_keys[index].startswith(prefix):
+            row = int(self._sorted_rows[index])
+            if row not in rows:
+                rows.append(row)
+                if len(rows) == limit:
+                    break
+            index += 1
+        return rows
+
+    def fuzzy(self, name: str, limit: int = 5, cutoff: float = 0.4) -> List[int]:
+        """Rows whose name or an alias is close to ``name`` by trigram Jaccard similarity, best first"""
+        grams = _trigrams(normalize(name))
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self._fuzzy_keys))
+        similarity = shared / (len(grams) + self._trigram_counts - shared)
+        rows = []
+        top = min(limit * 4, len(similarity))
+        candidates = np.argpartition(-similarity, top - 1)[:top]
+        for index in candidates[np.argsort(-similarity[candidates], kind="stable")]:
+            if similarity[index] < cutoff:
+                break
+            row = int(self._fuzzy_rows[index])
+            if row not in rows:
+                rows.append(row)
+        return rows[:limit]
+
+    def find(self, name: str) -> Optional[int]:
+        """Best row for a food name: exact, then prefix, then fuzzy match"""
+        row = self.exact(name)
+        if row is None:
+            rows = self.complete(name, limit=1) or self.fuzzy(name, limit=1)
+            row = rows[0] if rows else None
+        return row
+
+    def mentions(self, text: str) -> List[int]:
+        """Rows of foods named in free text, longest names first, in order of appearance"""
+        tokens = normalize(text).split()
+        rows = []
+        i = 0
+        while i < len(tokens):
+            for n in range(min(self._max_key_words, len(tokens) - i), 0, -1):
+                row = self._keys.get(" ".join(tokens[i:i + n]))
+                if row is not None:
+                    if row not in rows:
+                        rows.append(row)
+                    i += n
+                    break
+            else:
+                i += 1
+        return rows
+
+    def staples(self, diets: Iterable[str] = (), limit: int = 8) -> List[int]:
+        """Common foods compatible with every diet in ``diets``"""
+        diets = set(diets)
+        return [row for row in np.flatnonzero(self.staple).tolist() if diets <= self.diets[row]][:limit]
+
+
+class FoodQuery(NamedTuple):
+    nutrients: Tuple[str, ...]
+    grams: float
+    asks_amount: bool
+    # The question with the nutrient terms blanked out, so "sugar" is not also read as a food
+    remainder: str
+
+
+class FoodQueryParser:
+    """Finds which nutrients, and for what portion, a question asks about, in any configured language"""
+
+    def __init__(self, nutrient_terms: Dict[str, Iterable[str]], quantity_words: Iterable[str]):
+        self._nutrients = re.compile(
+            "|".join(f"(?P<{nutrient}>{words_pattern(nutrient_terms[nutrient])})" for nutrient in NUTRIENTS),
+            re.IGNORECASE,
+        )
+        self._quantity = re.compile(words_pattern(quantity_words), re.IGNORECASE)
+        self._grams = re.compile(r"(\d+(?:[.,]\d+)?)\s*(?:g|grams?|grammes?)\b", re.IGNORECASE)
+
+    @classmethod
+    def from_translations(cls, translations: Dict) -> "FoodQueryParser":
+        terms = {nutrient: [] for nutrient in NUTRIENTS}
+        quantity_words = []
+        for lang_texts in translations.values():
+            for nutrient in NUTRIENTS:
+                terms[nutrient].extend(term.lower() for term in lang_texts["food_facts"]["nutrients"][nutrient])
+            quantity_words.extend(term.lower() for term in lang_texts["food_facts"]["quantity_words"])
+        return cls(terms, quantity_words)
+
+    def parse(self, query: str) -> FoodQuery:
+        found = {match.lastgroup for match in self._nutrients.finditer(query)}
+        grams = 100.0
+        match = self._grams.search(query)
+        if match:
+            grams = float(match.group(1).replace(",", ".")) or 100.0
+            if grams > MAX_PORTION_GRAMS:
+                grams = 100.0
+        return FoodQuery(
+            nutrients=tuple(nutrient for nutrient in NUTRIENTS if nutrient in found),
+            grams=grams,
+            asks_amount=bool(match or self._quantity.search(query)),
+            remainder=self._nutrients.sub(" ", query) if found else query,
+        )
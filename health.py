@@ -0,0 +1,172 @@
+"""Vectorized health calculations for batch onboarding.
+
+Mirrors the per-profile formulas of ``NutritionBot`` (Mifflin-St Jeor BMR,
+moderate activity TDEE, protein and water needs, BMI category and target
+alignment) over NumPy arrays, and streams CSV files through them in chunks:
+
+    python health.py cohort.csv assessed.csv --chunk-size 100000
+
+``bmi_category`` and ``alignment`` classify a single profile with the same
+thresholds, for the bot's own assessment.
+"""
+import argparse
+import bisect
+import csv
+import sys
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+ACTIVITY_FACTOR = 1.55
+PROTEIN_G_PER_KG = 1.6
+WATER_L_PER_KG = 0.033
+
+BMI_CATEGORIES = ("Not available", "Underweight", "Normal weight", "Overweight", "Obese")
+BMI_THRESHOLDS = (18.5, 25, 30)
+
+ALIGNMENT_LEVELS = ("not set", "aligned", "moderate", "significant")
+# (moderate, significant) percentage differences between a target and the estimated need
+CALORIE_ALIGNMENT_THRESHOLDS = (15, 30)
+PROTEIN_ALIGNMENT_THRESHOLDS = (25, 50)
+WATER_ALIGNMENT_THRESHOLDS = (15, 30)
+
+INPUT_COLUMNS = ("age", "weight", "height", "calorie_target", "protein_target", "water_target")
+OUTPUT_COLUMNS = ("bmi", "bmi_category", "bmr", "tdee", "protein_needs", "water_needs",
+                  "calorie_alignment", "protein_alignment", "water_alignment")
+
+
+def _as_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _present(values: np.ndarray) -> np.ndarray:
+    # Same truthiness as the per-profile path: missing (NaN) and zero both count as unset
+    return np.nan_to_num(values, nan=0.0) != 0
+
+
+def _alignment(target: np.ndarray, needs: np.ndarray, thresholds) -> np.ndarray:
+    moderate, significant = thresholds
+    with np.errstate(divide="ignore", invalid="ignore"):
+        diff_percent = np.abs(target - needs) / needs * 100
+    levels = np.where(diff_percent > significant, 3, np.where(diff_percent > moderate, 2, 1))
+    return np.where(_present(target) & _present(needs), levels, 0).astype(np.int8)
+
+
+def assess_batch(age, weight, height, calories=None, protein=None, water=None) -> Dict[str, np.ndarray]:
+    """Health metrics for arrays of profiles; missing values are NaN.
+
+    ``bmi_category`` indexes into ``BMI_CATEGORIES`` and the ``*_alignment``
+    arrays index into ``ALIGNMENT_LEVELS``.
+    """
+    age, weight, height = _as_array(age), _as_array(weight), _as_array(height)
+    size = age.shape
+    calories = _as_array(calories) if calories is not None else np.full(size, np.nan)
+    protein = _as_array(protein) if protein is not None else np.full(size, np.nan)
+    water = _as_array(water) if water is not None else np.full(size, np.nan)
+
+    has_weight = _present(weight)
+    has_body = has_weight & _present(height)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bmi = np.where(has_body, np.round(weight / (height / 100) ** 2, 1), np.nan)
+    bmi_category = np.where(np.isnan(bmi), 0, np.searchsorted(BMI_THRESHOLDS, bmi, side="right") + 1).astype(np.int8)
+
+    bmr = np.where(has_body & _present(age), 10 * weight + 6.25 * height - 5 * age + 5, 0.0)
+    tdee = bmr * ACTIVITY_FACTOR
+    protein_needs = np.where(has_weight, weight * PROTEIN_G_PER_KG, 0.0)
+    water_needs = np.where(has_weight, weight * WATER_L_PER_KG, 0.0)
+
+    return {
+        "bmi": bmi,
+        "bmi_category": bmi_category,
+        "bmr": bmr,
+        "tdee": tdee,
+        "protein_needs": protein_needs,
+        "water_needs": water_needs,
+        "calorie_alignment": _alignment(calories, tdee, CALORIE_ALIGNMENT_THRESHOLDS),
+        "protein_alignment": _alignment(protein, protein_needs, PROTEIN_ALIGNMENT_THRESHOLDS),
+        "water_alignment": _alignment(water, water_needs, WATER_ALIGNMENT_THRESHOLDS),
+    }
+
+
+def bmi_category(bmi: Optional[float]) -> str:
+    """Entry of ``BMI_CATEGORIES`` for one profile's BMI"""
+    if not bmi:
+        return BMI_CATEGORIES[0]
+    return BMI_CATEGORIES[bisect.bisect_right(BMI_THRESHOLDS, bmi) + 1]
+
+
+def alignment(target: Optional[float], needs: float, thresholds) -> str:
+    """Entry of ``ALIGNMENT_LEVELS`` for one profile's target against its estimated need"""
+    if not target or not needs:
+        return ALIGNMENT_LEVELS[0]
+    moderate, significant = thresholds
+    diff_percent = abs(target - needs) / needs * 100
+    return ALIGNMENT_LEVELS[3 if diff_percent > significant else 2 if diff_percent > moderate else 1]
+
+
+def _parse_column(rows: List[Dict[str, str]], column: str) -> np.ndarray:
+    return np.array([float(row.get(column) or "nan") for row in rows], dtype=np.float64)
+
+
+def _iter_chunks(reader: csv.DictReader, chunk_size: int) -> Iterator[List[Dict[str, str]]]:
+    chunk = []
+    for row in reader:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def assess_csv(source, destination, chunk_size: int = 100000) -> int:
+    """Stream a CSV of profiles through ``assess_batch``; memory is bounded by ``chunk_size`` rows"""
+    reader = csv.DictReader(source)
+    missing = [column for column in INPUT_COLUMNS[:3] if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Input CSV is missing required columns: {', '.join(missing)}")
+    writer = csv.DictWriter(destination, fieldnames=list(reader.fieldnames) + list(OUTPUT_COLUMNS))
+    writer.writeheader()
+    total = 0
+    for rows in _iter_chunks(reader, chunk_size):
+        columns = {column: _parse_column(rows, column) for column in INPUT_COLUMNS}
+        results = assess_batch(columns["age"], columns["weight"], columns["height"],
+                               columns["calorie_target"], columns["protein_target"], columns["water_target"])
+        formatted = {
+            "bmi": ["" if np.isnan(v) else f"{v:.1f}" for v in results["bmi"]],
+            "bmi_category": [BMI_CATEGORIES[c] for c in results["bmi_category"]],
+            "bmr": [f"{v:.0f}" for v in results["bmr"]],
+            "tdee": [f"{v:.0f}" for v in results["tdee"]],
+            "protein_needs": [f"{v:.0f}" for v in results["protein_needs"]],
+            "water_needs": [f"{v:.1f}" for v in results["water_needs"]],
+        }
+        for column in ("calorie_alignment", "protein_alignment", "water_alignment"):
+            formatted[column] = [ALIGNMENT_LEVELS[c] for c in results[column]]
+        for i, row in enumerate(rows):
+            row.update({column: formatted[column][i] for column in OUTPUT_COLUMNS})
+        writer.writerows(rows)
+        total += len(rows)
+    return total
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Assess a cohort CSV of profiles in bounded-memory chunks.")
+    parser.add_argument("input", help="CSV with age, weight, height and optional *_target columns ('-' for stdin)")
+    parser.add_argument("output", help="destination CSV ('-' for stdout)")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    destination = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        total = assess_csv(source, destination, args.chunk_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if destination is not sys.stdout:
+            destination.close()
+    print(f"Assessed {total} profiles", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
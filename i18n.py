@@ -0,0 +1,54 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict
+
+TRANSLATIONS_PATH = "translations.json"
+# Language of new sessions; each session then carries its own in gr.State
+DEFAULT_LANG = "en"
+
+
+def flatten(tree: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested translation dicts into dotted keys, e.g. ``chat.send_button``"""
+    flat = {}
+    for key, value in tree.items():
+        dotted = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, dotted + "."))
+        else:
+            flat[dotted] = value
+    return flat
+
+
+def check_key_parity(tables: Dict[str, Dict[str, Any]], reference: str = "en"):
+    """Raise ValueError if any language is missing keys present in another"""
+    expected = set(tables[reference])
+    problems = []
+    for lang, table in tables.items():
+        missing = expected - set(table)
+        extra = set(table) - expected
+        if missing:
+            problems.append(f"'{lang}' is missing: {', '.join(sorted(missing))}")
+        if extra:
+            problems.append(f"'{lang}' has keys not in '{reference}': {', '.join(sorted(extra))}")
+    if problems:
+        raise ValueError("Translation keys differ between languages; " + "; ".join(problems))
+
+
+def load_translations(path: str = TRANSLATIONS_PATH):
+    """Load translations.json, returning the nested dict and per-language dotted-key tables"""
+    with open(path, 'r', encoding='utf-8') as f:
+        translations = json.load(f)
+    tables = {lang: flatten(tree) for lang, tree in translations.items()}
+    check_key_parity(tables)
+    return translations, tables
+
+
+@lru_cache(maxsize=None)
+def get_translations():
+    """``load_translations()``, read on first use and shared by the bot and the UI"""
+    return load_translations()
+
+
+def get_text(key: str, lang: str = DEFAULT_LANG) -> str:
+    """Get translated text for a given key (dot-separated for nested keys)"""
+    return get_translations()[1][lang][key]
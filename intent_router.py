@@ -0,0 +1,104 @@
+import re
+import time
+from collections import deque
+from typing import Dict, Iterable, Tuple
+
+from metrics import percentile
+from nutrition_classifier import words_pattern
+
+# Questions answered from the profile without a completion, in answer order
+INTENTS = ("calories", "bmr", "protein", "water", "bmi")
+CUE_GROUPS = ("self_references", "quantity_words", "need_words", "exclusions")
+# Longer questions are treated as open-ended even if they mention a computable figure
+MAX_LOCAL_QUERY_WORDS = 20
+
+
+class IntentRouter:
+    """Recognizes questions that the profile alone can answer, in any configured language.
+
+    A query is routed locally when it names a computable figure (TDEE, BMR,
+    protein, water, BMI), refers to the user ("my", "I", "mon", "je"...), asks
+    for a quantity and contains none of the exclusions that signal a goal or a
+    specific food or meal ("to lose weight", "in a banana"...). Calories,
+    protein and water also accept a need word ("should I eat", "par jour")
+    in place of a quantity word. Everything else falls through to the LLM.
+    """
+
+    def __init__(self, intent_terms: Dict[str, Iterable[str]], self_references: Iterable[str],
+                 quantity_words: Iterable[str], need_words: Iterable[str], exclusions: Iterable[str],
+                 max_words: int = MAX_LOCAL_QUERY_WORDS):
+        self._intents = re.compile(
+            "|".join(f"(?P<{intent}>{words_pattern(intent_terms[intent])})" for intent in INTENTS),
+            re.IGNORECASE,
+        )
+        self._self = re.compile(words_pattern(self_references), re.IGNORECASE)
+        self._quantity = re.compile(words_pattern(quantity_words), re.IGNORECASE)
+        self._need = re.compile(words_pattern(need_words), re.IGNORECASE)
+        self._exclusions = re.compile(words_pattern(exclusions), re.IGNORECASE)
+        self.max_words = max_words
+
+    @classmethod
+    def from_translations(cls, translations: Dict) -> "IntentRouter":
+        terms = {group: [] for group in INTENTS + CUE_GROUPS}
+        for lang_texts in translations.values():
+            for group in terms:
+                terms[group].extend(term.lower() for term in lang_texts["intents"][group])
+        return cls({intent: terms[intent] for intent in INTENTS},
+                   **{group: terms[group] for group in CUE_GROUPS})
+
+    def route(self, query: str) -> Tuple[str, ...]:
+        """Intents to answer locally, in ``INTENTS`` order; empty if the LLM should answer"""
+        if len(query.split()) > self.max_words:
+            return ()
+        found = {match.lastgroup for match in self._intents.finditer(query)}
+        if not found or not self._self.search(query) or self._exclusions.search(query):
+            return ()
+        if not self._quantity.search(query):
+            if not self._need.search(query):
+                return ()
+            found.discard("bmi")
+            found.discard("bmr")
+        return tuple(intent for intent in INTENTS if intent in found)
+
+
+class RouteStats:
+    """Share of traffic and recent latency samples per response path (local, cache, llm...)"""
+
+    def __init__(self, samples: int = 1000):
+        self.counts: Dict[str, int] = {}
+        self._samples: Dict[str, deque] = {}
+        self._max_samples = samples
+
+    def record(self, path: str, seconds: float):
+        self.counts[path] = self.counts.get(path, 0) + 1
+        self._samples.setdefault(path, deque(maxlen=self._max_samples)).append(seconds)
+
+    def timer(self, path: str) -> "_RouteTimer":
+        return _RouteTimer(self, path)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per path: share of all requests and p50/p95/p99 latency in milliseconds"""
+        total = sum(self.counts.values())
+        result = {}
+        for path, samples in self._samples.items():
+            result[path] = {
+                "share": self.counts[path] / total,
+                "p50_ms": percentile(samples, 0.5) * 1e3,
+                "p95_ms": percentile(samples, 0.95) * 1e3,
+                "p99_ms": percentile(samples, 0.99) * 1e3,
+            }
+        return result
+
+
+class _RouteTimer:
+    """Times one request; the path can be changed until the request finishes"""
+
+    def __init__(self, stats: RouteStats, path: str):
+        self._stats = stats
+        self.path = path
+        self._start = time.perf_counter()
+
+    def finish(self) -> float:
+        seconds = time.perf_counter() - self._start
+        self._stats.record(self.path, seconds)
+        return seconds
@@ -0,0 +1,452 @@
+import os
+import json
+import time
+import hashlib
+import asyncio
+import logging
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from context_window import count_message_tokens
+from metrics import percentile, registry
+from resilience import CircuitBreaker, CircuitOpenError, RateLimiter, RetryPolicy, is_outage, is_rate_limit, \
+    is_retryable, is_upstream_response
+
+if TYPE_CHECKING:
+    import openai
+
+load_dotenv()
+
+# Connection pool and concurrency limits for the shared completion client
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("OPENAI_MAX_CONCURRENT_REQUESTS", "32"))
+REQUEST_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+# Share one upstream call between concurrent identical requests
+COMPLETION_COALESCING = os.getenv("COMPLETION_COALESCING", "1") == "1"
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+# Local OpenAI-compatible server (llama.cpp's llama-server, Ollama, vLLM...); none when empty
+LOCAL_LLM_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL", "")
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "local")
+LOCAL_LLM_API_KEY = os.getenv("LOCAL_LLM_API_KEY", "not-needed")
+# A CPU model serves few streams at once and slowly
+LOCAL_LLM_MAX_CONCURRENT_REQUESTS = int(os.getenv("LOCAL_LLM_MAX_CONCURRENT_REQUESTS", "2"))
+LOCAL_LLM_TIMEOUT = float(os.getenv("LOCAL_LLM_TIMEOUT", "120"))
+# Sampling parameters of every reply, whichever backend writes it
+SAMPLING_PARAMS = {"temperature": 0.7, "top_p": 0.9, "frequency_penalty": 0.3, "presence_penalty": 0.3}
+
+# USD per million prompt / completion tokens, matched on the longest model name prefix; other models cost nothing
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+# Share of the prompt price charged for prompt tokens served from the provider's prompt cache
+CACHED_PROMPT_PRICE_FACTOR = 0.5
+
+logger = logging.getLogger(__name__)
+
+LLM_TOKENS = registry.counter("nutribot_llm_tokens_total", "Tokens reported in completion usage",
+                              ("backend", "model", "kind"))
+LLM_COST = registry.counter("nutribot_llm_cost_usd_total", "Estimated completion cost from usage and MODEL_PRICES",
+                            ("backend", "model"))
+LLM_ATTEMPTS = registry.counter("nutribot_llm_attempts_total", "Upstream completion attempts by outcome",
+                                ("backend", "outcome"))
+LLM_RETRIES = registry.counter("nutribot_llm_retries_total", "Failed attempts that were retried", ("backend", "error"))
+LLM_FAILURES = registry.counter("nutribot_llm_failures_total", "Completions that failed after retries",
+                                ("backend", "error"))
+LLM_REJECTED = registry.counter("nutribot_llm_rejected_total", "Calls refused while the circuit breaker was open",
+                                ("backend",))
+LLM_TTFT = registry.histogram("nutribot_llm_ttft_seconds", "Time to the first streamed token", ("backend",))
+LLM_DURATION = registry.histogram("nutribot_llm_duration_seconds", "Total upstream completion time",
+                                  ("backend", "mode"))
+LLM_IN_FLIGHT = registry.gauge("nutribot_llm_in_flight", "Completions holding a concurrency slot")
+LLM_WAITING = registry.gauge("nutribot_llm_waiting", "Completions waiting for a concurrency slot")
+
+
+def completion_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    """USD for one completion; ``cached_tokens`` of the ``prompt_tokens`` came from the prompt cache"""
+    prefix = max((name for name in MODEL_PRICES if model.startswith(name)), key=len, default=None)
+    if prefix is None:
+        return 0.0
+    prompt_price, completion_price = MODEL_PRICES[prefix]
+    prompt_cost = (prompt_tokens - cached_tokens + cached_tokens * CACHED_PROMPT_PRICE_FACTOR) * prompt_price
+    return (prompt_cost + completion_tokens * completion_price) / 1e6
+
+
+def record_usage(model: str, usage, backend: str = "openai") -> None:
+    """Count the tokens and cost of one completion from its ``usage`` block"""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None) or 0
+    labels = dict(backend=backend, model=model)
+    LLM_TOKENS.inc(usage.prompt_tokens, kind="prompt", **labels)
+    LLM_TOKENS.inc(cached_tokens, kind="prompt_cached", **labels)
+    LLM_TOKENS.inc(usage.prompt_tokens - cached_tokens, kind="prompt_uncached", **labels)
+    LLM_TOKENS.inc(usage.completion_tokens, kind="completion", **labels)
+    LLM_COST.inc(completion_cost(model, usage.prompt_tokens, usage.completion_tokens, cached_tokens), **labels)
+
+
+def payload_key(kind: str, messages: List[Dict[str, str]], params: Dict) -> str:
+    """Hash of a normalized request payload; equal for byte-identical requests"""
+    payload = json.dumps({"kind": kind, "messages": messages, **params}, sort_keys=True,
+                         separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """One upstream stream fanned out to every caller that sent the same payload.
+
+    Deltas are buffered so callers joining late replay the reply from the start.
+    """
+
+    def __init__(self):
+        self.deltas: List[str] = []
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def publish(self, deltas: AsyncIterator[str]):
+        try:
+            async for delta in deltas:
+                self.deltas.append(delta)
+                self._notify()
+        except Exception as error:
+            self.error = error
+        finally:
+            self.done = True
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            if index < len(self.deltas):
+                index += 1
+                yield self.deltas[index - 1]
+            elif self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                await self._changed.wait()
+
+
+class CompletionBackend:
+    """Async chat completion backend sharing one AsyncOpenAI client across all sessions.
+
+    The underlying httpx pool is bounded by ``max_connections`` and at most
+    ``max_concurrent_requests`` completions are in flight at once; extra callers
+    wait on a semaphore instead of blocking the event loop. Every call goes
+    through the backend's rate limiter (when ``rate_limited``) and circuit
+    breaker, and retryable errors are retried with jittered exponential
+    backoff. With ``coalesce``, concurrent calls with an identical payload
+    share a single upstream request.
+
+    Any OpenAI-compatible server works: ``name`` labels the backend's metrics,
+    and ``model`` and ``params`` are the defaults of every call.
+    """
+
+    def __init__(self, max_connections: int = MAX_CONNECTIONS,
+                 max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+                 max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+                 timeout: float = REQUEST_TIMEOUT,
+                 base_url: Optional[str] = None,
+                 coalesce: bool = COMPLETION_COALESCING,
+                 name: str = "openai",
+                 model: str = OPENAI_MODEL,
+                 api_key: Optional[str] = None,
+                 params: Optional[Dict] = None,
+                 rate_limited: bool = True):
+        self.name = name
+        self.model = model
+        self.api_key = api_key
+        self.params = dict(SAMPLING_PARAMS if params is None else params)
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.max_concurrent_requests = max_concurrent_requests
+        self.timeout = timeout
+        self.base_url = base_url
+        self.coalesce = coalesce
+        self._client: Optional["openai.AsyncOpenAI"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.retry_policy = RetryPolicy()
+        # The API quota; a local server has none
+        self.rate_limiter = RateLimiter() if rate_limited else None
+        self.breaker = CircuitBreaker()
+        self._flights: Dict[str, _Flight] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+        # Rolling latency samples for streamed completions, in seconds
+        self.ttft_samples = deque(maxlen=1000)
+        self.total_samples = deque(maxlen=1000)
+
+    @property
+    def client(self) -> "openai.AsyncOpenAI":
+        # Created on first use so the pool is bound to the running event loop, and so that
+        # importing the app neither loads the SDK nor needs the key
+        if self._client is None:
+            api_key = self.api_key or os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("Please set the OPENAI_API_KEY environment variable")
+            import httpx
+            import openai
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                ),
+                timeout=self.timeout,
+            )
+            # Retries are handled here, with the shared limiter and breaker, not by the SDK
+            self._client = openai.AsyncOpenAI(api_key=api_key, base_url=self.base_url, http_client=http_client,
+                                              max_retries=0)
+        return self._client
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        return self._semaphore
+
+    @asynccontextmanager
+    async def _slot(self):
+        """A concurrency slot, counted in the waiting and in-flight gauges"""
+        LLM_WAITING.inc()
+        try:
+            await self._get_semaphore().acquire()
+        finally:
+            LLM_WAITING.dec()
+        LLM_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            LLM_IN_FLIGHT.dec()
+            self._semaphore.release()
+
+    async def _before_attempt(self, messages: List[Dict[str, str]], params: Dict) -> bool:
+        """Admit an attempt through the breaker and rate limiter; True if it is the breaker's probe"""
+        try:
+            probe = self.breaker.before_call()
+        except CircuitOpenError:
+            LLM_REJECTED.inc(backend=self.name)
+            raise
+        if self.rate_limiter is not None:
+            try:
+                await self.rate_limiter.acquire(count_message_tokens(messages) + params.get("max_tokens", 0))
+            except BaseException:
+                if probe:
+                    self.breaker.release_probe()
+                raise
+        return probe
+
+    def _after_error(self, error: Exception, attempt: int, probe: bool, retryable: bool = True) -> Optional[float]:
+        """Record a failed attempt and return the backoff delay, or None if the error should propagate"""
+        giving_up = not retryable or not is_retryable(error) or attempt + 1 >= self.retry_policy.max_attempts
+        LLM_ATTEMPTS.inc(backend=self.name, outcome="error")
+        (LLM_FAILURES if giving_up else LLM_RETRIES).inc(backend=self.name, error=type(error).__name__)
+        if is_outage(error):
+            # One failure per call rather than per attempt, but a half-open probe settles at once
+            if giving_up or self.breaker.state != "closed":
+                self.breaker.record_failure()
+        elif is_upstream_response(error):
+            self.breaker.record_success()  # upstream answered, e.g. with a 429
+        elif probe:
+            # Failed before reaching the upstream (no API key, bad parameters): says nothing about its health
+            self.breaker.release_probe()
+        if giving_up:
+            return None
+        delay = self.retry_policy.delay(attempt, error)
+        if is_rate_limit(error) and self.rate_limiter is not None:
+            self.rate_limiter.pause(delay)
+        logger.warning("%s completion attempt %d failed (%s), retrying in %.2fs", self.name, attempt + 1, type(error).__name__,
+                       delay)
+        return delay
+
+    def _call_params(self, params: Dict) -> Dict:
+        return {"model": self.model, **self.params, **params}
+
+    async def complete(self, messages: List[Dict[str, str]], **params) -> str:
+        params = self._call_params(params)
+        if not self.coalesce:
+            self.upstream_calls += 1
+            return await self._complete_with_retries(messages, **params)
+        key = payload_key("complete", messages, params)
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._complete_with_retries(messages, **params))
+            self._pending[key] = future
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+            self.upstream_calls += 1
+        else:
+            self.coalesced_calls += 1
+        # Shielded so one caller going away does not cancel the call for the others
+        return await asyncio.shield(future)
+
+    async def _complete_with_retries(self, messages: List[Dict[str, str]], **params) -> str:
+        for attempt in itertools.count():
+            probe = await self._before_attempt(messages, params)
+            try:
+                async with self._slot():
+                    start = time.perf_counter()
+                    response = await self.client.chat.completions.create(messages=messages, **params)
+                    LLM_DURATION.observe(time.perf_counter() - start, backend=self.name, mode="complete")
+            except Exception as error:
+                delay = self._after_error(error, attempt, probe)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled: no outcome to record, but the probe must not stay taken
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            LLM_ATTEMPTS.inc(backend=self.name, outcome="success")
+            record_usage(params.get("model", ""), response.usage, self.name)
+            return response.choices[0].message.content
+
+    async def stream(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        """Yield content deltas of a ``stream=True`` completion as they arrive.
+
+        Failed attempts are retried only until the first delta has been yielded.
+        """
+        params = self._call_params(params)
+        if not self.coalesce:
+            self.upstream_calls += 1
+            async for delta in self._stream_with_retries(messages, **params):
+                yield delta
+            return
+        key = payload_key("stream", messages, params)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.create_task(self._fly(key, flight, messages, params))
+            self._flights[key] = flight
+            self.upstream_calls += 1
+        else:
+            self.coalesced_calls += 1
+            logger.debug("joined in-flight completion %s (%d subscribers)", key[:12], flight.subscribers + 1)
+        flight.subscribers += 1
+        try:
+            async for delta in flight.subscribe():
+                yield delta
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more; stop the upstream stream
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    async def _fly(self, key: str, flight: _Flight, messages: List[Dict[str, str]], params: Dict):
+        try:
+            await flight.publish(self._stream_with_retries(messages, **params))
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    async def _stream_with_retries(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        for attempt in itertools.count():
+            probe = await self._before_attempt(messages, params)
+            started = False
+            try:
+                async for delta in self._stream_once(messages, **params):
+                    started = True
+                    yield delta
+            except Exception as error:
+                delay = self._after_error(error, attempt, probe, retryable=not started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled, or the stream closed by its reader (GeneratorExit)
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            LLM_ATTEMPTS.inc(backend=self.name, outcome="success")
+            return
+
+    async def _stream_once(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        async with self._slot():
+            start = time.perf_counter()
+            first_token_at = None
+            # Usage arrives in a final chunk without choices
+            response = await self.client.chat.completions.create(
+                messages=messages, stream=True, stream_options={"include_usage": True}, **params)
+            async for chunk in response:
+                if chunk.usage is not None:
+                    record_usage(params.get("model", ""), chunk.usage, self.name)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                yield delta
+            end = time.perf_counter()
+        ttft = (first_token_at or end) - start
+        self.ttft_samples.append(ttft)
+        self.total_samples.append(end - start)
+        LLM_TTFT.observe(ttft, backend=self.name)
+        LLM_DURATION.observe(end - start, backend=self.name, mode="stream")
+        logger.info("%s completion streamed: ttft=%.3fs total=%.3fs", self.name, ttft, end - start)
+
+    def latency_summary(self) -> Dict[str, float]:
+        """p50/p95 of time-to-first-token and total latency over recent streams."""
+        ttft, total = list(self.ttft_samples), list(self.total_samples)
+        return {
+            "ttft_p50": percentile(ttft, 0.5, default=0.0),
+            "ttft_p95": percentile(ttft, 0.95, default=0.0),
+            "total_p50": percentile(total, 0.5, default=0.0),
+            "total_p95": percentile(total, 0.95, default=0.0),
+        }
+
+    def coalescing_summary(self) -> Dict[str, float]:
+        """Upstream vs. coalesced calls; ``dedup_ratio`` is the share of calls that joined another"""
+        total = self.upstream_calls + self.coalesced_calls
+        return {
+            "upstream_calls": self.upstream_calls,
+            "coalesced_calls": self.coalesced_calls,
+            "dedup_ratio": self.coalesced_calls / total if total else 0.0,
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+completion_backend = CompletionBackend()
+# Cheaper replies on a local model, chosen per request by model_router
+local_backend = CompletionBackend(
+    name="local", model=LOCAL_LLM_MODEL, base_url=LOCAL_LLM_BASE_URL, api_key=LOCAL_LLM_API_KEY,
+    max_concurrent_requests=LOCAL_LLM_MAX_CONCURRENT_REQUESTS, timeout=LOCAL_LLM_TIMEOUT, rate_limited=False,
+) if LOCAL_LLM_BASE_URL else None
+backends = [backend for backend in (completion_backend, local_backend) if backend is not None]
+
+
+def _per_backend(value):
+    return lambda: {(backend.name,): value(backend) for backend in backends}
+
+
+registry.callback("nutribot_llm_circuit_open", "1 while the circuit breaker rejects calls",
+                  _per_backend(lambda backend: float(backend.breaker.state == "open")), labels=("backend",))
+registry.callback("nutribot_llm_upstream_calls_total", "Completions sent upstream",
+                  _per_backend(lambda backend: backend.upstream_calls), kind="counter", labels=("backend",))
+registry.callback("nutribot_llm_coalesced_calls_total", "Completions that joined an identical in-flight call",
+                  _per_backend(lambda backend: backend.coalesced_calls), kind="counter", labels=("backend",))
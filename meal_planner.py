@@ -0,0 +1,218 @@
+"""Deterministic weekly meal plans from the recipe table.
+
+Recipes (data/recipes.csv) list food-table ingredients in grams; their
+nutrients and diet tags are derived from the food table. Each day gets one
+breakfast, lunch and dinner scaled by a shared portion factor, chosen to
+minimise the distance to the calorie target and repeats across the week
+among the combinations meeting the protein target (or, when none can, the
+one closest to it), then snacks fill the remaining calorie gap. Every
+breakfast x lunch x dinner combination is scored at once with NumPy, for one
+profile or a whole batch of them.
+"""
+import csv
+import os
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from food_db import NUTRIENTS, FoodTable
+
+RECIPES_PATH = os.getenv("RECIPES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "recipes.csv"))
+
+MEALS = ("breakfast", "lunch", "dinner", "snack")
+MAIN_MEALS = MEALS[:3]
+PLAN_DAYS = 7
+MAX_SNACKS = 2
+# Main meals are scaled together in quarter servings within these bounds
+MIN_PORTION, MAX_PORTION, PORTION_STEP = 0.75, 1.5, 0.25
+# Cost of each repeat of a recipe within the week, relative to missing the calorie target by 100 %
+REPEAT_PENALTY = 0.1
+# Added to the cost of a day short of the protein target, so any plan meeting it is preferred
+PROTEIN_SHORTFALL_COST = 100
+# Snacks are only added while the calorie gap exceeds this
+MIN_SNACK_GAP_KCAL = 100
+# Profiles scored together; bounds the (profiles x combinations) score matrix
+BATCH_CHUNK = 256
+# Share of energy from carbohydrates below which a recipe counts as keto
+KETO_CARB_ENERGY_SHARE = 0.1
+
+_ENERGY, _PROTEIN, _CARBS = NUTRIENTS.index("energy_kcal"), NUTRIENTS.index("protein_g"), NUTRIENTS.index("carbohydrate_g")
+
+
+class RecipeTable:
+    """Per-serving nutrients and diet tags of recipes built from food-table ingredients"""
+
+    def __init__(self, names: List[str], names_fr: List[str], meals: List[str],
+                 ingredients: List[List[Tuple[int, float]]], foods: FoodTable):
+        self.names = names
+        self.names_fr = names_fr
+        self.meal = np.array([MEALS.index(meal) for meal in meals], dtype=np.int8)
+        grams = np.zeros((len(names), len(foods)), dtype=np.float32)
+        for recipe, items in enumerate(ingredients):
+            for food, amount in items:
+                grams[recipe, food] += amount
+        # (recipes, nutrients); unknown values count as zero in a sum
+        self.nutrients = grams @ np.nan_to_num(foods.values).T / 100
+        self.energy = self.nutrients[:, _ENERGY].astype(np.float64)
+        self.protein = self.nutrients[:, _PROTEIN].astype(np.float64)
+        self.diets = []
+        for recipe, items in enumerate(ingredients):
+            diets = set.intersection(*(foods.diets[food] for food, _ in items))
+            diets.discard("keto")
+            if self.nutrients[recipe, _CARBS] * 4 <= KETO_CARB_ENERGY_SHARE * self.energy[recipe]:
+                diets.add("keto")
+            self.diets.append(diets)
+
+    @classmethod
+    def load(cls, foods: FoodTable, path: str = RECIPES_PATH) -> "RecipeTable":
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        ingredients = []
+        for row in rows:
+            items = []
+            for part in row["ingredients"].split(";"):
+                name, amount = part.rsplit(":", 1)
+                food = foods.exact(name)
+                if food is None:
+                    raise ValueError(f"Recipe '{row['name']}' uses unknown food '{name}'")
+                items.append((food, float(amount)))
+            ingredients.append(items)
+        return cls([row["name"] for row in rows], [row["name_fr"] for row in rows],
+                   [row["meal"] for row in rows], ingredients, foods)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def display_name(self, recipe: int, lang: str = "en") -> str:
+        return self.names_fr[recipe] if lang == "fr" else self.names[recipe]
+
+
+class PlannedMeal(NamedTuple):
+    meal: str
+    recipe: int
+    servings: float
+    energy_kcal: float
+    protein_g: float
+
+
+class DayPlan(NamedTuple):
+    meals: List[PlannedMeal]
+    energy_kcal: float
+    protein_g: float
+
+
+class WeekPlan(NamedTuple):
+    days: List[DayPlan]
+    calorie_target: float
+    protein_target: float
+    diets: Tuple[str, ...]
+    # Preferences dropped because no recipe satisfied all of them for some meal
+    relaxed: Tuple[str, ...]
+
+
+class MealPlanner:
+    def __init__(self, recipes: RecipeTable, days: int = PLAN_DAYS, max_snacks: int = MAX_SNACKS):
+        self.recipes = recipes
+        self.days = days
+        self.max_snacks = max_snacks
+
+    def _compatible(self, diets: Sequence[str]) -> Tuple[np.ndarray, Tuple[str, ...]]:
+        """Recipes satisfying ``diets``, dropping the last preferences until every meal has a recipe"""
+        diets = list(diets)
+        relaxed = []
+        while True:
+            wanted = set(diets)
+            mask = np.array([wanted <= tags for tags in self.recipes.diets])
+            if all(mask[self.recipes.meal == MEALS.index(meal)].any() for meal in MAIN_MEALS) or not diets:
+                return mask, tuple(relaxed)
+            relaxed.insert(0, diets.pop())
+
+    def plan_batch(self, calorie_targets, protein_targets, diets: Sequence[str] = ()) -> Dict[str, np.ndarray]:
+        """Week plans for profiles sharing the same dietary preferences.
+
+        Returns ``recipes`` and ``servings`` of shape (profiles, days, 3 + max_snacks)
+        with -1 / 0 for unused snack slots, daily ``energy_kcal`` and ``protein_g``
+        of shape (profiles, days), and the ``relaxed`` preferences.
+        """
+        calorie_targets = np.asarray(calorie_targets, dtype=np.float64)
+        protein_targets = np.asarray(protein_targets, dtype=np.float64)
+        mask, relaxed = self._compatible(diets)
+        options = [np.flatnonzero(mask & (self.recipes.meal == MEALS.index(meal))) for meal in MEALS]
+        breakfast, lunch, dinner = (grid.ravel() for grid in np.meshgrid(*options[:3], indexing="ij"))
+        combo_energy = self.recipes.energy[breakfast] + self.recipes.energy[lunch] + self.recipes.energy[dinner]
+        combo_protein = self.recipes.protein[breakfast] + self.recipes.protein[lunch] + self.recipes.protein[dinner]
+        snacks = options[3]
+
+        profiles = len(calorie_targets)
+        slots = len(MAIN_MEALS) + self.max_snacks
+        result = {
+            "recipes": np.full((profiles, self.days, slots), -1, dtype=np.int32),
+            "servings": np.zeros((profiles, self.days, slots)),
+            "energy_kcal": np.zeros((profiles, self.days)),
+            "protein_g": np.zeros((profiles, self.days)),
+            "relaxed": relaxed,
+        }
+        for start in range(0, profiles, BATCH_CHUNK):
+            chunk = slice(start, min(start + BATCH_CHUNK, profiles))
+            self._plan_chunk(calorie_targets[chunk], protein_targets[chunk], breakfast, lunch, dinner,
+                             combo_energy, combo_protein, snacks, {key: value[chunk] for key, value in result.items()
+                                                                  if key != "relaxed"})
+        return result
+
+    def _plan_chunk(self, calories, protein, breakfast, lunch, dinner, combo_energy, combo_protein, snacks, out):
+        rows = np.arange(len(calories))
+        uses = np.zeros((len(calories), len(self.recipes)))
+        # Portion factor per (profile, combination): the quarter serving closest to the calorie target,
+        # raised to the smallest one meeting the protein target
+        scale = np.maximum(np.round(calories[:, None] / combo_energy[None, :] / PORTION_STEP),
+                           np.ceil(protein[:, None] / combo_protein[None, :] / PORTION_STEP - 1e-9))
+        scale = np.clip(scale * PORTION_STEP, MIN_PORTION, MAX_PORTION)
+        energy = scale * combo_energy
+        shortfall = np.maximum(0, protein[:, None] - scale * combo_protein) / protein[:, None]
+        base_cost = (np.abs(calories[:, None] - energy) / calories[:, None]
+                     + np.where(shortfall > 0, PROTEIN_SHORTFALL_COST * (1 + shortfall), 0))
+        for day in range(self.days):
+            cost = base_cost + REPEAT_PENALTY * (uses[:, breakfast] + uses[:, lunch] + uses[:, dinner])
+            best = np.argmin(cost, axis=1)
+            picked = (breakfast[best], lunch[best], dinner[best])
+            servings = scale[rows, best]
+            day_energy = energy[rows, best]
+            day_protein = servings * combo_protein[best]
+            for slot, recipes in enumerate(picked):
+                out["recipes"][:, day, slot] = recipes
+                out["servings"][:, day, slot] = servings
+                uses[rows, recipes] += 1
+            for slot in range(len(MAIN_MEALS), len(MAIN_MEALS) + self.max_snacks):
+                if not len(snacks):
+                    break
+                gap = calories - day_energy
+                snack_cost = (np.abs(gap[:, None] - self.recipes.energy[snacks][None, :]) / calories[:, None]
+                              + REPEAT_PENALTY * uses[:, snacks])
+                choice = np.argmin(snack_cost, axis=1)
+                recipes = snacks[choice]
+                take = (gap > MIN_SNACK_GAP_KCAL) & (np.abs(gap - self.recipes.energy[recipes]) < gap)
+                out["recipes"][:, day, slot] = np.where(take, recipes, -1)
+                out["servings"][:, day, slot] = take.astype(np.float64)
+                day_energy = day_energy + take * self.recipes.energy[recipes]
+                day_protein = day_protein + take * self.recipes.protein[recipes]
+                uses[rows[take], recipes[take]] += 1
+            out["energy_kcal"][:, day] = day_energy
+            out["protein_g"][:, day] = day_protein
+
+    def plan_week(self, calorie_target: float, protein_target: float, diets: Iterable[str] = ()) -> WeekPlan:
+        diets = tuple(diets)
+        batch = self.plan_batch([calorie_target], [protein_target], diets)
+        days = []
+        for day in range(self.days):
+            meals = []
+            for slot in range(batch["recipes"].shape[2]):
+                recipe = int(batch["recipes"][0, day, slot])
+                if recipe < 0:
+                    continue
+                servings = float(batch["servings"][0, day, slot])
+                meals.append(PlannedMeal(MEALS[min(slot, len(MAIN_MEALS))], recipe, servings,
+                                         servings * self.recipes.energy[recipe],
+                                         servings * self.recipes.protein[recipe]))
+            days.append(DayPlan(meals, float(batch["energy_kcal"][0, day]), float(batch["protein_g"][0, day])))
+        relaxed = batch["relaxed"]
+        return WeekPlan(days, calorie_target, protein_target, tuple(d for d in diets if d not in relaxed), relaxed)
@@ -0,0 +1,300 @@
+"""In-process counters, gauges and histograms in the Prometheus text format.
+
+Stages of request handling are timed with ``span``. With TRACE_LOG_PATH set,
+every span is also appended to a JSON-lines trace log for offline profiling.
+``mount_metrics`` serves the registry on the Gradio FastAPI app, and from the
+first scrape on, probes how late the server's event loop runs its callbacks.
+"""
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Append every span to this JSON-lines file (off when empty)
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "")
+METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+
+# Seconds; spans range from microsecond lookups to multi-second completions
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds between two event-loop lag probes, and the histogram buckets of the lag
+LOOP_LAG_INTERVAL = 0.1
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def percentile(values: Iterable[float], q: float, default: float = float("nan")) -> float:
+    """Nearest-rank ``q`` quantile (0-1) of raw samples; ``default`` when there are none"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else default
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(v)}" for key, v in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: counts per bucket (non-cumulative, last one is +Inf), sum
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            series = [(key, list(counts), total[0]) for key, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Callback(_Metric):
+    """Read at scrape time from state kept elsewhere (cache hit counts, queue lengths...).
+
+    ``function`` returns one value, or a mapping of label values to values.
+    """
+
+    def __init__(self, name: str, help: str, function: Callable[[], Union[float, Dict[LabelValues, float]]],
+                 kind: str = "gauge", labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self._function = function
+
+    def _samples(self) -> List[str]:
+        values = self._function()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(v)}" for key, v in values.items()]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, function: Callable, kind: str = "gauge",
+                 labels: Sequence[str] = ()) -> Callback:
+        return self._register(Callback(name, help, function, kind, labels))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class TraceLog:
+    """Appends one JSON object per span; writes are buffered and flushed at exit"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8", buffering=1 << 16)
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def write(self, record: Dict):
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class LoopLagProbe:
+    """Measures how late the running event loop fires a timer, every ``interval`` seconds.
+
+    The lag is how long callbacks waited behind blocking work on the loop
+    (synchronous handlers, CPU-bound code in coroutines). Samples go to
+    ``histogram`` and, with ``keep``, to ``samples``.
+    """
+
+    def __init__(self, histogram: Optional[Histogram] = None, interval: float = LOOP_LAG_INTERVAL,
+                 keep: bool = False):
+        self.histogram = histogram
+        self.interval = interval
+        self.samples: Optional[List[float]] = [] if keep else None
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def start(self):
+        """Probe the running event loop; does nothing if already started"""
+        if self._handle is None:
+            self._schedule(asyncio.get_running_loop())
+
+    def stop(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop):
+        due = loop.time() + self.interval
+        self._handle = loop.call_at(due, self._fire, loop, due)
+
+    def _fire(self, loop: asyncio.AbstractEventLoop, due: float):
+        lag = max(0.0, loop.time() - due)
+        if self.histogram is not None:
+            self.histogram.observe(lag)
+        if self.samples is not None:
+            self.samples.append(lag)
+        self._schedule(loop)
+
+
+registry = MetricsRegistry()
+trace_log: Optional[TraceLog] = TraceLog(TRACE_LOG_PATH) if TRACE_LOG_PATH else None
+
+STAGE_SECONDS = registry.histogram("nutribot_stage_seconds", "Time spent in each stage of request handling",
+                                   ("stage",))
+loop_lag_probe = LoopLagProbe(registry.histogram(
+    "nutribot_event_loop_lag_seconds", "Delay of event-loop timer callbacks behind other work", buckets=LOOP_LAG_BUCKETS
+))
+
+
+@contextmanager
+def span(stage: str, **attrs) -> Iterator[Dict]:
+    """Time a block as ``stage``; attributes added to the yielded dict go to the trace log"""
+    started_at = time.time()
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        if trace_log is not None:
+            trace_log.write({"ts": round(started_at, 6), "span": stage, "ms": round(seconds * 1e3, 3), **attrs})
+
+
+class Trace:
+    """Spans of one request, tied together by a shared id in the trace log"""
+
+    def __init__(self, **attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.attrs = attrs
+
+    def span(self, stage: str, **attrs):
+        return span(stage, trace=self.id, **self.attrs, **attrs)
+
+
+def mount_metrics(app, path: str = METRICS_PATH):
+    """Serve the registry in the Prometheus text format on a FastAPI ``app``"""
+    from fastapi.responses import PlainTextResponse
+
+    async def metrics():
+        # Runs on the server's event loop, which is the one worth probing
+        loop_lag_probe.start()
+        return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+    app.add_api_route(path, metrics, methods=["GET"], include_in_schema=False)
@@ -0,0 +1,105 @@
+"""Chooses the completion backend of each reply: the remote model, or a local one for the cheaper cases.
+
+With LOCAL_LLM_BASE_URL set, quick actions, replies grounded in looked-up food
+facts and short questions go to the local model, and long open-ended questions
+to the remote one. Once every local slot is busy and ``LOCAL_LLM_MAX_QUEUE``
+replies are already waiting, new ones spill over to the remote model. A reply
+that cannot start on the chosen backend (circuit open, or failed before its
+first token) is written by the other one, so the local model also covers
+remote outages.
+"""
+import logging
+import os
+from collections import Counter
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+from context_window import count_tokens
+from llm_client import CompletionBackend, completion_backend, local_backend
+from metrics import registry
+
+load_dotenv()
+
+# Questions of at most this many tokens go to the local model
+LOCAL_LLM_MAX_QUERY_TOKENS = int(os.getenv("LOCAL_LLM_MAX_QUERY_TOKENS", "12"))
+# Replies allowed to wait for a busy local model; new ones beyond that go remote
+LOCAL_LLM_MAX_QUEUE = int(os.getenv("LOCAL_LLM_MAX_QUEUE", "0"))
+
+logger = logging.getLogger(__name__)
+
+LLM_ROUTES = registry.counter("nutribot_llm_routes_total", "Replies routed to each backend, by reason",
+                              ("backend", "reason"))
+LLM_FALLBACKS = registry.counter("nutribot_llm_fallbacks_total", "Replies moved to another backend after a failure",
+                                 ("failed", "backend"))
+
+
+class Route(NamedTuple):
+    backend: str
+    reason: str
+
+
+class ModelRouter:
+    def __init__(self, remote: CompletionBackend, local: Optional[CompletionBackend] = None,
+                 max_query_tokens: int = LOCAL_LLM_MAX_QUERY_TOKENS, max_local_queue: int = LOCAL_LLM_MAX_QUEUE):
+        self.remote = remote
+        self.local = local
+        self.max_query_tokens = max_query_tokens
+        self.max_local_queue = max_local_queue
+        # Replies streaming or waiting to stream, per backend
+        self.active = Counter()
+
+    def route(self, message: str, quick_action: bool = False, grounded: bool = False) -> Route:
+        """Backend for a reply to ``message``; ``grounded`` when the prompt carries the facts to quote"""
+        if self.local is None:
+            route = Route(self.remote.name, "default")
+        elif self.remote.breaker.state == "open":
+            route = Route(self.local.name, "remote_open")
+        elif self.active[self.local.name] >= self.local.max_concurrent_requests + self.max_local_queue:
+            route = Route(self.remote.name, "local_busy")
+        elif quick_action:
+            route = Route(self.local.name, "quick_action")
+        elif grounded:
+            route = Route(self.local.name, "grounded")
+        elif count_tokens(message) <= self.max_query_tokens:
+            route = Route(self.local.name, "short")
+        else:
+            route = Route(self.remote.name, "open_ended")
+        LLM_ROUTES.inc(backend=route.backend, reason=route.reason)
+        return route
+
+    def _candidates(self, route: Route) -> List[CompletionBackend]:
+        backends = [backend for backend in (self.remote, self.local) if backend is not None]
+        return sorted(backends, key=lambda backend: backend.name != route.backend)
+
+    async def stream(self, route: Route, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        """Stream a reply from the routed backend, falling back to the other until a delta has been sent.
+
+        If no backend can start the reply, the routed backend's error is raised.
+        """
+        first_error = None
+        candidates = self._candidates(route)
+        for index, backend in enumerate(candidates):
+            started = False
+            # Counted before the first await so that replies routed in the same burst see each other
+            self.active[backend.name] += 1
+            try:
+                async for delta in backend.stream(messages, **params):
+                    started = True
+                    yield delta
+                return
+            except Exception as error:
+                if started:
+                    raise
+                first_error = first_error or error
+                if index + 1 < len(candidates):
+                    fallback = candidates[index + 1].name
+                    LLM_FALLBACKS.inc(failed=backend.name, backend=fallback)
+                    logger.warning("%s backend failed (%s), replying with %s", backend.name,
+                                   type(error).__name__, fallback)
+            finally:
+                self.active[backend.name] -= 1
+        raise first_error
+
+
+model_router = ModelRouter(completion_backend, local_backend)
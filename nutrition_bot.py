@@ -0,0 +1,548 @@
+"""The chat logic behind the web app: NutritionBot, its shared lookup tables and the session store.
+
+Importing this module loads the translations and data tables but neither
+Gradio nor the OpenAI SDK; the completion client is created, and the API key
+checked, on the first request that needs the model.
+"""
+import os
+from dotenv import load_dotenv
+from typing import AsyncIterator, List, Optional
+import logging
+from model_router import model_router
+from resilience import CircuitOpenError, is_rate_limit
+from session_store import SessionStore, SharedSessionStore
+from response_cache import ResponseCache, profile_fingerprint
+from semantic_cache import SEMANTIC_CACHE, SemanticCache
+from state_backend import open_backend
+from nutrition_classifier import NutritionClassifier
+from intent_router import IntentRouter, RouteStats
+from food_db import NUTRIENT_UNITS, NUTRIENTS, FoodQueryParser, FoodTable
+from meal_planner import MealPlanner, RecipeTable, WeekPlan
+from metrics import Trace, registry, span
+from context_window import WINDOW_STEP, ContextWindow, fold_into_summary
+from conversation_log import CONVERSATION_LOG_PATH, ConversationLog
+from prompts import (COACH_RULES, FOLLOW_UP_REMINDER, FOOD_FACTS_HEADER, MEAL_PLAN_HEADER, ProfileFacts,
+                     profile_block, shared_profile, system_message)
+from health import ACTIVITY_FACTOR, CALORIE_ALIGNMENT_THRESHOLDS, PROTEIN_ALIGNMENT_THRESHOLDS, PROTEIN_G_PER_KG, \
+    WATER_ALIGNMENT_THRESHOLDS, WATER_L_PER_KG, alignment, bmi_category
+from i18n import DEFAULT_LANG, get_text, get_translations
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Translations, flattened once into per-language dotted-key tables
+translations, text_tables = get_translations()
+
+# Keyword matcher compiled once from the English and French keyword lists
+nutrition_classifier = NutritionClassifier.from_translations(translations)
+
+# Questions the profile alone answers (TDEE, BMR, protein, water, BMI) skip the LLM
+intent_router = IntentRouter.from_translations(translations)
+route_stats = RouteStats()
+RESPONSE_SECONDS = registry.histogram("nutribot_response_seconds", "get_response time by response path", ("path",))
+
+# Per-100 g food composition figures, quoted exactly instead of recalled by the model
+food_table = FoodTable.load()
+food_query_parser = FoodQueryParser.from_translations(translations)
+
+# Weekly menus are solved against the recipe table; the model only phrases the plan
+meal_planner = MealPlanner(RecipeTable.load(food_table))
+
+# Quick-action prompts in every language; their answers are shared across similar profiles
+QUICK_ACTION_PROMPTS = {
+    text for table in text_tables.values() for key, text in table.items() if key.startswith("quick_actions.prompts.")
+}
+FOOD_NUTRITION_PROMPTS = {table["quick_actions.prompts.food_nutrition"] for table in text_tables.values()}
+WEEKLY_MENU_PROMPTS = {table["quick_actions.prompts.weekly_menu"] for table in text_tables.values()}
+state_backend = open_backend()
+response_cache = ResponseCache(backend=state_backend if state_backend.shared else None)
+# Free-form opening questions reuse answers to close paraphrases
+semantic_cache = SemanticCache() if SEMANTIC_CACHE else None
+context_window = ContextWindow()
+# Durable turns and profiles, so conversations outlive restarts and session evictions
+conversation_log = ConversationLog(CONVERSATION_LOG_PATH) if CONVERSATION_LOG_PATH else None
+
+# Dietary preference checkbox labels in every language -> diet tags of the food table
+DIET_TAGS = {
+    label: key.split(".", 1)[1]
+    for table in text_tables.values() for key, label in table.items() if key.startswith("dietary_prefs.")
+}
+
+def format_food_facts(row: int, nutrients, grams: float, lang: str) -> str:
+    values = food_table.nutrients(row, grams)
+    facts = ", ".join(
+        f"{get_text(f'food_facts.names.{n}', lang)} {values[n]:.{0 if n == 'energy_kcal' or values[n] >= 10 else 1}f} "
+        f"{NUTRIENT_UNITS[n]}"
+        for n in nutrients if n in values
+    )
+    food = food_table.display_name(row, lang)
+    return get_text("food_facts.line", lang).format(food=food[:1].upper() + food[1:], grams=grams, facts=facts)
+
+def format_meal_plan(plan: WeekPlan, lang: str) -> str:
+    lines = [get_text("meal_plan.title", lang).format(
+        days=len(plan.days), calories=plan.calorie_target, protein=plan.protein_target)]
+    for number, day in enumerate(plan.days, 1):
+        totals = get_text("meal_plan.totals", lang).format(calories=day.energy_kcal, protein=day.protein_g)
+        lines.append(f"\n**{get_text('meal_plan.day', lang).format(day=number)}** ({totals})")
+        for meal in day.meals:
+            servings = "" if meal.servings == 1 else f" ({get_text('meal_plan.servings', lang).format(servings=meal.servings)})"
+            lines.append(f"- {get_text(f'meal_plan.meals.{meal.meal}', lang)}: "
+                         f"{meal_planner.recipes.display_name(meal.recipe, lang)}{servings}")
+    if plan.relaxed:
+        diets = ", ".join(get_text(f"dietary_prefs.{diet}", lang) for diet in plan.relaxed)
+        lines.append("\n" + get_text("meal_plan.relaxed", lang).format(diets=diets))
+    return "\n".join(lines)
+
+# Messages kept per session; older turns survive only in the rolling summary
+MAX_HISTORY_MESSAGES = int(os.getenv("MAX_HISTORY_MESSAGES", "20"))
+
+# Rough memory of a session without its text, and of each message besides its text (measured with tracemalloc)
+SESSION_BASE_BYTES = 3000
+MESSAGE_BYTES = 250
+
+# A seven-day plan does not fit the default reply budget
+MEAL_PLAN_MAX_TOKENS = 1000
+
+class NutritionBot:
+    # Sessions hold only their profile and history; the prompt is shared by all instances
+    __slots__ = ("user_data", "conversation_history", "language", "conversation_id", "_profile_inputs",
+                 "_profile", "_summary")
+
+    def __init__(self):
+        self.user_data = {}
+        self.conversation_history = []
+        self.language = DEFAULT_LANG
+        # Key in the conversation log, once the session is attached to it
+        self.conversation_id = None
+        self._profile_inputs = None
+        # What the system message shows of the profile; its rendering is shared through prompts.system_message
+        self._profile: Optional[ProfileFacts] = None
+        self._summary = ""
+
+    def approximate_size(self) -> int:
+        """Estimated bytes held by the session, dominated by its history"""
+        text = len(self._summary) + sum(len(message["content"]) for message in self.conversation_history)
+        return SESSION_BASE_BYTES + MESSAGE_BYTES * len(self.conversation_history) + text
+
+    def to_state(self) -> dict:
+        """JSON-serializable session state, for stores shared between workers"""
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "NutritionBot":
+        bot = cls()
+        for slot in cls.__slots__:
+            # Slots added since the state was written keep their defaults
+            if slot in state:
+                setattr(bot, slot, state[slot])
+        if bot._profile_inputs is not None:
+            # JSON turned the tuples compared by update_user_data into lists
+            inputs = list(bot._profile_inputs)
+            inputs[3] = tuple(inputs[3])
+            bot._profile_inputs = tuple(inputs)
+        if bot._profile is not None:
+            profile = ProfileFacts(*bot._profile)
+            bot._profile = profile._replace(dietary_preferences=tuple(profile.dietary_preferences))
+        elif bot._profile_inputs is not None:
+            # Written before profiles were kept as ProfileFacts
+            bot._rebuild_profile(bot.user_data["name"], *bot._profile_inputs)
+        return bot
+
+    def resume(self, conversation_id: str):
+        """Attach the session to its conversation log, restoring the profile, summary and recent turns"""
+        conversation = conversation_log.load(conversation_id, MAX_HISTORY_MESSAGES)
+        if conversation is not None:
+            if conversation.profile:
+                self.update_user_data(*conversation.profile)
+            self._summary = conversation.summary
+            self.conversation_history = conversation.turns
+        # Attached last, so restoring does not write the profile back
+        self.conversation_id = conversation_id
+
+    def _add_turn(self, role: str, content: str):
+        self.conversation_history.append({"role": role, "content": content})
+        if self.conversation_id is not None:
+            conversation_log.append(self.conversation_id, role, content)
+
+    def set_language(self, lang: str):
+        self.language = lang
+
+    def update_user_data(self, name: str, age: int, weight: float, height: float, dietary_prefs: List[str], 
+                        calories: int = None, protein: int = None, water: float = None) -> bool:
+        """Apply a profile edit, keeping the chat history. Returns False if nothing changed"""
+        with span("profile_update") as attrs:
+            profile_inputs = (age, weight, height, tuple(dietary_prefs or ()), calories, protein, water)
+            if not self.user_data or profile_inputs != self._profile_inputs:
+                with span("profile_rebuild"):
+                    self._rebuild_profile(name, age, weight, height, dietary_prefs, calories, protein, water)
+                self._profile_inputs = profile_inputs
+            elif name != self.user_data['name']:
+                # Only the name changed: the health figures and assessment are still valid
+                self.user_data['name'] = name
+                self._profile = self._profile._replace(name=name)
+            else:
+                attrs["changed"] = False
+                return False
+
+            attrs["changed"] = True
+            if self.conversation_id is not None:
+                profile = [name, age, weight, height, list(dietary_prefs or ()), calories, protein, water]
+                conversation_log.save_profile(self.conversation_id, profile)
+            return True
+
+    def _previous_prompt_prefix(self) -> List[dict]:
+        # Leading messages of the previous prompt layout, used to report prompt-token savings
+        prefix = [{"role": "system", "content": COACH_RULES + "\n\n" + FOLLOW_UP_REMINDER}]
+        if self._profile is None:
+            return prefix
+        return prefix + [
+            {"role": "system", "content": COACH_RULES + "\n\n" + profile_block(self._profile)},
+            {"role": "assistant", "content": f"👋 Hello {self._profile.name}! " + self._profile.assessment}
+        ]
+
+    def _rebuild_profile(self, name: str, age: int, weight: float, height: float, dietary_prefs: List[str],
+                         calories: int, protein: int, water: float):
+        self.user_data = {
+            "name": name,
+            "age": age,
+            "weight": weight,
+            "height": height,
+            "bmi": round(weight / ((height/100) ** 2), 1) if weight and height else None,
+            "dietary_preferences": dietary_prefs,
+            "calorie_target": calories,
+            "protein_target": protein,
+            "water_target": water
+        }
+        
+        bmr = self._calculate_bmr()
+        tdee = self._calculate_tdee(bmr)
+        self._profile = ProfileFacts(
+            name, age, weight, height, self.user_data["bmi"], tuple(dietary_prefs or ()), calories, protein, water,
+            bmr, tdee, self._get_bmi_category(), self._calculate_protein_needs(), self._calculate_water_needs(),
+            self._generate_health_assessment(bmr, tdee, calories, protein, water),
+        )
+
+    def _calculate_bmr(self) -> float:
+        if not all([self.user_data.get('weight'), self.user_data.get('height'), self.user_data.get('age')]):
+            return 0
+        weight = self.user_data['weight']
+        height = self.user_data['height']
+        age = self.user_data['age']
+        return (10 * weight) + (6.25 * height) - (5 * age) + 5
+
+    def _calculate_tdee(self, bmr: float = None) -> float:
+        if bmr is None:
+            bmr = self._calculate_bmr()
+        return bmr * ACTIVITY_FACTOR
+
+    def _get_bmi_category(self) -> str:
+        return bmi_category(self.user_data.get('bmi'))
+
+    def _calculate_protein_needs(self) -> float:
+        if not self.user_data.get('weight'):
+            return 0
+        return self.user_data['weight'] * PROTEIN_G_PER_KG
+
+    def _calculate_water_needs(self) -> float:
+        if not self.user_data.get('weight'):
+            return 0
+        return self.user_data['weight'] * WATER_L_PER_KG
+
+    def _generate_health_assessment(self, bmr: float, tdee: float, calories: int, protein: int, water: float) -> str:
+        assessment_parts = []
+        category = self._get_bmi_category()
+        if category != "Not available":
+            assessment_parts.append(f"Based on your BMI of {self.user_data['bmi']}, you are in the {category.lower()} category.")
+        calorie_alignment = alignment(calories, tdee, CALORIE_ALIGNMENT_THRESHOLDS)
+        if calorie_alignment != "not set":
+            if calorie_alignment == "significant":
+                assessment_parts.append(
+                    f"⚠️ Your calorie target of {calories}kcal is significantly different from your estimated daily needs ({tdee:.0f}kcal). This might be unsustainable in the long term. Consider adjusting your target."
+                )
+            elif calorie_alignment == "moderate":
+                assessment_parts.append(
+                    f"Your calorie target of {calories}kcal is moderately different from your estimated daily needs ({tdee:.0f}kcal). Make sure this aligns with your health goals."
+                )
+            else:
+                assessment_parts.append(
+                    f"Your calorie target of {calories}kcal is well-aligned with your estimated daily needs ({tdee:.0f}kcal)."
+                )
+        protein_needs = self._calculate_protein_needs()
+        protein_alignment = alignment(protein, protein_needs, PROTEIN_ALIGNMENT_THRESHOLDS)
+        if protein_alignment != "not set":
+            if protein_alignment == "significant":
+                assessment_parts.append(
+                    f"⚠️ Your protein target of {protein}g is significantly different from recommended needs ({protein_needs:.0f}g). This might not be optimal for your health goals."
+                )
+            elif protein_alignment == "moderate":
+                assessment_parts.append(
+                    f"Your protein target of {protein}g is moderately different from recommended needs ({protein_needs:.0f}g). Consider adjusting based on your activity level."
+                )
+            else:
+                assessment_parts.append(
+                    f"Your protein target of {protein}g aligns well with recommended needs ({protein_needs:.0f}g)."
+                )
+        water_needs = self._calculate_water_needs()
+        water_alignment = alignment(water, water_needs, WATER_ALIGNMENT_THRESHOLDS)
+        if water_alignment != "not set":
+            if water_alignment == "significant":
+                assessment_parts.append(
+                    f"⚠️ Your water intake target of {water}L is significantly different from recommended needs ({water_needs:.1f}L). This might affect your hydration status."
+                )
+            elif water_alignment == "moderate":
+                assessment_parts.append(
+                    f"Your water intake target of {water}L is moderately different from recommended needs ({water_needs:.1f}L). Consider adjusting based on your activity level and climate."
+                )
+            else:
+                assessment_parts.append(
+                    f"Your water intake target of {water}L aligns well with recommended needs ({water_needs:.1f}L)."
+                )
+        if self.user_data.get('dietary_preferences'):
+            prefs = self.user_data['dietary_preferences']
+            if len(prefs) > 3:
+                assessment_parts.append(
+                    "⚠️ You have multiple dietary restrictions. Make sure you're getting all necessary nutrients. Consider consulting a nutritionist for a detailed meal plan."
+                )
+            else:
+                assessment_parts.append(
+                    f"Your dietary preferences ({', '.join(prefs)}) have been noted. I'll provide recommendations that align with these preferences."
+                )
+        if assessment_parts:
+            return "\n\n".join(assessment_parts)
+        return "I've noted your information and will provide personalized nutrition advice based on your profile."
+
+    def _local_answer(self, intents) -> Optional[str]:
+        """Answer computable questions from the profile; None if it lacks the needed fields"""
+        lang = self.language
+        bmr = self._calculate_bmr()
+        parts = []
+        for intent in intents:
+            if intent in ("calories", "bmr") and not bmr:
+                return None
+            if intent in ("protein", "water") and not self.user_data.get('weight'):
+                return None
+            if intent == "bmi" and not self.user_data.get('bmi'):
+                return None
+            if intent == "calories":
+                parts.append(get_text("local_answers.calories", lang).format(tdee=self._calculate_tdee(bmr), bmr=bmr))
+                if self.user_data.get('calorie_target'):
+                    parts.append(get_text("local_answers.calorie_target", lang).format(target=self.user_data['calorie_target']))
+            elif intent == "bmr":
+                parts.append(get_text("local_answers.bmr", lang).format(bmr=bmr))
+            elif intent == "protein":
+                parts.append(get_text("local_answers.protein", lang).format(
+                    protein=self._calculate_protein_needs(), per_kg=PROTEIN_G_PER_KG))
+            elif intent == "water":
+                parts.append(get_text("local_answers.water", lang).format(
+                    water=self._calculate_water_needs(), per_kg=WATER_L_PER_KG))
+            elif intent == "bmi":
+                category = get_text(f"bmi_categories.{self._get_bmi_category()}", lang)
+                parts.append(get_text("local_answers.bmi", lang).format(bmi=self.user_data['bmi'], category=category))
+        return " ".join(parts) + "\n\n" + get_text("local_answers.follow_up", lang)
+
+    def _food_answer(self, rows, nutrients, grams: float) -> str:
+        lang = self.language
+        lines = [format_food_facts(row, nutrients, grams, lang) for row in rows]
+        return "\n".join(lines) + "\n\n" + get_text("food_facts.source", lang) + " " + get_text("food_facts.follow_up", lang)
+
+    def _food_reference(self, rows) -> str:
+        # Full per-100 g figures for the model, in the language of the system prompt
+        return FOOD_FACTS_HEADER + "\n".join("- " + format_food_facts(row, NUTRIENTS, 100, "en") for row in rows)
+
+    def _diet_tags(self) -> List[str]:
+        # Checkbox values carry an emoji prefix, e.g. "🥬 Vegetarian"
+        return [DIET_TAGS[pref.split(" ", 1)[-1]] for pref in self.user_data.get('dietary_preferences') or ()
+                if pref.split(" ", 1)[-1] in DIET_TAGS]
+
+    def _meal_plan(self) -> WeekPlan:
+        # Explicit targets first, then the estimated needs, then generic adult defaults
+        calories = self.user_data.get('calorie_target') or self._calculate_tdee() or 2000
+        protein = self.user_data.get('protein_target') or self._calculate_protein_needs() or 60
+        return meal_planner.plan_week(calories, protein, self._diet_tags())
+
+    def is_nutrition_related(self, query: str) -> bool:
+        match = nutrition_classifier.classify(query)
+        if match:
+            logger.debug("nutrition query matched %s rule on %r", match.rule, match.term)
+        return match is not None
+
+    def _trim_history(self):
+        excess = len(self.conversation_history) - MAX_HISTORY_MESSAGES
+        if excess > 0:
+            # Whole window steps, so the turns kept stay on the step grid the prompt window starts from
+            excess = min(len(self.conversation_history) - 1, -(-excess // WINDOW_STEP) * WINDOW_STEP)
+            self._summary = fold_into_summary(self._summary, self.conversation_history[:excess])
+            del self.conversation_history[:excess]
+            if self.conversation_id is not None:
+                conversation_log.save_summary(self.conversation_id, self._summary)
+
+    async def get_response(self, message: str) -> AsyncIterator[str]:
+        """Stream the reply, yielding the full text generated so far on each update"""
+        timer = route_stats.timer("llm")
+        trace = Trace(lang=self.language)
+        with trace.span("response") as attrs:
+            try:
+                async for text in self._respond(message, timer, trace):
+                    yield text
+            finally:
+                attrs["path"] = timer.path
+                RESPONSE_SECONDS.observe(timer.finish(), path=timer.path)
+
+    async def _respond(self, message: str, timer, trace: Trace) -> AsyncIterator[str]:
+        with trace.span("food_lookup"):
+            food_query = food_query_parser.parse(message)
+            food_rows = food_table.mentions(food_query.remainder)
+        local_answer, local_path = None, "local"
+        if food_rows and food_query.nutrients and food_query.asks_amount:
+            local_answer, local_path = self._food_answer(food_rows, food_query.nutrients, food_query.grams), "food"
+        else:
+            with trace.span("intent_route"):
+                intents = intent_router.route(message)
+                if intents:
+                    local_answer = self._local_answer(intents)
+        if local_answer is None:
+            with trace.span("classify"):
+                on_topic = self.is_nutrition_related(message)
+            if not on_topic:
+                timer.path = "off_topic"
+                yield get_text("bot.off_topic", self.language)
+                return
+        
+        lang = self.language
+        greeting_parts = []
+        if self.user_data.get('height') or self.user_data.get('weight') or self.user_data.get('age'):
+            greeting_parts.append(get_text("bot.greeting_intro", lang))
+            info_parts = []
+            if self.user_data.get('height'):
+                info_parts.append(get_text("bot.greeting_height", lang).format(self.user_data['height']))
+            if self.user_data.get('weight'):
+                info_parts.append(get_text("bot.greeting_weight", lang).format(self.user_data['weight']))
+            if self.user_data.get('age'):
+                info_parts.append(get_text("bot.greeting_age", lang).format(self.user_data['age']))
+            greeting_parts.append(", ".join(info_parts))
+        if self.user_data.get('dietary_preferences'):
+            greeting_parts.append(get_text("bot.greeting_diet", lang).format(', '.join(self.user_data['dietary_preferences'])))
+        greeting = " ".join(greeting_parts) + ".\n\n" if greeting_parts else ""
+
+        self._add_turn("user", message)
+
+        if local_answer is not None:
+            timer.path = local_path
+            self._add_turn("assistant", local_answer)
+            self._trim_history()
+            yield greeting + local_answer
+            return
+
+        cache_key = None
+        if message.strip() in QUICK_ACTION_PROMPTS:
+            with trace.span("cache_lookup"):
+                cache_key = response_cache.make_key(message, lang, self.user_data)
+                cached_response = response_cache.get(cache_key)
+            if cached_response is not None:
+                timer.path = "cache"
+                self._add_turn("assistant", cached_response)
+                self._trim_history()
+                yield greeting + cached_response
+                return
+
+        semantic_partition, semantic_vector = None, None
+        if cache_key is None and semantic_cache is not None and len(self.conversation_history) == 1:
+            # Opening questions only: later ones lean on the conversation so far
+            with trace.span("semantic_lookup"):
+                semantic_partition = (lang, profile_fingerprint(self.user_data), tuple(food_rows))
+                cached_response, semantic_vector = semantic_cache.lookup(semantic_partition, message)
+            if cached_response is not None:
+                timer.path = "semantic_cache"
+                self._add_turn("assistant", cached_response)
+                self._trim_history()
+                yield greeting + cached_response
+                return
+        
+        with trace.span("prompt_build") as attrs:
+            if cache_key is not None or semantic_partition is not None:
+                # The answer is cached for every user with this profile fingerprint: only the profile it
+                # covers and the request reach the model, not the name or the conversation so far
+                messages, prompt_tokens = context_window.build(
+                    system_message(self.language, shared_profile(self._profile)), self.conversation_history[-1:], "")
+            else:
+                messages, prompt_tokens = context_window.build(system_message(self.language, self._profile), self.conversation_history, self._summary)
+            context_window.record_savings(messages, prompt_tokens, self._previous_prompt_prefix())
+            if not food_rows and message.strip() in FOOD_NUTRITION_PROMPTS:
+                food_rows = food_table.staples(self._diet_tags())
+            if food_rows:
+                messages.append({"role": "system", "content": self._food_reference(food_rows)})
+            attrs["prompt_tokens"] = prompt_tokens
+        meal_plan = None
+        if message.strip() in WEEKLY_MENU_PROMPTS:
+            with trace.span("meal_plan"):
+                meal_plan = self._meal_plan()
+                messages.append({"role": "system", "content": MEAL_PLAN_HEADER + format_meal_plan(meal_plan, "en")})
+
+        # Retries, rate limiting and the circuit breaker live in the completion backends; the model,
+        # sampling parameters and fallback between backends in the router
+        route = model_router.route(message, quick_action=message.strip() in QUICK_ACTION_PROMPTS,
+                                   grounded=bool(food_rows))
+        try:
+            bot_response = ""
+            with trace.span("llm_stream", backend=route.backend) as attrs:
+                async for delta in model_router.stream(
+                    route,
+                    messages,
+                    max_tokens=MEAL_PLAN_MAX_TOKENS if meal_plan is not None else 500,
+                ):
+                    bot_response += delta
+                    yield greeting + bot_response
+                attrs["chars"] = len(bot_response)
+        except CircuitOpenError:
+            if meal_plan is not None:
+                # The plan itself needs no completion; only its phrasing is lost
+                bot_response = format_meal_plan(meal_plan, lang) + "\n\n" + get_text("meal_plan.follow_up", lang)
+                self._add_turn("assistant", bot_response)
+                self._trim_history()
+                yield greeting + bot_response
+                return
+            yield get_text("bot.unavailable", lang)
+            return
+        except Exception as error:
+            if is_rate_limit(error):
+                logger.warning("completion rate limited after retries")
+                yield get_text("bot.high_demand", lang)
+            else:
+                logger.exception("completion failed")
+                yield get_text("bot.error", lang)
+            return
+        # Only the finished message goes into the history
+        self._add_turn("assistant", bot_response)
+        self._trim_history()
+        if cache_key is not None:
+            response_cache.set(cache_key, bot_response)
+        if semantic_vector is not None:
+            semantic_cache.add(semantic_partition, semantic_vector, bot_response)
+
+# Shared backends (SQLite, Redis) let several worker processes serve the same sessions and cached answers
+if state_backend.shared:
+    sessions = SharedSessionStore(NutritionBot, NutritionBot.to_state, NutritionBot.from_state, state_backend)
+else:
+    sessions = SessionStore(NutritionBot, sizer=NutritionBot.approximate_size)
+
+registry.callback("nutribot_sessions", "Live chat sessions", lambda: len(sessions))
+registry.callback("nutribot_session_evictions_total", "Sessions dropped for idling or capacity",
+                  lambda: sessions.evictions, kind="counter")
+registry.callback("nutribot_response_cache_hits_total", "Quick-action cache hits", lambda: response_cache.hits,
+                  kind="counter")
+registry.callback("nutribot_response_cache_misses_total", "Quick-action cache misses", lambda: response_cache.misses,
+                  kind="counter")
+if semantic_cache is not None:
+    registry.callback("nutribot_semantic_cache_hits_total", "Free-form questions answered from the semantic cache",
+                      lambda: semantic_cache.hits, kind="counter")
+    registry.callback("nutribot_semantic_cache_misses_total", "Semantic cache lookups without a close enough question",
+                      lambda: semantic_cache.misses, kind="counter")
+    registry.callback("nutribot_semantic_cache_entries", "Answers held by the semantic cache",
+                      lambda: semantic_cache.entries)
+    registry.callback("nutribot_semantic_cache_index_bytes", "Memory of the semantic cache vector index",
+                      semantic_cache.memory_bytes)
+registry.callback("nutribot_prompt_tokens_saved_total", "Prompt tokens saved against the previous prompt layout",
+                  lambda: context_window.tokens_saved, kind="counter")
+
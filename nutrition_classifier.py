@@ -0,0 +1,77 @@
+import re
+from typing import Dict, Iterable, NamedTuple, Optional
+
+# Rules in the order NutritionBot.is_nutrition_related used to check them. The pattern reports the leftmost
+# match, so this order only decides which rule is reported when several match at the same position
+RULES = ("keywords", "question_words", "health_adjectives")
+
+
+class ClassifierMatch(NamedTuple):
+    rule: str
+    term: str
+
+
+def trie_pattern(terms: Iterable[str]) -> str:
+    """Regex for a set of terms with shared prefixes factored out.
+
+    Each alternation only branches on distinct next characters, so matching cost
+    depends on the query length rather than on the number of terms.
+    """
+    trie: Dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        is_end = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional suffix: the longest keyword wins over its prefix
+        return "(?:" + body + ")?" if is_end else body
+
+    return build(trie)
+
+
+def words_pattern(terms: Iterable[str]) -> str:
+    """Regex matching any of ``terms`` as whole words or phrases"""
+    return r"(?<!\w)(?:" + trie_pattern(set(terms)) + r")(?!\w)"
+
+
+class NutritionClassifier:
+    """Single-pass, precompiled matcher deciding whether a query is nutrition related.
+
+    Keyword lists come from the ``classifier`` section of every language in
+    translations.json and are compiled into one regex. Keywords and adjectives
+    match at the start of a word (so "calorie" also matches "calories"); question
+    words must be a whole word at the start of the query.
+    """
+
+    def __init__(self, question_words: Iterable[str], keywords: Iterable[str], health_adjectives: Iterable[str]):
+        groups = {
+            "question_words": r"^\s*(?:" + trie_pattern(set(question_words)) + r")\b",
+            "keywords": r"\b(?:" + trie_pattern(set(keywords)) + ")",
+            "health_adjectives": r"\b(?:" + trie_pattern(set(health_adjectives)) + ")",
+        }
+        self._pattern = re.compile(
+            "|".join(f"(?P<{rule}>{groups[rule]})" for rule in RULES),
+            re.IGNORECASE,
+        )
+
+    @classmethod
+    def from_translations(cls, translations: Dict) -> "NutritionClassifier":
+        terms = {rule: [] for rule in RULES}
+        for lang_texts in translations.values():
+            for rule in RULES:
+                terms[rule].extend(term.lower() for term in lang_texts["classifier"][rule])
+        return cls(**terms)
+
+    def classify(self, query: str) -> Optional[ClassifierMatch]:
+        """Return the rule and term that matched first, or None for off-topic queries"""
+        match = self._pattern.search(query)
+        if match is None:
+            return None
+        return ClassifierMatch(match.lastgroup, match.group(match.lastgroup).strip().lower())
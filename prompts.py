@@ -0,0 +1,127 @@
+"""Prompt text and the layout of the system message.
+
+Providers reuse their work on a prompt prefix they have already seen (OpenAI
+from 1024 tokens, reported as ``usage.prompt_tokens_details.cached_tokens``),
+so every prompt runs from the most to the least widely shared content, each
+part rendering to the same bytes every time:
+
+1. the coaching rules and follow-up reminder, identical for every session
+2. the reply language, one variant per language
+3. the user's profile, rendered once per profile version (without the name
+   when the answer is cached for other users too)
+4. the rolling summary and recent turns (``ContextWindow`` moves them in steps)
+5. context for this request only (food facts, meal plan), after the turns
+
+Templates are dedented once at import and rendered with their bound ``format``.
+"""
+import inspect
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from i18n import get_text
+
+# Rendered system messages kept, one per (language, profile version)
+SYSTEM_MESSAGE_CACHE_SIZE = 4096
+
+COACH_RULES = inspect.cleandoc("""
+    You are NutriCoach, a professional and engaging nutrition coach with expertise in dietary planning and nutritional science.
+    Your role is to provide personalized, evidence-based nutrition advice while following these guidelines:
+
+    1. ONLY answer questions related to nutrition, diet, food, and healthy eating habits
+    2. If asked about non-nutrition topics, politely redirect the conversation to nutrition-related topics
+    3. Base all advice on scientific evidence and established nutritional guidelines
+    4. Consider the user's complete profile (age, weight, dietary preferences, goals) when providing advice
+    5. Be mindful of dietary restrictions and preferences
+    6. Provide practical, actionable advice that's easy to implement
+    7. Include specific food suggestions and meal ideas when relevant
+    8. Explain the nutritional benefits of recommended foods
+    9. Offer alternatives when suggesting foods that might not fit dietary preferences
+    10. When discussing calories or nutrients, provide context for why they're important
+    11. ALWAYS end your responses with a relevant follow-up question to keep the conversation engaging
+    12. Use a friendly, encouraging tone and acknowledge the user's interests and concerns
+    13. When appropriate, break down complex advice into smaller, manageable steps
+    14. Celebrate small wins and encourage sustainable changes
+    15. If the user shares a goal or challenge, ask clarifying questions to provide better-tailored advice
+
+    Remember to maintain a supportive and motivating tone throughout the conversation.
+""")
+
+FOLLOW_UP_REMINDER = ("Remember to end this response with an engaging follow-up question that encourages the user to "
+                      "share more details or explore related nutrition topics.")
+
+PROFILE_TEMPLATE = inspect.cleandoc("""
+    User Profile:
+    {name_line}- Age: {age} years
+    - Weight: {weight}kg
+    - Height: {height}cm
+    - BMI: {bmi} (calculated)
+    - Dietary Preferences: {diets}
+    - Daily Targets: {calories}kcal, {protein}g protein, {water}L water
+    - Estimated BMR: {bmr:.0f}kcal
+    - Estimated TDEE: {tdee:.0f}kcal
+
+    Health Status:
+    - BMI Category: {bmi_category}
+    - Protein Needs: {protein_needs:.0f}g
+    - Water Needs: {water_needs:.1f}L
+
+    Provide personalized nutrition advice based on this profile. Consider:
+    1. The user's BMI category and health status
+    2. Their specific dietary preferences and restrictions
+    3. Their calculated nutritional needs
+    4. Age-appropriate recommendations
+    5. Practical meal suggestions that fit their calorie targets
+
+    Initial assessment shared with the user:
+    {assessment}
+""")
+_render_profile = PROFILE_TEMPLATE.format
+
+FOOD_FACTS_HEADER = "Nutrition facts from the bundled food composition table; quote these figures exactly when relevant:\n"
+
+MEAL_PLAN_HEADER = ("Weekly meal plan computed for this user's targets and dietary preferences. Present it day by day "
+                    "in the user's language with brief, encouraging notes; do not change the recipes, servings or figures:\n")
+
+
+class ProfileFacts(NamedTuple):
+    """Everything the profile block shows; one value per profile version"""
+    name: str
+    age: int
+    weight: float
+    height: float
+    bmi: Optional[float]
+    dietary_preferences: Tuple[str, ...]
+    calories: Optional[int]
+    protein: Optional[int]
+    water: Optional[float]
+    bmr: float
+    tdee: float
+    bmi_category: str
+    protein_needs: float
+    water_needs: float
+    assessment: str
+
+
+@lru_cache(maxsize=None)
+def static_prefix(lang: str) -> str:
+    """Rules, follow-up reminder and reply language: the part shared by every session in ``lang``"""
+    return COACH_RULES + "\n\n" + FOLLOW_UP_REMINDER + "\n\n" + get_text("bot.reply_language", lang)
+
+
+def profile_block(profile: ProfileFacts) -> str:
+    name_line = f"- Name: {profile.name}\n" if profile.name else ""
+    return _render_profile(**profile._asdict(), name_line=name_line,
+                           diets=", ".join(profile.dietary_preferences) or "None specified")
+
+
+def shared_profile(profile: Optional[ProfileFacts]) -> Optional[ProfileFacts]:
+    """``profile`` without the user's name, for answers cached for every user in its fingerprint bucket"""
+    return None if profile is None else profile._replace(name="")
+
+
+@lru_cache(maxsize=SYSTEM_MESSAGE_CACHE_SIZE)
+def system_message(lang: str, profile: Optional[ProfileFacts]) -> str:
+    """The pinned system message; sessions with the same language and profile share one string"""
+    if profile is None:
+        return static_prefix(lang)
+    return static_prefix(lang) + "\n\n" + profile_block(profile)
@@ -0,0 +1,218 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "20"))
+# Process-wide quota, shared by every session on this worker
+OPENAI_RPM_LIMIT = float(os.getenv("OPENAI_RPM_LIMIT", "3500"))
+OPENAI_TPM_LIMIT = float(os.getenv("OPENAI_TPM_LIMIT", "160000"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_FAILURE_RATIO = float(os.getenv("BREAKER_FAILURE_RATIO", "0.5"))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+
+# openai is imported on first use: it is slow to import, and loaded by the client before any error anyway
+
+def is_retryable(error: Exception) -> bool:
+    """Errors worth another attempt; anything else (bad request, auth) fails immediately"""
+    import openai
+    return isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError,
+                              openai.InternalServerError))
+
+
+def is_outage(error: Exception) -> bool:
+    """Errors that indicate the upstream is unhealthy, as opposed to us exceeding the quota"""
+    import openai
+    return isinstance(error, (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError))
+
+
+def is_upstream_response(error: Exception) -> bool:
+    """Errors carrying an HTTP response from the upstream, as opposed to failing before any request"""
+    import openai
+    return isinstance(error, openai.APIStatusError)
+
+
+def is_rate_limit(error: Exception) -> bool:
+    import openai
+    return isinstance(error, openai.RateLimitError)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the server through Retry-After / retry-after-ms headers, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, overridden by server-provided delays"""
+
+    def __init__(self, max_attempts: int = RETRY_MAX_ATTEMPTS, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY, rng: Callable[[], float] = random.random):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng
+
+    def delay(self, attempt: int, error: Exception = None) -> float:
+        server_delay = retry_after_seconds(error) if error is not None else None
+        if server_delay is not None:
+            return min(server_delay, self.max_delay)
+        return self._rng() * min(self.max_delay, self.base_delay * (2 ** attempt))
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``rate_per_minute``"""
+
+    def __init__(self, rate_per_minute: float, capacity: float = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Process-wide request and token quota for the completion API.
+
+    Callers wait their turn instead of each hitting the API and retrying on 429s.
+    A 429 with Retry-After pauses every caller, not just the one that got it.
+    """
+
+    def __init__(self, requests_per_minute: float = OPENAI_RPM_LIMIT, tokens_per_minute: float = OPENAI_TPM_LIMIT):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: float):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # One waiter at a time keeps the queue FIFO
+        async with self._lock:
+            while True:
+                wait = max(self._paused_until - time.monotonic(),
+                           self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+
+
+class CircuitBreaker:
+    """Fails fast while the upstream is unhealthy, probing again after ``reset_seconds``.
+
+    closed -> open once the last ``window`` calls hold at least ``failure_threshold``
+    failures making up ``failure_ratio`` of them; open -> half-open once
+    ``reset_seconds`` have passed, letting one probe through; the probe's outcome
+    closes or re-opens the circuit, and a probe abandoned without one (cancelled,
+    its stream closed, or failed before reaching the upstream) hands the slot to
+    the next call. A ratio rather than a consecutive count keeps interleaved
+    concurrent calls from tripping it on a merely flaky upstream.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 failure_ratio: float = BREAKER_FAILURE_RATIO, window: int = BREAKER_WINDOW,
+                 reset_seconds: float = BREAKER_RESET_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.failure_ratio = failure_ratio
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._outcomes = deque(maxlen=max(window, failure_threshold))
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    @property
+    def failures(self) -> int:
+        return self._outcomes.count(False)
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError if the call may not go ahead; True if it is the half-open probe"""
+        state = self.state
+        if state == "open" or (state == "half-open" and self._probing):
+            raise CircuitOpenError("Completion API circuit is open")
+        if state == "half-open":
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self):
+        """Let another call probe after the probe ended without an outcome"""
+        self._probing = False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("circuit breaker closed")
+            self._outcomes.clear()
+        self._outcomes.append(True)
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self._outcomes.append(False)
+        self._probing = False
+        failures = self.failures
+        if self.opened_at is not None:
+            self.opened_at = self._clock()
+        elif failures >= self.failure_threshold and failures >= self.failure_ratio * len(self._outcomes):
+            logger.warning("circuit breaker opened after %d of the last %d calls failed", failures, len(self._outcomes))
+            self.opened_at = self._clock()
@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from state_backend import SQLiteBackend
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+# Optional SQLite file so cached answers survive restarts; empty keeps the cache in memory only
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "")
+
+
+def _band(value: Optional[float], width: float) -> Optional[int]:
+    if not value:
+        return None
+    return int(value // width)
+
+
+def profile_fingerprint(user_data: Dict[str, Any]) -> Tuple:
+    """Coarse profile bucket: users in the same bucket get the same quick-action answer"""
+    return (
+        _band(user_data.get("age"), 10),
+        _band(user_data.get("bmi"), 2.5),
+        tuple(sorted(user_data.get("dietary_preferences") or [])),
+        _band(user_data.get("calorie_target"), 250),
+        _band(user_data.get("protein_target"), 20),
+        _band(user_data.get("water_target"), 0.5),
+    )
+
+
+class ResponseCache:
+    """LRU + TTL completion cache in front of an optional second-tier backend.
+
+    The second tier is a state_backend shared with other workers, or else a
+    SQLite file at ``path`` so cached answers survive restarts.
+    """
+
+    namespace = "response"
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 path: str = RESPONSE_CACHE_PATH, backend=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._backend = backend if backend is not None else (SQLiteBackend(path) if path else None)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(prompt: str, language: str, user_data: Dict[str, Any]) -> str:
+        payload = json.dumps([prompt.strip(), language, profile_fingerprint(user_data)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self._backend is not None:
+            # Outside the lock: the second tier may be a network round trip
+            stored = self._backend.get(self.namespace, key)
+            if stored is not None:
+                expires_at, value = stored.split(":", 1)
+                entry = (float(expires_at), value)
+        with self._lock:
+            if entry is None or entry[0] < now:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: str):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            self._evict()
+        if self._backend is not None:
+            self._backend.set(self.namespace, key, f"{expires_at}:{value}", self.ttl_seconds)
+
+    def _evict(self):
+        # Only the local tier is bounded here; the second tier expires entries by TTL
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
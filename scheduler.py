@@ -0,0 +1,97 @@
+"""Queue and concurrency settings for the Gradio app, from the environment or the command line.
+
+Events are split into named concurrency groups: ``llm`` for handlers that wait
+on a completion and ``local`` for cheap handlers (profile updates, quick
+actions, language switches). Gradio drains each group against its own limit
+and the worker pool is sized to run both groups at their limits, so local
+events never wait behind completions. Within the ``llm`` group a session holds
+at most ``session_max_active`` slots, so one user cannot crowd out the others.
+"""
+import argparse
+import os
+import threading
+from typing import Dict, NamedTuple
+
+from dotenv import load_dotenv
+
+from metrics import registry
+
+load_dotenv()
+
+LLM_GROUP = "llm"
+LOCAL_GROUP = "local"
+
+# Events waiting across all groups before new ones are refused with "queue is full"
+QUEUE_MAX_SIZE = int(os.getenv("QUEUE_MAX_SIZE", "200"))
+# Completions beyond the backend's own limit would only wait on its semaphore
+LLM_CONCURRENCY_LIMIT = int(os.getenv("LLM_CONCURRENCY_LIMIT", os.getenv("OPENAI_MAX_CONCURRENT_REQUESTS", "32")))
+LOCAL_CONCURRENCY_LIMIT = int(os.getenv("LOCAL_CONCURRENCY_LIMIT", "8"))
+SESSION_MAX_ACTIVE = int(os.getenv("SESSION_MAX_ACTIVE", "1"))
+# Gradio's default worker count; raised when the groups need more
+DEFAULT_MAX_THREADS = 40
+
+SESSION_BUSY = registry.counter("nutribot_session_busy_total", "Messages refused while the session's earlier "
+                                "messages were still being answered")
+
+
+class SchedulerConfig(NamedTuple):
+    queue_max_size: int = QUEUE_MAX_SIZE
+    llm_concurrency: int = LLM_CONCURRENCY_LIMIT
+    local_concurrency: int = LOCAL_CONCURRENCY_LIMIT
+    session_max_active: int = SESSION_MAX_ACTIVE
+
+    @property
+    def max_threads(self) -> int:
+        return max(DEFAULT_MAX_THREADS, self.llm_concurrency + self.local_concurrency)
+
+    @staticmethod
+    def add_arguments(parser: argparse.ArgumentParser):
+        parser.add_argument("--queue-size", type=int, default=QUEUE_MAX_SIZE,
+                            help="events waiting in the queue before new ones are refused")
+        parser.add_argument("--llm-concurrency", type=int, default=LLM_CONCURRENCY_LIMIT,
+                            help="chat replies generated at once")
+        parser.add_argument("--local-concurrency", type=int, default=LOCAL_CONCURRENCY_LIMIT,
+                            help="profile updates, quick actions and language switches handled at once")
+        parser.add_argument("--session-max-active", type=int, default=SESSION_MAX_ACTIVE,
+                            help="chat replies one session may have in progress")
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "SchedulerConfig":
+        return cls(args.queue_size, args.llm_concurrency, args.local_concurrency, args.session_max_active)
+
+
+class SessionGate:
+    """Counts in-progress replies per session and refuses those beyond ``limit``"""
+
+    def __init__(self, limit: int = SESSION_MAX_ACTIVE):
+        self.limit = limit
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def try_enter(self, session_id: str) -> bool:
+        with self._lock:
+            active = self._active.get(session_id, 0)
+            if active >= self.limit:
+                SESSION_BUSY.inc()
+                return False
+            self._active[session_id] = active + 1
+            return True
+
+    def leave(self, session_id: str):
+        with self._lock:
+            active = self._active.pop(session_id, 1) - 1
+            if active > 0:
+                self._active[session_id] = active
+
+
+session_gate = SessionGate()
+
+
+def configure(demo, config: SchedulerConfig):
+    """Apply the group limits to every event of ``demo`` and enable its queue; launch with ``config.max_threads``"""
+    limits = {LLM_GROUP: config.llm_concurrency, LOCAL_GROUP: config.local_concurrency}
+    for block_fn in demo.fns.values():
+        if block_fn.concurrency_id in limits:
+            block_fn.concurrency_limit = limits[block_fn.concurrency_id]
+    session_gate.limit = config.session_max_active
+    return demo.queue(max_size=config.queue_max_size)
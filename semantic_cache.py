@@ -0,0 +1,178 @@
+"""Answers to free-form questions reused across paraphrases ("is brown rice healthy" / "how healthy is brown rice?").
+
+Questions are embedded with a hashed n-gram vectorizer (no model to download)
+and compared by cosine similarity against earlier questions in the same
+partition; the partition key holds whatever else shapes the answer (language,
+coarse profile bucket, foods looked up for the prompt). Each partition is a
+NumPy matrix searched exhaustively, which stays well under a millisecond at a
+few thousand rows. Capacity is bounded per partition and in total, evicting
+the least recently used entries, then partitions.
+"""
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Hashable, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "1") == "1"
+# Cosine similarity above which an earlier answer is reused; lower it for more hits and more misfires
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "50000"))
+SEMANTIC_CACHE_PARTITION_ENTRIES = int(os.getenv("SEMANTIC_CACHE_PARTITION_ENTRIES", "5000"))
+# Hashed feature dimensions; memory is 4 bytes x dimensions per entry
+VECTOR_DIMENSIONS = 256
+CHAR_NGRAM = 3
+# Words that change little in a question's meaning, in both supported languages; polarity and quantity words
+# ("good", "bad", "much", "many") decide the answer and stay
+STOPWORDS = frozenset((
+    "a an the is are was be do does did can could should would i me my you your it its this that these those of to in "
+    "on for with and or about some any really"
+).split() + (
+    "le la les un une des du de d l est sont je me mon ma mes tu te ton ta tes vous votre vos il elle ce cette ces "
+    "pour avec et ou dans sur au aux en"
+).split())
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercased, accent-free content words"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return [word for word in _WORD.findall(text) if word not in STOPWORDS]
+
+
+@lru_cache(maxsize=65536)
+def _feature(gram: str, dimensions: int) -> Tuple[int, float]:
+    # crc32 rather than hash(): vectors must agree across processes and restarts
+    value = zlib.crc32(gram.encode("utf-8"))
+    return value % dimensions, 1.0 if value & 0x80000000 else -1.0
+
+
+class HashedNgramVectorizer:
+    """Unit vectors of signed hashed word and character n-gram counts"""
+
+    def __init__(self, dimensions: int = VECTOR_DIMENSIONS, ngram: int = CHAR_NGRAM):
+        self.dimensions = dimensions
+        self.ngram = ngram
+
+    def grams(self, words: List[str]) -> List[str]:
+        grams = ["w:" + word for word in words]
+        for word in words:
+            padded = f" {word} "
+            grams.extend(padded[i:i + self.ngram] for i in range(len(padded) - self.ngram + 1))
+        return grams
+
+    def transform(self, text: str) -> Optional[np.ndarray]:
+        """Vector of ``text``, or None when no content words remain"""
+        words = normalize(text)
+        if not words:
+            return None
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for gram in self.grams(words):
+            index, sign = _feature(gram, self.dimensions)
+            vector[index] += sign
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+
+class _Partition:
+    __slots__ = ("vectors", "answers", "last_used", "size")
+
+    def __init__(self, dimensions: int, capacity: int):
+        # Grown by doubling up to ``capacity`` rows
+        self.vectors = np.empty((min(capacity, 64), dimensions), dtype=np.float32)
+        self.answers: List[Optional[str]] = []
+        self.last_used = np.empty(len(self.vectors), dtype=np.int64)
+        self.size = 0
+
+    def search(self, vector: np.ndarray) -> Tuple[int, float]:
+        scores = self.vectors[:self.size] @ vector
+        best = int(np.argmax(scores))
+        return best, float(scores[best])
+
+    def insert(self, vector: np.ndarray, answer: str, tick: int, capacity: int) -> bool:
+        """Store an entry; returns True if it replaced the least recently used one"""
+        if self.size == capacity:
+            row = int(np.argmin(self.last_used[:self.size]))
+            self.vectors[row], self.answers[row], self.last_used[row] = vector, answer, tick
+            return True
+        if self.size == len(self.vectors):
+            rows = min(capacity, 2 * len(self.vectors))
+            self.vectors = np.resize(self.vectors, (rows, self.vectors.shape[1]))
+            self.last_used = np.resize(self.last_used, rows)
+        self.vectors[self.size], self.last_used[self.size] = vector, tick
+        self.answers.append(answer)
+        self.size += 1
+        return False
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 partition_entries: int = SEMANTIC_CACHE_PARTITION_ENTRIES,
+                 vectorizer: Optional[HashedNgramVectorizer] = None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.partition_entries = partition_entries
+        self.vectorizer = vectorizer or HashedNgramVectorizer()
+        self._partitions: "OrderedDict[Hashable, _Partition]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._tick = 0
+        self.entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, partition: Hashable, question: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """The answer to a similar earlier question, and the question's vector for ``add``"""
+        vector = self.vectorizer.transform(question)
+        if vector is None:
+            return None, None
+        with self._lock:
+            self._tick += 1
+            entries = self._partitions.get(partition)
+            if entries is not None and entries.size:
+                self._partitions.move_to_end(partition)
+                row, score = entries.search(vector)
+                if score >= self.threshold:
+                    entries.last_used[row] = self._tick
+                    self.hits += 1
+                    return entries.answers[row], vector
+            self.misses += 1
+            return None, vector
+
+    def add(self, partition: Hashable, vector: np.ndarray, answer: str):
+        with self._lock:
+            self._tick += 1
+            entries = self._partitions.get(partition)
+            if entries is None:
+                entries = self._partitions[partition] = _Partition(len(vector), self.partition_entries)
+            self._partitions.move_to_end(partition)
+            if entries.insert(vector, answer, self._tick, self.partition_entries):
+                self.evictions += 1
+            else:
+                self.entries += 1
+            while self.entries > self.max_entries:
+                _, oldest = self._partitions.popitem(last=False)
+                self.entries -= oldest.size
+                self.evictions += oldest.size
+
+    @property
+    def partitions(self) -> int:
+        return len(self._partitions)
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the vector index (answers excluded)"""
+        return sum(p.vectors.nbytes + p.last_used.nbytes for p in self._partitions.values())
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,108 @@
+"""Production entry point: runs several ``app.py`` workers on consecutive ports.
+
+Usage: python serve.py [--workers 4] [--port 7860] [--host 0.0.0.0] [scheduler flags]
+
+Gradio keeps each event queue and its streaming connections inside one
+process, so workers cannot share a listening socket: worker ``i`` listens on
+``port + i`` and a reverse proxy with sticky sessions spreads users across
+them (see the README). Sessions and cached answers live in STATE_BACKEND,
+which defaults to a SQLite file when more than one worker runs. The OpenAI
+rate limits are split evenly between the workers. A worker that exits is
+restarted; SIGINT or SIGTERM stops them all.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import List
+
+from dotenv import load_dotenv
+
+from resilience import OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT
+from scheduler import SchedulerConfig
+from state_backend import STATE_BACKEND
+
+load_dotenv()
+
+# Same variable as gunicorn and uvicorn; one worker per core by default
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# Used when several workers run and STATE_BACKEND is left at "memory"
+DEFAULT_SHARED_BACKEND = "sqlite:///state.db"
+# Per-process budgets that add up across workers
+SPLIT_LIMITS = {"OPENAI_RPM_LIMIT": OPENAI_RPM_LIMIT, "OPENAI_TPM_LIMIT": OPENAI_TPM_LIMIT}
+# Restart delay of a crashing worker, doubled while it keeps exiting within MAX_RESTART_DELAY of starting
+RESTART_BACKOFF_SECONDS = 1.0
+MAX_RESTART_DELAY = 30.0
+
+
+def worker_env(workers: int) -> dict:
+    env = dict(os.environ)
+    if workers > 1 and STATE_BACKEND == "memory":
+        env["STATE_BACKEND"] = DEFAULT_SHARED_BACKEND
+    for name, limit in SPLIT_LIMITS.items():
+        env[name] = str(limit / workers)
+    return env
+
+
+def scheduler_flags(config: SchedulerConfig) -> List[str]:
+    return ["--queue-size", str(config.queue_max_size), "--llm-concurrency", str(config.llm_concurrency),
+            "--local-concurrency", str(config.local_concurrency),
+            "--session-max-active", str(config.session_max_active)]
+
+
+class Supervisor:
+    def __init__(self, workers: int, host: str, port: int, flags: List[str]):
+        self.commands = [[sys.executable, "app.py", "--host", host, "--port", str(port + i)] + flags
+                         for i in range(workers)]
+        self.env = worker_env(workers)
+        self.processes: List[subprocess.Popen] = []
+        self.started_at: List[float] = []
+        self.delays = [0.0] * workers
+        self.stopping = False
+
+    def start(self, index: int):
+        process = subprocess.Popen(self.commands[index], env=self.env)
+        if index < len(self.processes):
+            self.processes[index], self.started_at[index] = process, time.monotonic()
+        else:
+            self.processes.append(process)
+            self.started_at.append(time.monotonic())
+
+    def stop(self, *_):
+        self.stopping = True
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for index in range(len(self.commands)):
+            self.start(index)
+        while not self.stopping:
+            time.sleep(0.5)
+            for index, process in enumerate(self.processes):
+                if self.stopping or process.poll() is None:
+                    continue
+                uptime = time.monotonic() - self.started_at[index]
+                self.delays[index] = 0.0 if uptime > MAX_RESTART_DELAY else \
+                    min(MAX_RESTART_DELAY, max(RESTART_BACKOFF_SECONDS, self.delays[index] * 2))
+                print(f"worker {index} exited with {process.returncode}; restarting in {self.delays[index]:.0f}s",
+                      file=sys.stderr)
+                time.sleep(self.delays[index])
+                if not self.stopping:
+                    self.start(index)
+        for process in self.processes:
+            process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY, help="app processes to run")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=7860, help="port of the first worker")
+    SchedulerConfig.add_arguments(parser)
+    args = parser.parse_args()
+    Supervisor(args.workers, args.host, args.port, scheduler_flags(SchedulerConfig.from_args(args))).run()
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "5000"))
+# Estimated memory of all live sessions, as reported by the store's ``sizer``
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", "50000000"))
+
+
+class SessionStore:
+    """Per-session state keyed by the Gradio session hash.
+
+    Entries are kept in least-recently-used order, so sessions idle for longer
+    than ``ttl_seconds`` are always at the front and are dropped on access.
+    Least recently used sessions are evicted once there are more than
+    ``max_sessions``, or once their estimated size exceeds ``max_bytes``. A
+    session's size comes from ``sizer`` and is re-measured whenever it is
+    fetched or saved; without a sizer only the count is bounded.
+    """
+
+    def __init__(self, factory: Callable[[], Any], ttl_seconds: float = SESSION_TTL_SECONDS,
+                 max_sessions: int = MAX_SESSIONS, max_bytes: int = SESSION_MAX_BYTES,
+                 sizer: Optional[Callable[[Any], int]] = None, clock: Callable[[], float] = time.monotonic):
+        self._factory = factory
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sizer = sizer
+        self._clock = clock
+        # session id -> (last seen, state, estimated bytes)
+        self._sessions: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.total_bytes = 0
+
+    def _size(self, state: Any) -> int:
+        return self._sizer(state) if self._sizer is not None else 0
+
+    def get(self, session_id: str) -> Any:
+        """Return the state for ``session_id``, creating it on first use"""
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.pop(session_id, None)
+            if entry is not None:
+                self.total_bytes -= entry[2]
+            state = entry[1] if entry else self._factory()
+            self._store(session_id, now, state)
+            return state
+
+    def save(self, session_id: str, state: Any):
+        """States are live objects here; saving only re-measures the session after a change"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[1] is not state:
+                return
+            self.total_bytes -= entry[2]
+            self._store(session_id, entry[0], state)
+
+    def discard(self, session_id: str):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is not None:
+                self.total_bytes -= entry[2]
+
+    def _store(self, session_id: str, last_seen: float, state: Any):
+        size = self._size(state)
+        self._sessions[session_id] = (last_seen, state, size)
+        self.total_bytes += size
+        # The session being stored always stays, even if it alone is over the limit
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or self.total_bytes > self.max_bytes):
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        _, (_, _, size) = self._sessions.popitem(last=False)
+        self.total_bytes -= size
+        self.evictions += 1
+
+    def _expire(self, now: float):
+        while self._sessions:
+            last_seen, _, _ = next(iter(self._sessions.values()))
+            if now - last_seen < self.ttl_seconds:
+                break
+            self._evict_oldest()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SharedSessionStore:
+    """Per-session state in a shared backend (see state_backend), so any worker can serve any session.
+
+    Handlers ``save`` the state after changing it; it is written as JSON with a
+    fresh revision tag. ``get`` returns the live object this process already
+    holds while the stored revision still matches, so concurrent handlers of
+    one session in one worker see each other's changes, and decodes the stored
+    state only after another worker has written it. Idle sessions expire with
+    the backend TTL; when two workers change one session at once the last
+    write wins, so deployments route each session to one worker.
+    """
+
+    namespace = "session"
+
+    def __init__(self, factory: Callable[[], Any], dump: Callable[[Any], Dict], load: Callable[[Dict], Any],
+                 backend, ttl_seconds: float = SESSION_TTL_SECONDS, max_local: int = MAX_SESSIONS):
+        self._factory = factory
+        self._dump = dump
+        self._load = load
+        self._backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_local = max_local
+        # session id -> (revision, live state); an empty revision marks a state not saved yet
+        self._local: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _remember(self, session_id: str, revision: str, state: Any):
+        self._local[session_id] = (revision, state)
+        self._local.move_to_end(session_id)
+        while len(self._local) > self.max_local:
+            self._local.popitem(last=False)
+
+    def get(self, session_id: str) -> Any:
+        stored = self._backend.get(self.namespace, session_id)
+        revision, payload = stored.split(":", 1) if stored is not None else ("", None)
+        with self._lock:
+            entry = self._local.get(session_id)
+            if entry is not None and entry[0] == revision:
+                self._local.move_to_end(session_id)
+                return entry[1]
+        state = self._load(json.loads(payload)) if payload is not None else self._factory()
+        with self._lock:
+            self._remember(session_id, revision, state)
+        return state
+
+    def save(self, session_id: str, state: Any):
+        revision = uuid.uuid4().hex[:12]
+        payload = json.dumps(self._dump(state), ensure_ascii=False, separators=(",", ":"))
+        self._backend.set(self.namespace, session_id, f"{revision}:{payload}", self.ttl_seconds)
+        with self._lock:
+            self._remember(session_id, revision, state)
+
+    def discard(self, session_id: str):
+        self._backend.delete(self.namespace, session_id)
+        with self._lock:
+            self._local.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return self._backend.count(self.namespace)
@@ -0,0 +1,152 @@
+"""Key-value backends for state shared between app workers (sessions, cached responses).
+
+STATE_BACKEND selects the backend:
+
+- ``memory`` (default): this process only
+- ``sqlite:///state.db``: a SQLite file in WAL mode, shared by workers on one host
+- ``redis://localhost:6379/0``: a Redis-compatible server (needs the ``redis`` package)
+
+Values are strings; entries expire ``ttl`` seconds after they were last written.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+# Expired SQLite rows are purged at most this often
+SQLITE_PURGE_INTERVAL_SECONDS = 60.0
+
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    """Autocommit connection in WAL mode: readers and the writer do not block each other across processes"""
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class MemoryBackend:
+    """Process-local backend; mainly for exercising the shared code paths in one process"""
+
+    shared = False
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[(namespace, key)]
+                return None
+            return entry[1]
+
+    def set(self, namespace: str, key: str, value: str, ttl: float):
+        with self._lock:
+            self._entries[(namespace, key)] = (time.time() + ttl, value)
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def count(self, namespace: str) -> int:
+        now = time.time()
+        with self._lock:
+            return sum(1 for (ns, _), (expires_at, _) in self._entries.items() if ns == namespace and expires_at >= now)
+
+
+class SQLiteBackend:
+    """One table in a WAL-mode SQLite file; readers never block the writer across processes"""
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._purged_at = 0.0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS state (namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; Gradio runs handlers on the event loop and on worker threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = connect_sqlite(self.path)
+        return connection
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT value FROM state WHERE namespace = ? AND key = ? AND expires_at >= ?",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, value: str, ttl: float):
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, value, now + ttl),
+        )
+        if now - self._purged_at > SQLITE_PURGE_INTERVAL_SECONDS:
+            self._purged_at = now
+            connection.execute("DELETE FROM state WHERE expires_at < ?", (now,))
+
+    def delete(self, namespace: str, key: str):
+        self._connection().execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def count(self, namespace: str) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM state WHERE namespace = ? AND expires_at >= ?", (namespace, time.time())
+        ).fetchone()[0]
+
+
+class RedisBackend:
+    """Redis or any server speaking its protocol (KeyDB, Valkey, Dragonfly...)"""
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "nutribot"):
+        try:
+            import redis
+        except ImportError as error:
+            raise RuntimeError("STATE_BACKEND=redis://... needs the redis package: pip install redis") from error
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        return self._client.get(self._key(namespace, key))
+
+    def set(self, namespace: str, key: str, value: str, ttl: float):
+        self._client.set(self._key(namespace, key), value, px=max(1, int(ttl * 1000)))
+
+    def delete(self, namespace: str, key: str):
+        self._client.delete(self._key(namespace, key))
+
+    def count(self, namespace: str) -> int:
+        return sum(1 for _ in self._client.scan_iter(match=self._key(namespace, "*"), count=1000))
+
+
+def open_backend(url: str = STATE_BACKEND):
+    """Backend for a STATE_BACKEND url"""
+    if url == "memory":
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported STATE_BACKEND {url!r}; use memory, sqlite:///path or redis://host:port/db")
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from health import ALIGNMENT_LEVELS, BMI_CATEGORIES, assess_batch
+from nutrition_bot import NutritionBot
+
+
+@pytest.mark.parametrize("weight", [50.0, 56.7, 60.0, 76.6, 80.0, 91.9, 92.0, 120.0])
+def test_bot_and_batch_classify_alike(weight):
+    # 175 cm puts 56.7, 76.6 and 91.9 kg on the 18.5, 25 and 30 BMI boundaries
+    bot = NutritionBot()
+    bot.update_user_data("", 40, weight, 175.0, [], 2000, 100, 2.5)
+    batch = assess_batch([40], [weight], [175.0], [2000], [100], [2.5])
+    assert bot._get_bmi_category() == BMI_CATEGORIES[batch["bmi_category"][0]]
+    assessment = bot._profile.assessment.split("\n\n")
+    for target, key in (("calorie", "calorie_alignment"), ("protein", "protein_alignment"),
+                        ("water intake", "water_alignment")):
+        line = next(part for part in assessment if f"Your {target} target" in part)
+        level = ALIGNMENT_LEVELS[batch[key][0]]
+        assert line.startswith("⚠️") == (level == "significant")
+        assert ("moderately different" in line) == (level == "moderate")
+
+
+def test_targets_without_body_measurements_are_not_assessed():
+    bot = NutritionBot()
+    bot.update_user_data("", 0, 0, 0, [], 2000, 100, 2.5)
+    assert bot._get_bmi_category() == "Not available"
+    assert "target" not in bot._profile.assessment
+    assert np.isnan(assess_batch([0], [0], [0])["bmi"][0])
@@ -0,0 +1,115 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from llm_client import CompletionBackend, payload_key
+
+MESSAGES = [{"role": "system", "content": "You are NutriCoach."}, {"role": "user", "content": "Meal ideas?"}]
+REPLY = ["Oatmeal ", "with ", "berries."]
+
+
+class CountingCompletions:
+    """Mock backend counting upstream calls; answers after ``delay`` seconds"""
+
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def create(self, messages, stream=False, **params):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ValueError("bad request")
+        if not stream:
+            message = SimpleNamespace(content="".join(REPLY))
+            return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=message)])
+        return self._chunks()
+
+    async def _chunks(self):
+        for text in REPLY:
+            await asyncio.sleep(0.005)
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def backend_with(completions: CountingCompletions, coalesce: bool = True) -> CompletionBackend:
+    backend = CompletionBackend(coalesce=coalesce, rate_limited=False)
+    backend._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return backend
+
+
+async def read(stream) -> str:
+    return "".join([delta async for delta in stream])
+
+
+@pytest.mark.parametrize("mode", ["complete", "stream"])
+def test_identical_concurrent_requests_share_one_upstream_call(mode):
+    completions = CountingCompletions()
+    backend = backend_with(completions)
+
+    async def call():
+        if mode == "complete":
+            return await backend.complete(MESSAGES, max_tokens=500)
+        return await read(backend.stream(MESSAGES, max_tokens=500))
+
+    async def scenario():
+        return await asyncio.gather(*(call() for _ in range(20)))
+
+    assert asyncio.run(scenario()) == ["".join(REPLY)] * 20
+    assert completions.calls == 1
+    assert (backend.upstream_calls, backend.coalesced_calls) == (1, 19)
+
+
+def test_different_payloads_are_not_coalesced():
+    completions = CountingCompletions()
+    backend = backend_with(completions)
+
+    async def scenario():
+        other = MESSAGES[:1] + [{"role": "user", "content": "Snack ideas?"}]
+        await asyncio.gather(read(backend.stream(MESSAGES)), read(backend.stream(other)),
+                             read(backend.stream(MESSAGES, max_tokens=100)))
+
+    asyncio.run(scenario())
+    assert completions.calls == 3
+
+
+def test_sequential_requests_are_not_coalesced():
+    completions = CountingCompletions(delay=0)
+    backend = backend_with(completions)
+
+    async def scenario():
+        for _ in range(3):
+            await read(backend.stream(MESSAGES))
+
+    asyncio.run(scenario())
+    assert completions.calls == 3
+
+
+def test_late_subscriber_replays_the_reply():
+    backend = backend_with(CountingCompletions())
+
+    async def scenario():
+        first = asyncio.ensure_future(read(backend.stream(MESSAGES)))
+        await asyncio.sleep(0.06)
+        return await asyncio.gather(first, read(backend.stream(MESSAGES)))
+
+    assert asyncio.run(scenario()) == ["".join(REPLY)] * 2
+    assert backend.upstream_calls == 1
+
+
+def test_shared_failure_reaches_every_caller():
+    completions = CountingCompletions(fail=True)
+    backend = backend_with(completions)
+
+    async def scenario():
+        return await asyncio.gather(*(read(backend.stream(MESSAGES)) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert completions.calls == 1
+
+
+def test_payload_key_ignores_key_order():
+    assert payload_key("stream", MESSAGES, {"a": 1, "b": 2}) == payload_key("stream", MESSAGES, {"b": 2, "a": 1})
+    assert payload_key("stream", MESSAGES, {}) != payload_key("complete", MESSAGES, {})
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from food_db import FoodTable
+from health import assess_batch
+from meal_planner import MEALS, MAX_PORTION, MealPlanner, RecipeTable
+
+
+@pytest.fixture(scope="module")
+def planner():
+    return MealPlanner(RecipeTable.load(FoodTable.load()))
+
+
+@pytest.mark.parametrize("diets", [(), ("vegetarian",), ("vegan",), ("gluten_free",), ("keto",)])
+def test_plans_meet_recommended_protein(planner, diets):
+    # Adults of 50-90 kg at their maintenance calories and recommended protein
+    weight = np.arange(50, 91, 10, dtype=np.float64)
+    needs = assess_batch(np.full(weight.shape, 35), weight, np.full(weight.shape, 175))
+    plans = planner.plan_batch(needs["tdee"], needs["protein_needs"], diets)
+    assert not plans["relaxed"]
+    assert (plans["protein_g"] >= needs["protein_needs"][:, None] - 1e-6).all()
+    assert (np.abs(plans["energy_kcal"] - needs["tdee"][:, None]) <= 0.25 * needs["tdee"][:, None]).all()
+
+
+def test_unreachable_protein_gets_the_closest_plan(planner):
+    recipes = planner.recipes
+    most = MAX_PORTION * sum(recipes.protein[recipes.meal == MEALS.index(meal)].max() for meal in MEALS[:3])
+    plan = planner.plan_week(1500, 2 * most)
+    main_protein = [sum(meal.protein_g for meal in day.meals if meal.meal != "snack") for day in plan.days]
+    assert main_protein[0] == pytest.approx(most)
+    assert all(day.protein_g < plan.protein_target for day in plan.days)
@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from llm_client import CompletionBackend
+from model_router import ModelRouter, Route
+from resilience import CircuitBreaker
+
+MESSAGES = [{"role": "system", "content": "You are NutriCoach."}, {"role": "user", "content": "Is rice healthy?"}]
+LONG_QUESTION = ("I train for a half marathon three times a week and often feel exhausted in the afternoon, how "
+                 "should I adjust my breakfast and lunch to keep my energy up?")
+
+
+class StubCompletions:
+    """Streams ``reply`` word by word; fails before, or after, the first token when asked to"""
+
+    def __init__(self, reply: str, fail: bool = False, fail_after_first: bool = False):
+        self.reply = reply
+        self.fail = fail
+        self.fail_after_first = fail_after_first
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.hold = False
+
+    async def create(self, messages, stream=False, **params):
+        self.calls += 1
+        if self.fail:
+            raise ValueError("bad request")
+        return self._chunks()
+
+    async def _chunks(self):
+        for index, word in enumerate(self.reply.split(" ")):
+            if self.hold:
+                await self.release.wait()
+            if index and self.fail_after_first:
+                raise ValueError("stream cut off")
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+
+
+def backend(name: str, completions: StubCompletions, max_concurrent_requests: int = 2) -> CompletionBackend:
+    # The local model is a stub too, so nothing here needs a GPU or a model download
+    backend = CompletionBackend(name=name, max_concurrent_requests=max_concurrent_requests, coalesce=False,
+                                rate_limited=False)
+    backend._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return backend
+
+
+async def read(stream) -> str:
+    return "".join([delta async for delta in stream]).strip()
+
+
+def test_routes_by_kind_of_reply():
+    router = ModelRouter(backend("openai", StubCompletions("remote")), backend("local", StubCompletions("local")),
+                         max_query_tokens=12)
+    assert router.route("anything") == Route("local", "short")
+    assert router.route(LONG_QUESTION) == Route("openai", "open_ended")
+    assert router.route(LONG_QUESTION, quick_action=True) == Route("local", "quick_action")
+    assert router.route(LONG_QUESTION, grounded=True) == Route("local", "grounded")
+    assert ModelRouter(backend("openai", StubCompletions("remote"))).route("anything") == Route("openai", "default")
+
+
+def test_open_remote_circuit_routes_everything_local():
+    remote = backend("openai", StubCompletions("remote"))
+    remote.breaker = CircuitBreaker(failure_threshold=1, failure_ratio=0.5, window=2)
+    remote.breaker.record_failure()
+    router = ModelRouter(remote, backend("local", StubCompletions("local")))
+    assert router.route(LONG_QUESTION) == Route("local", "remote_open")
+
+
+def test_busy_local_model_spills_over_to_remote():
+    local_completions = StubCompletions("local reply")
+    local_completions.hold = True
+    router = ModelRouter(backend("openai", StubCompletions("remote")),
+                         backend("local", local_completions, max_concurrent_requests=1), max_local_queue=1)
+
+    async def scenario():
+        streams = [asyncio.create_task(read(router.stream(router.route("hi"), MESSAGES))) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        spilled = router.route("hi")
+        local_completions.release.set()
+        return spilled, await asyncio.gather(*streams)
+
+    spilled, replies = asyncio.run(scenario())
+    assert spilled == Route("openai", "local_busy")
+    assert replies == ["local reply"] * 2
+    assert router.active["local"] == 0
+
+
+def test_reply_falls_back_when_the_routed_backend_fails_before_its_first_token():
+    remote = StubCompletions("remote reply", fail=True)
+    router = ModelRouter(backend("openai", remote), backend("local", StubCompletions("local reply")))
+    assert asyncio.run(read(router.stream(Route("openai", "open_ended"), MESSAGES))) == "local reply"
+    assert remote.calls == 1
+
+
+def test_reply_is_not_restarted_after_its_first_token():
+    local = StubCompletions("local reply")
+    router = ModelRouter(backend("openai", StubCompletions("remote reply", fail_after_first=True)),
+                         backend("local", local))
+    with pytest.raises(ValueError, match="cut off"):
+        asyncio.run(read(router.stream(Route("openai", "open_ended"), MESSAGES)))
+    assert local.calls == 0
@@ -0,0 +1,139 @@
+import asyncio
+import json
+
+import pytest
+
+import nutrition_bot
+from i18n import get_translations
+from response_cache import ResponseCache
+from semantic_cache import SemanticCache
+
+MEAL_SUGGESTIONS = get_translations()[1]["en"]["quick_actions.prompts.meal_suggestions"]
+
+
+class RecordingModel:
+    """Stands in for the model router's stream, keeping every prompt it is sent"""
+
+    def __init__(self, reply: str = "Try oatmeal with berries."):
+        self.reply = reply
+        self.prompts = []
+
+    async def stream(self, route, messages, **params):
+        self.prompts.append(messages)
+        yield self.reply
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = RecordingModel()
+    monkeypatch.setattr(nutrition_bot.model_router, "stream", model.stream)
+    monkeypatch.setattr(nutrition_bot, "response_cache", ResponseCache(path=""))
+    monkeypatch.setattr(nutrition_bot, "semantic_cache", SemanticCache())
+    return model
+
+
+def make_bot(name: str, weight: float = 60) -> nutrition_bot.NutritionBot:
+    bot = nutrition_bot.NutritionBot()
+    bot.update_user_data(name, 30, weight, 170, ["🥬 Vegetarian"], 2000, 100, 2.5)
+    return bot
+
+
+def reply(bot: nutrition_bot.NutritionBot, message: str) -> str:
+    async def collect():
+        text = ""
+        async for text in bot.get_response(message):
+            pass
+        return text
+
+    return asyncio.run(collect())
+
+
+def prompt_text(messages) -> str:
+    return "\n".join(message["content"] for message in messages)
+
+
+def test_cached_quick_action_prompt_leaves_out_the_user(model):
+    alice = make_bot("Alice")
+    reply(alice, "I had pancakes with my sister Carol this morning, is that a healthy breakfast?")
+    reply(alice, MEAL_SUGGESTIONS)
+    prompt = prompt_text(model.prompts[-1])
+    assert "Alice" not in prompt
+    assert "Carol" not in prompt
+
+
+def test_quick_action_answer_is_shared_within_a_bucket(model):
+    reply(make_bot("Alice", weight=60), MEAL_SUGGESTIONS)
+    answer = reply(make_bot("Bob", weight=61), MEAL_SUGGESTIONS)
+    assert len(model.prompts) == 1
+    assert answer.endswith(model.reply)
+
+
+def test_chat_prompt_keeps_the_name(model):
+    alice = make_bot("Alice")
+    reply(alice, "I had pancakes this morning, is that a healthy breakfast?")
+    # Past the opening question the answer is not shared, so the prompt is personal
+    reply(alice, "What could I eat instead of pancakes tomorrow?")
+    assert "Alice" in prompt_text(model.prompts[-1])
+
+
+def test_semantic_cache_prompt_leaves_out_the_user(model):
+    reply(make_bot("Alice"), "Is brown rice a healthy choice?")
+    assert "Alice" not in prompt_text(model.prompts[-1])
+    answer = reply(make_bot("Bob"), "is brown rice a healthy choice")
+    assert len(model.prompts) == 1
+    assert answer.endswith(model.reply)
+
+
+def test_state_round_trip():
+    bot = make_bot("Alice")
+    bot.set_language("fr")
+    bot.conversation_history.append({"role": "user", "content": "Bonjour"})
+    restored = nutrition_bot.NutritionBot.from_state(json.loads(json.dumps(bot.to_state())))
+    assert restored.to_state() == bot.to_state()
+    assert restored._profile == bot._profile
+
+
+def test_state_from_an_older_revision_keeps_defaults(model):
+    state = make_bot("Alice").to_state()
+    for slot in ("language", "conversation_history", "_summary", "conversation_id"):
+        del state[slot]
+    bot = nutrition_bot.NutritionBot.from_state(state)
+    assert bot.language == nutrition_bot.DEFAULT_LANG
+    assert bot.conversation_history == []
+    assert reply(bot, MEAL_SUGGESTIONS).endswith(model.reply)
+
+
+def test_concurrent_sessions_keep_their_own_language(monkeypatch):
+    """Sessions toggling languages under load each see only their own language"""
+    from i18n import get_text
+
+    monkeypatch.setattr(nutrition_bot, "response_cache", ResponseCache(path=""))
+    monkeypatch.setattr(nutrition_bot, "semantic_cache", None)
+
+    async def stream(route, messages, **params):
+        # Interleave the sessions, then echo the reply-language instruction the prompt carried
+        await asyncio.sleep(0.001)
+        yield next(lang for lang in ("en", "fr") if get_text("bot.reply_language", lang) in messages[0]["content"])
+
+    monkeypatch.setattr(nutrition_bot.model_router, "stream", stream)
+    questions = ["Is brown rice a healthy choice?", "What should I eat before running?", "Who won the football match yesterday?"]
+    mismatches = []
+
+    async def session(index: int):
+        bot = make_bot(f"User {index}")
+        for turn in range(12):
+            lang = "fr" if (index + turn) % 3 == 0 else "en"
+            bot.set_language(lang)
+            question = questions[turn % len(questions)]
+            text = ""
+            async for text in bot.get_response(question):
+                await asyncio.sleep(0)
+            expected = get_text("bot.off_topic", lang) if "football" in question else lang
+            if not text.endswith(expected):
+                mismatches.append((index, turn, lang, text[-40:]))
+
+    async def scenario():
+        await asyncio.gather(*(session(index) for index in range(30)))
+
+    asyncio.run(scenario())
+    assert mismatches == []
@@ -0,0 +1,33 @@
+import pytest
+
+from i18n import get_translations
+from nutrition_classifier import ClassifierMatch, NutritionClassifier
+
+classifier = NutritionClassifier.from_translations(get_translations()[0])
+
+
+@pytest.mark.parametrize("query", [
+    "How much protein do I need?",
+    "Tips for a high-fiber breakfast",
+    "I feel tired after lunch",
+    "Are bananas healthy",
+    "Quels aliments sont riches en fer ?",
+])
+def test_nutrition_queries_match(query):
+    assert classifier.classify(query) is not None
+
+
+@pytest.mark.parametrize("query", ["Who won the football match yesterday?", "Tell me a joke about cars", ""])
+def test_off_topic_queries_do_not_match(query):
+    assert classifier.classify(query) is None
+
+
+def test_keywords_are_reported_before_question_words():
+    # Both match at the start; the original checked keywords first
+    assert classifier.classify("What should I cook tonight?") == ClassifierMatch("keywords", "what should")
+    assert classifier.classify("Where is the station?") == ClassifierMatch("question_words", "where")
+
+
+def test_keywords_match_at_word_starts():
+    assert classifier.classify("count my calories") == ClassifierMatch("keywords", "calorie")
+    assert classifier.classify("Tell me about the great outdoors") is None
@@ -0,0 +1,191 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from llm_client import CompletionBackend
+from resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class HangingCompletions:
+    """Upstream that accepts every request and never answers"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **params):
+        self.calls += 1
+        await asyncio.Event().wait()
+
+
+def open_breaker(clock: Clock) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, failure_ratio=0.5, window=4, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def hanging_backend(breaker: CircuitBreaker, coalesce: bool) -> CompletionBackend:
+    backend = CompletionBackend(coalesce=coalesce, rate_limited=False)
+    backend.breaker = breaker
+    backend._client = SimpleNamespace(chat=SimpleNamespace(completions=HangingCompletions()))
+    return backend
+
+
+def test_breaker_opens_half_opens_and_recovers():
+    clock = Clock()
+    breaker = open_breaker(clock)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 10
+    assert breaker.state == "half-open"
+    assert breaker.before_call() is True
+    # One probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.before_call() is False
+
+
+def test_failed_probe_reopens():
+    clock = Clock()
+    breaker = open_breaker(clock)
+    clock.now = 10
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now = 20
+    assert breaker.before_call() is True
+
+
+def test_breaker_ignores_scattered_failures():
+    breaker = CircuitBreaker(failure_threshold=2, failure_ratio=0.5, window=10, clock=Clock())
+    for _ in range(3):
+        breaker.record_success()
+        breaker.record_success()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_retry_policy_honours_retry_after():
+    error = SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "3"}))
+    assert RetryPolicy(max_delay=20).delay(0, error) == 3
+    assert 0 <= RetryPolicy(base_delay=0.5, max_delay=20, rng=lambda: 1.0).delay(2) == 2.0
+
+
+@pytest.mark.parametrize("coalesce", [False, True])
+def test_cancelled_complete_probe_releases_the_breaker(coalesce):
+    async def scenario():
+        clock = Clock()
+        backend = hanging_backend(open_breaker(clock), coalesce)
+        clock.now = 10
+        call = asyncio.ensure_future(backend.complete([{"role": "user", "content": "hi"}]))
+        await asyncio.sleep(0.01)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        # With coalescing the shared call outlives its caller; it is cancelled with the loop
+        for task in asyncio.all_tasks() - {asyncio.current_task()}:
+            task.cancel()
+        await asyncio.sleep(0.01)
+        return backend.breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker.state == "half-open"
+    assert breaker.before_call() is True
+
+
+@pytest.mark.parametrize("coalesce", [False, True])
+def test_abandoned_stream_probe_releases_the_breaker(coalesce):
+    async def scenario():
+        clock = Clock()
+        backend = hanging_backend(open_breaker(clock), coalesce)
+        clock.now = 10
+
+        async def read():
+            async for _ in backend.stream([{"role": "user", "content": "hi"}]):
+                pass
+
+        reader = asyncio.ensure_future(read())
+        await asyncio.sleep(0.01)
+        # The client went away: the reader is cancelled, and with it the last flight subscriber
+        reader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await reader
+        await asyncio.sleep(0.01)
+        return backend.breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker.state == "half-open"
+    assert breaker.before_call() is True
+
+
+@pytest.mark.parametrize("mode", ["complete", "stream"])
+def test_missing_api_key_leaves_the_breaker_alone(monkeypatch, mode):
+    monkeypatch.delenv("OPENAI_API_KEY")
+    clock = Clock()
+    backend = CompletionBackend(coalesce=False, rate_limited=False)
+    backend.breaker = open_breaker(clock)
+    clock.now = 10
+
+    async def call():
+        if mode == "complete":
+            return await backend.complete([{"role": "user", "content": "hi"}])
+        return [delta async for delta in backend.stream([{"role": "user", "content": "hi"}])]
+
+    # The probe never reaches the upstream: the circuit stays half-open and the next call may probe
+    with pytest.raises(ValueError, match="OPENAI_API_KEY"):
+        asyncio.run(call())
+    assert backend.breaker.state == "half-open"
+    assert backend.breaker.before_call() is True
+
+    # Nor does a closed circuit count the failure as an upstream success
+    backend.breaker.record_success()
+    with pytest.raises(ValueError, match="OPENAI_API_KEY"):
+        asyncio.run(call())
+    assert len(backend.breaker._outcomes) == 1
+
+
+def test_outage_opens_the_circuit_and_recovery_closes_it():
+    """Fault injection through the local stub server"""
+    from benchmarks.mock_openai import MockServer
+
+    async def scenario(server):
+        clock = Clock()
+        backend = CompletionBackend(base_url=server.base_url, coalesce=False, rate_limited=False)
+        backend.breaker = CircuitBreaker(failure_threshold=3, failure_ratio=0.5, window=6, reset_seconds=10,
+                                         clock=clock)
+        backend.retry_policy = RetryPolicy(max_attempts=2, base_delay=0.01)
+        messages = [{"role": "user", "content": "hi"}]
+        try:
+            server.app.state.error_rate = 1.0
+            for _ in range(3):
+                with pytest.raises(Exception):
+                    await backend.complete(messages)
+            assert backend.breaker.state == "open"
+            requests = server.app.state.requests
+            with pytest.raises(CircuitOpenError):
+                await backend.complete(messages)
+            # Failing fast: the open circuit sends nothing upstream
+            assert server.app.state.requests == requests
+
+            server.app.state.error_rate = 0.0
+            clock.now = 10
+            assert await backend.complete(messages)
+            assert backend.breaker.state == "closed"
+        finally:
+            await backend.aclose()
+
+    with MockServer(port=8011, latency=0, token_delay=0) as server:
+        asyncio.run(scenario(server))
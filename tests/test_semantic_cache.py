@@ -0,0 +1,35 @@
+import pytest
+
+from semantic_cache import SemanticCache
+
+OPPOSITES = [
+    ("is rice good for you", "is rice bad for you"),
+    ("are eggs good for breakfast", "are eggs bad for breakfast"),
+    ("how much rice per day", "how many rice per day"),
+    ("is chocolate very bad", "is chocolate good"),
+    ("le riz est-il bon pour la santé", "le riz est-il mauvais pour la santé"),
+]
+
+
+def cache_with(question: str) -> SemanticCache:
+    cache = SemanticCache()
+    answer, vector = cache.lookup("en", question)
+    assert answer is None
+    cache.add("en", vector, question)
+    return cache
+
+
+@pytest.mark.parametrize("asked, other", OPPOSITES)
+def test_opposite_questions_miss(asked, other):
+    cache = cache_with(asked)
+    assert cache.lookup("en", other)[0] is None
+    assert cache.lookup("en", asked)[0] == asked
+
+
+def test_paraphrase_hits():
+    cache = cache_with("is brown rice healthy?")
+    assert cache.lookup("en", "How healthy is brown rice")[0] == "is brown rice healthy?"
+
+
+def test_partitions_are_separate():
+    assert cache_with("is brown rice healthy?").lookup("fr", "is brown rice healthy?")[0] is None
@@ -0,0 +1,78 @@
+import tracemalloc
+
+from nutrition_bot import NutritionBot
+from session_store import SessionStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def visit(store: SessionStore, session_id: str, turns: int, reply_chars: int = 300):
+    bot = store.get(session_id)
+    bot.update_user_data(f"user {session_id}", 30, 70.0, 175.0, ["🥬 Vegetarian"], 2200, 120, 2.5)
+    for turn in range(turns):
+        bot.conversation_history.append({"role": "user", "content": f"Question {turn} about lentil recipes?"})
+        bot.conversation_history.append({"role": "assistant", "content": "x" * reply_chars})
+        bot._trim_history()
+        store.save(session_id, bot)
+
+
+def test_sessions_are_separate_and_lru_evicted():
+    store = SessionStore(dict, max_sessions=2)
+    store.get("a")["lang"] = "fr"
+    store.get("b")
+    store.get("a")
+    store.get("c")
+    assert store.get("a") == {"lang": "fr"}
+    assert store.evictions == 1
+    assert len(store) == 2
+
+
+def test_idle_sessions_expire():
+    clock = Clock()
+    store = SessionStore(dict, ttl_seconds=60, clock=clock)
+    store.get("a")["seen"] = True
+    clock.now = 61
+    store.get("b")
+    assert len(store) == 1
+    assert store.get("a") == {}
+
+
+def test_byte_cap_bounds_long_histories():
+    store = SessionStore(NutritionBot, max_sessions=1000, max_bytes=200_000, sizer=NutritionBot.approximate_size)
+    for i in range(200):
+        visit(store, f"session-{i}", turns=10, reply_chars=2000)
+        assert store.total_bytes <= store.max_bytes
+    # Far fewer sessions than the count cap fit, and the most recent one is among them
+    assert 0 < len(store) < 50
+    assert store.get("session-199").user_data["name"] == "user session-199"
+    assert store.total_bytes == sum(entry[2] for entry in store._sessions.values())
+
+
+def test_discard_releases_bytes():
+    store = SessionStore(NutritionBot, sizer=NutritionBot.approximate_size)
+    visit(store, "a", turns=2)
+    store.discard("a")
+    assert store.total_bytes == 0
+
+
+def test_memory_stays_flat_as_sessions_churn():
+    """Stress test: traced memory levels off once the store is full"""
+    store = SessionStore(NutritionBot, max_sessions=300, max_bytes=1_000_000, sizer=NutritionBot.approximate_size)
+    tracemalloc.start()
+    try:
+        samples = []
+        for i in range(3000):
+            visit(store, f"session-{i}", turns=3)
+            if i % 1000 == 999:
+                samples.append(tracemalloc.get_traced_memory()[0])
+    finally:
+        tracemalloc.stop()
+    assert store.evictions >= 2700
+    # Growth between the first and last thousand visitors is noise, not the 2000 extra sessions
+    assert samples[-1] < samples[0] * 1.2
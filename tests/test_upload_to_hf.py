@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from huggingface_hub import HfApi
+from huggingface_hub.utils import HfHubHTTPError
+
+import upload_to_hf
+from benchmarks.bench_deploy import REPO_ID, FakeHub
+from resilience import RetryPolicy
+
+FILES = ["app.py", "prompts.py", "data/recipes.csv"]
+RETRY_POLICY = RetryPolicy(max_attempts=upload_to_hf.DEPLOY_MAX_ATTEMPTS, base_delay=0.01)
+
+
+@pytest.fixture(scope="module")
+def hub():
+    with FakeHub(port=8015) as hub:
+        yield hub
+
+
+@pytest.fixture
+def space(hub, tmp_path):
+    """An empty fake Space, the local files to deploy to it and a Hub client"""
+    hub.app.state.files.clear()
+    hub.app.state.requests.clear()
+    hub.app.state.commits = 0
+    for path in FILES:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(f"contents of {path}\n")
+    return hub, tmp_path, HfApi(endpoint=hub.endpoint, token="hf_fake")
+
+
+def deploy(space, **kwargs) -> upload_to_hf.Deployment:
+    _, root, api = space
+    return upload_to_hf.deploy(api, REPO_ID, FILES, str(root), retry_policy=RETRY_POLICY, **kwargs)
+
+
+def test_first_deploy_commits_every_file_and_the_manifest_once(space):
+    hub, root, _ = space
+    deployment = deploy(space)
+    assert deployment.changed == FILES
+    assert deployment.commit_url
+    assert hub.app.state.commits == 1
+    manifest = json.loads(hub.app.state.files[upload_to_hf.MANIFEST_PATH])["files"]
+    assert manifest == {path: upload_to_hf.file_sha256(str(root / path)) for path in FILES}
+
+
+def test_unchanged_redeploy_only_reads_the_manifest(space):
+    hub, _, _ = space
+    deploy(space)
+    hub.app.state.requests.clear()
+    deployment = deploy(space)
+    assert deployment.changed == [] and deployment.unchanged == FILES
+    assert deployment.commit_url == ""
+    assert hub.app.state.commits == 1
+    assert dict(hub.app.state.requests) == {"resolve": 1}
+
+
+def test_redeploy_uploads_only_the_changed_file(space):
+    hub, root, _ = space
+    deploy(space)
+    (root / "prompts.py").write_text("edited\n")
+    assert deploy(space).changed == ["prompts.py"]
+    assert hub.app.state.commits == 2
+    assert hub.app.state.files["prompts.py"] == b"edited\n"
+
+
+def test_dry_run_commits_nothing(space):
+    hub, _, _ = space
+    deployment = deploy(space, dry_run=True)
+    assert deployment.changed == FILES
+    assert hub.app.state.commits == 0
+    assert hub.app.state.requests["commit"] == 0
+
+
+def test_flaky_commits_are_retried(space):
+    hub, _, _ = space
+    hub.app.state.fail_commits = 2
+    deployment = deploy(space)
+    assert deployment.commit_url
+    assert hub.app.state.requests["commit"] == 3
+    assert hub.app.state.commits == 1
+
+
+def test_outlasting_failures_commit_nothing(space):
+    hub, _, _ = space
+    hub.app.state.fail_commits = RETRY_POLICY.max_attempts
+    with pytest.raises(HfHubHTTPError) as error:
+        deploy(space)
+    assert error.value.response.status_code == 503
+    assert hub.app.state.commits == 0
+    assert upload_to_hf.MANIFEST_PATH not in hub.app.state.files
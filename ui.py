@@ -0,0 +1,440 @@
+"""Gradio interface of the web app: theme, layout and event wiring.
+
+``build_demo()`` constructs the Blocks; nothing is built at import.
+"""
+import gradio as gr
+from gradio.themes import Base
+
+from i18n import DEFAULT_LANG, get_text, get_translations
+from metrics import registry
+from nutrition_bot import NutritionBot, conversation_log, sessions
+from scheduler import LLM_CONCURRENCY_LIMIT, LLM_GROUP, LOCAL_CONCURRENCY_LIMIT, LOCAL_GROUP, session_gate
+
+text_tables = get_translations()[1]
+
+QUICK_ACTION_ICONS = {
+    "meal_suggestions": "🍽️ ",
+    "daily_calories": "📊 ",
+    "food_nutrition": "🔍 ",
+    "exercise_tips": "🏃‍♂️ ",
+    "weekly_menu": "📅 "
+}
+# Per-language quick-action radio choices and label -> prompt maps
+QUICK_ACTION_CHOICES = {
+    lang: [icon + get_text(f"quick_actions.actions.{action}", lang) for action, icon in QUICK_ACTION_ICONS.items()]
+    for lang in text_tables
+}
+QUICK_ACTION_MAPS = {
+    lang: {
+        icon + get_text(f"quick_actions.actions.{action}", lang): get_text(f"quick_actions.prompts.{action}", lang)
+        for action, icon in QUICK_ACTION_ICONS.items()
+    }
+    for lang in text_tables
+}
+
+def session_bot(request: gr.Request) -> NutritionBot:
+    """The session's bot, attached to its conversation log on first use"""
+    nutrition_bot = sessions.get(request.session_hash)
+    if conversation_log is not None and nutrition_bot.conversation_id is None:
+        # Signed-in users (launched with auth) keep one conversation across browsers and restarts
+        nutrition_bot.resume(request.username or request.session_hash)
+        sessions.save(request.session_hash, nutrition_bot)
+    return nutrition_bot
+
+class AmethystTheme(Base):
+    def __init__(self):
+        super().__init__(
+            primary_hue="green",
+            secondary_hue="emerald",
+            neutral_hue="gray",         
+        )
+        self.name = "nutrition_theme"
+        self.color_accent = "#4CAF50"
+        self.color_accent_soft = "rgba(76, 175, 80, 0.2)"
+        self.background_fill_primary = "#FFFFFF"
+        self.background_fill_secondary = "#F1F8E9"
+        self.border_color_primary = "#81C784"
+        self.block_title_text_color = "#2E7D32"
+        self.block_border_color = "#81C784"
+        self.button_primary_background_fill = "#4CAF50"
+        self.button_primary_background_fill_hover = "#43A047"
+        self.button_secondary_background_fill = "#F1F8E9"
+        self.button_secondary_border_color = "#81C784"
+        self.button_secondary_text_color = "#2E7D32"
+        self.dark_mode_colors = {
+            "background_fill_primary": "#1B2A1B",
+            "background_fill_secondary": "#243024",
+            "block_background_fill": "#1B2A1B",
+            "block_border_color": "#4CAF50",
+            "block_label_text_color": "#81C784",
+            "block_title_text_color": "#A5D6A7",
+            "body_background_fill": "linear-gradient(135deg, #162316 0%, #1B2A1B 100%)",
+            "body_text_color": "#E8F5E9",
+            "button_primary_background_fill": "#4CAF50",
+            "button_primary_text_color": "#FFFFFF",
+            "button_secondary_background_fill": "#243024",
+            "button_secondary_border_color": "#4CAF50",
+            "button_secondary_text_color": "#A5D6A7",
+            "color_accent": "#81C784",
+            "color_accent_soft": "rgba(129, 199, 132, 0.2)",
+            "input_background_fill": "#243024",
+            "input_border_color": "#4CAF50",
+            "input_text_color": "#E8F5E9",
+            "checkbox_background_color": "#243024",
+            "checkbox_border_color": "#4CAF50",
+            "slider_color": "#4CAF50",
+            "block_label_background_fill": "rgba(76, 175, 80, 0.1)"
+        }
+        self.spacing_md = "12px"
+        self.spacing_lg = "16px"
+        self.spacing_xl = "20px"
+        self.spacing_xxl = "32px"
+        self.radius_lg = "12px"
+        self.shadow_drop = "0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -2px rgba(0, 0, 0, 0.1)"
+        self.text_md = "15px"
+        self.text_lg = "18px"
+        self.text_xl = "24px"
+        for key, value in self.dark_mode_colors.items():
+            setattr(self, key + "_dark", value)
+
+def header_markdown(lang: str) -> str:
+    return f"""
+        # 🥗 {get_text("title", lang)}
+        {get_text("welcome", lang)}
+        - 📋 {get_text("features.meal_planning", lang)}
+        - 🍎 {get_text("features.nutrition_info", lang)}
+        - 🥑 {get_text("features.dietary_recs", lang)}
+        - 💪 {get_text("features.eating_tips", lang)}
+        """
+
+css = """
+.nutrition-header { 
+    text-align: center;
+    margin-bottom: 24px;
+    padding: 24px;
+    border-radius: 12px;
+    background: rgba(76, 175, 80, 0.1);
+    position: relative;
+}
+.controls-column {
+    position: absolute;
+    top: 12px;
+    left: 12px;
+    display: flex;
+    flex-direction: column;
+    gap: 8px;
+    width: 120px;
+    z-index: 1000;
+}
+.controls-column .gr-button {
+    margin: 0;
+    padding: 4px 8px;
+    height: 32px;
+    min-width: auto;
+    cursor: pointer;
+    background-color: #2E7D32 !important;
+    color: white !important;
+    border: 1px solid #1B5E20 !important;
+}
+.controls-column .gr-button:hover {
+    background-color: #1B5E20 !important;
+}
+.controls-column .gr-dropdown {
+    margin: 0;
+    background: white;
+}
+.dark .controls-column .gr-dropdown {
+    background: #243024;
+}
+.dark .controls-column .gr-button {
+    background-color: #81C784 !important;
+    color: #1B2A1B !important;
+    border: 1px solid #A5D6A7 !important;
+}
+.dark .controls-column .gr-button:hover {
+    background-color: #A5D6A7 !important;
+}
+.controls-column select {
+    cursor: pointer;
+}
+.header-row {
+    margin: 8px 0;
+    padding: 4px 8px;
+    align-items: center;
+}
+.header-row .gr-button {
+    margin: 0;
+    padding: 4px 8px;
+    height: 50px;
+    min-width: auto;
+}
+.header-row .gr-dropdown {
+    margin: 0;
+}
+.header-row .gr-form {
+    margin: 0;
+    gap: 0;
+}
+.container {
+    max-width: 1200px;
+    margin: 0 auto;
+}
+.user-info {
+    padding: 20px;
+    border-radius: 12px;
+    background: rgba(76, 175, 80, 0.05);
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    border: 1px solid rgba(76, 175, 80, 0.2);
+}
+.dark .user-info {
+    background: rgba(76, 175, 80, 0.1);
+    border-color: rgba(76, 175, 80, 0.3);
+}
+.chat-container {
+    border-radius: 12px;
+    overflow: hidden;
+}
+.quick-actions {
+    background: rgba(76, 175, 80, 0.05);
+    padding: 16px;
+    border-radius: 12px;
+    border: 1px solid rgba(76, 175, 80, 0.2);
+}
+.dark .quick-actions {
+    background: rgba(76, 175, 80, 0.1);
+    border-color: rgba(76, 175, 80, 0.3);
+}
+.equal-width {
+    flex: 1;
+    min-width: 0;
+    padding: 0 8px;
+}
+.equal-width input {
+    width: 100%;
+}
+"""
+
+def build_demo() -> gr.Blocks:
+    with gr.Blocks(theme=AmethystTheme(), css=css) as demo:
+        with gr.Row(equal_height=True):
+            with gr.Column(scale=10, elem_classes="nutrition-header"):
+                with gr.Column(elem_classes="controls-column"):
+                    language = gr.Dropdown(
+                        choices=["en", "fr"],
+                        value=DEFAULT_LANG,
+                        label="Language",
+                        container=False
+                    )
+                    lang_state = gr.State(DEFAULT_LANG)
+                    toggle_dark = gr.Button(get_text("theme.toggle_dark"), size="sm")
+            
+                header_md = gr.Markdown(header_markdown(DEFAULT_LANG))
+    
+        with gr.Column(elem_classes="user-info"):
+            with gr.Row():
+                with gr.Column(elem_classes="equal-width"):
+                    name = gr.Textbox(
+                        label=f"👤 {get_text('user_info.name_label')}",
+                        info=get_text("user_info.name_info"),
+                        placeholder=get_text("user_info.name_placeholder"),
+                        value="",
+                        interactive=True,
+                    )
+                with gr.Column(elem_classes="equal-width"):
+                    age = gr.Number(
+                        label=f"🎂 {get_text('user_info.age_label')}",
+                        info=get_text("user_info.age_info"),
+                        value=25,
+                        minimum=0,
+                        maximum=120
+                    )
+                with gr.Column(elem_classes="equal-width"):
+                    weight = gr.Number(
+                        label=f"⚖️ {get_text('user_info.weight_label')}",
+                        info=get_text("user_info.weight_info"),
+                        value=70,
+                        minimum=20,
+                        maximum=300
+                    )
+                with gr.Column(elem_classes="equal-width"):
+                    height = gr.Number(
+                        label=f"📏 {get_text('user_info.height_label')}",
+                        info=get_text("user_info.height_info"),
+                        value=170,
+                        minimum=100,
+                        maximum=250
+                    )
+            with gr.Row():
+                dietary_prefs = gr.CheckboxGroup(
+                    choices=[
+                        "🥬 " + get_text("dietary_prefs.vegetarian"),
+                        "🌱 " + get_text("dietary_prefs.vegan"),
+                        "🌾 " + get_text("dietary_prefs.gluten_free"),
+                        "🥛 " + get_text("dietary_prefs.dairy_free"),
+                        "🥑 " + get_text("dietary_prefs.keto"),
+                        "🍖 " + get_text("dietary_prefs.paleo")
+                    ],
+                    label=get_text("user_info.dietary_prefs_label"),
+                    info=get_text("user_info.dietary_prefs_info")
+                )
+    
+        with gr.Row(equal_height=True):
+            with gr.Column(variant="panel", scale=1):
+                with gr.Column(elem_classes="quick-actions"):
+                    quick_actions_md = gr.Markdown(f"### ⚡ {get_text('quick_actions.title')}")
+                    quick_actions = gr.Radio(
+                        QUICK_ACTION_CHOICES[DEFAULT_LANG],
+                        label=get_text("quick_actions.common_tasks"),
+                        info=get_text("quick_actions.common_tasks_info")
+                    )
+                    nutrition_goals_acc = gr.Accordion(get_text("quick_actions.nutrition_goals"), open=False)
+                    with nutrition_goals_acc:
+                        nutrition_goals_info_md = gr.Markdown(get_text("quick_actions.nutrition_goals_info"))
+                        calories = gr.Number(label=f"🔥 {get_text('nutrition_goals.calories_label')}", value=2000)
+                        protein = gr.Number(label=f"🥩 {get_text('nutrition_goals.protein_label')}", value=150)
+                        water = gr.Number(label=f"💧 {get_text('nutrition_goals.water_label')}", value=2.5)
+            with gr.Column(variant="panel", scale=2):
+                with gr.Column(elem_classes="chat-container"):
+                    chatbot = gr.Chatbot(
+                        [{"role": "assistant", "content": get_text("chat.welcome_message")}],
+                        label=get_text("chat.label"),
+                        height=500,
+                        type="messages"
+                    )
+                    with gr.Row():
+                        msg = gr.Textbox(
+                            label=get_text("chat.label"),
+                            placeholder=get_text("chat.message_placeholder"),
+                            show_label=False,
+                            container=False,
+                            scale=7
+                        )
+                        submit_btn = gr.Button("📤 " + get_text("chat.send_button"), variant="primary", scale=2)
+                    with gr.Row():
+                        clear_btn = gr.Button("🗑️ " + get_text("chat.clear_button"), variant="secondary", size="sm", scale=1)
+
+        # Replies wait on the completion API; everything else is cheap and runs in its own group
+        llm_group = dict(concurrency_id=LLM_GROUP, concurrency_limit=LLM_CONCURRENCY_LIMIT)
+        local_group = dict(concurrency_id=LOCAL_GROUP, concurrency_limit=LOCAL_CONCURRENCY_LIMIT)
+
+        def update_profile(name, age, weight, height, dietary_prefs, calories, protein, water, request: gr.Request):
+            nutrition_bot = session_bot(request)
+            if nutrition_bot.update_user_data(name, age, weight, height, dietary_prefs, calories, protein, water):
+                sessions.save(request.session_hash, nutrition_bot)
+            return f"Profile updated for {name}"
+
+        # One coalesced listener for the whole profile: the name is committed on blur/enter rather
+        # than per keystroke, and "always_last" collapses bursts of edits into a single update
+        profile_inputs = [name, age, weight, height, dietary_prefs, calories, protein, water]
+        gr.on(
+            triggers=[name.blur, name.submit] + [component.change for component in profile_inputs[1:]],
+            fn=update_profile,
+            inputs=profile_inputs,
+            outputs=gr.Textbox(visible=False),
+            trigger_mode="always_last",
+            show_progress="hidden",
+            **local_group
+        )
+
+        def handle_quick_action(action: str, lang: str) -> str:
+            return QUICK_ACTION_MAPS[lang].get(action, "")
+
+        async def respond(message, history, lang, request: gr.Request):
+            history = history + [{"role": "user", "content": message}]
+            # A session may only hold its share of the LLM group, however fast it sends
+            if not session_gate.try_enter(request.session_hash):
+                yield history + [{"role": "assistant", "content": get_text("bot.busy", lang)}]
+                return
+            try:
+                nutrition_bot = session_bot(request)
+                nutrition_bot.set_language(lang)
+                async for partial_response in nutrition_bot.get_response(message):
+                    yield history + [{"role": "assistant", "content": partial_response}]
+                sessions.save(request.session_hash, nutrition_bot)
+            finally:
+                session_gate.leave(request.session_hash)
+
+        msg.submit(respond, [msg, chatbot, lang_state], [chatbot], **llm_group).then(lambda: "", None, [msg], **local_group)
+        submit_btn.click(respond, [msg, chatbot, lang_state], [chatbot], **llm_group).then(lambda: "", None, [msg], **local_group)
+        clear_btn.click(lambda: None, None, chatbot, **local_group)
+        quick_actions.change(handle_quick_action, [quick_actions, lang_state], msg, **local_group)
+        toggle_dark.click(None, js="() => {document.body.classList.toggle('dark');}")
+
+        def end_session(request: gr.Request):
+            sessions.discard(request.session_hash)
+
+        demo.unload(end_session)
+
+        # Language change callback: update only updateable properties
+        def build_language_updates(lang: str) -> tuple:
+            return (
+                header_markdown(lang),                       # header markdown
+                gr.update(label=f"👤 {get_text('user_info.name_label', lang)}", info=get_text("user_info.name_info", lang), placeholder=get_text("user_info.name_placeholder", lang)),   # name updates
+                gr.update(label=f"🎂 {get_text('user_info.age_label', lang)}", info=get_text("user_info.age_info", lang)),    # age updates
+                gr.update(label=f"⚖️ {get_text('user_info.weight_label', lang)}", info=get_text("user_info.weight_info", lang)), # weight updates
+                gr.update(label=f"📏 {get_text('user_info.height_label', lang)}", info=get_text("user_info.height_info", lang)), # height updates
+                gr.update(label=get_text("user_info.dietary_prefs_label", lang), info=get_text("user_info.dietary_prefs_info", lang)),  # dietary prefs updates
+                gr.update(choices=QUICK_ACTION_CHOICES[lang], label=get_text("quick_actions.common_tasks", lang), info=get_text("quick_actions.common_tasks_info", lang)),  # quick actions radio
+                gr.update(label=get_text("quick_actions.nutrition_goals", lang)),  # nutrition goals accordion
+                gr.update(value=[{"role": "assistant", "content": get_text("chat.welcome_message", lang)}]),  # chatbot
+                gr.update(placeholder=get_text("chat.message_placeholder", lang)),  # message placeholder
+                "📤 " + get_text("chat.send_button", lang),  # send button
+                "🗑️ " + get_text("chat.clear_button", lang), # clear button
+                get_text("theme.toggle_dark", lang),         # toggle dark button
+                gr.update(label=f"🔥 {get_text('nutrition_goals.calories_label', lang)}"), # calories label
+                gr.update(label=f"🥩 {get_text('nutrition_goals.protein_label', lang)}"),  # protein label
+                gr.update(label=f"💧 {get_text('nutrition_goals.water_label', lang)}"),     # water label
+                f"### ⚡ {get_text('quick_actions.title', lang)}",  # quick actions title markdown
+                get_text("quick_actions.nutrition_goals_info", lang)  # nutrition goals info markdown
+            )
+
+        # Every language's updates are built once, so a switch is a lookup
+        language_updates = {lang: build_language_updates(lang) for lang in text_tables}
+
+        def update_language(lang: str):
+            # Gradio consumes update dicts in place, so hand out copies
+            updates = tuple(dict(update) if isinstance(update, dict) else update for update in language_updates[lang])
+            return updates + (lang,)  # the session's own language state
+
+        language.change(
+            update_language,
+            inputs=[language],
+            outputs=[
+                header_md,               # header markdown
+                name,                    # name component
+                age,                     # age component
+                weight,                  # weight component
+                height,                  # height component
+                dietary_prefs,           # dietary prefs component
+                quick_actions,           # quick actions radio
+                nutrition_goals_acc,     # nutrition goals accordion
+                chatbot,                 # chatbot
+                msg,                     # message textbox
+                submit_btn,              # submit button
+                clear_btn,               # clear button
+                toggle_dark,             # toggle dark button
+                calories,                # calories component
+                protein,                 # protein component
+                water,                   # water component
+                quick_actions_md,        # quick actions title markdown
+                nutrition_goals_info_md, # nutrition goals info markdown
+                lang_state               # session language
+            ],
+            **local_group
+        )
+
+    return demo
+
+
+def register_queue_metrics(demo: gr.Blocks):
+    def queue_lengths(field: str):
+        # Gradio keeps one event queue per concurrency group
+        queues = demo._queue.event_queue_per_concurrency_id
+        if field == "waiting":
+            return {(group,): len(queue.queue) for group, queue in queues.items()}
+        return {(group,): queue.current_concurrency for group, queue in queues.items()}
+
+    registry.callback("nutribot_queue_waiting", "Events waiting in the Gradio queue", lambda: queue_lengths("waiting"),
+                      labels=("group",))
+    registry.callback("nutribot_queue_active", "Events being processed by the Gradio queue",
+                      lambda: queue_lengths("active"), labels=("group",))
@@ -1,38 +1,175 @@
+"""Deploy the app to its Hugging Face Space.
+
+Usage: python upload_to_hf.py [--dry-run] [--force] [--repo-id lmoussadek/Nutrition-Chatbot]
+
+Every deploy writes ``deploy_manifest.json`` to the Space, with the sha256 of
+each deployed file. The next deploy compares the local files with it and
+uploads only the changed ones, together with the new manifest, in a single
+commit; nothing is committed when nothing changed. Transient Hub errors (429,
+5xx, connection drops) are retried with backoff. A deploy that still fails
+commits nothing, so running it again resumes from the same manifest, and the
+Hub does not accept a large (LFS) file twice.
+"""
+import argparse
+import hashlib
+import json
+import logging
 import os
-from huggingface_hub import HfApi
-from pathlib import Path
-
-def upload_to_huggingface():
-    # Initialize the Hugging Face API
-    api = HfApi()
-    
-    # Your Space ID
-    repo_id = "lmoussadek/Nutrition-Chatbot"
-    
-    # List of files to upload (add more as needed)
-    files_to_upload = [
-        "app.py",
-        "requirements.txt",
-        "README.md",
-        ".gitignore",
-        "translations.json"
-    ]
-    
-    # Upload each file
-    for file in files_to_upload:
-        if os.path.exists(file):
-            print(f"Uploading {file}...")
-            api.upload_file(
-                path_or_fileobj=file,
-                path_in_repo=file,
-                repo_id=repo_id,
-                repo_type="space"
-            )
-            print(f"Successfully uploaded {file}")
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, TypeVar
+
+import requests
+from huggingface_hub import CommitOperationAdd, HfApi, hf_hub_url
+from huggingface_hub.utils import EntryNotFoundError, HfHubHTTPError, build_hf_headers, get_session, \
+    hf_raise_for_status
+
+from resilience import RetryPolicy
+
+REPO_ID = "lmoussadek/Nutrition-Chatbot"
+REPO_TYPE = "space"
+MANIFEST_PATH = "deploy_manifest.json"
+# Attempts per Hub request, and parallel uploads of large (LFS) files
+DEPLOY_MAX_ATTEMPTS = 5
+DEPLOY_UPLOAD_THREADS = 5
+
+FILES_TO_UPLOAD = [
+    "app.py",
+    "nutrition_bot.py",
+    "ui.py",
+    "llm_client.py",
+    "model_router.py",
+    "resilience.py",
+    "metrics.py",
+    "scheduler.py",
+    "state_backend.py",
+    "serve.py",
+    "session_store.py",
+    "response_cache.py",
+    "semantic_cache.py",
+    "nutrition_classifier.py",
+    "intent_router.py",
+    "food_db.py",
+    "data/foods.csv",
+    "meal_planner.py",
+    "data/recipes.csv",
+    "context_window.py",
+    "prompts.py",
+    "conversation_log.py",
+    "health.py",
+    "i18n.py",
+    "requirements.txt",
+    "README.md",
+    ".gitignore",
+    "translations.json"
+]
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Deployment(NamedTuple):
+    changed: List[str]
+    unchanged: List[str]
+    missing: List[str]
+    commit_url: str
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_transient(error: Exception) -> bool:
+    """Hub errors worth another attempt; anything else (auth, missing repo, bad request) fails immediately"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    return isinstance(error, HfHubHTTPError) and response is not None and \
+        (response.status_code == 429 or response.status_code >= 500)
+
+
+def with_retries(call: Callable[[], T], retry_policy: RetryPolicy, what: str) -> T:
+    for attempt in range(retry_policy.max_attempts):
+        try:
+            return call()
+        except Exception as error:
+            if not is_transient(error) or attempt + 1 >= retry_policy.max_attempts:
+                raise
+            delay = retry_policy.delay(attempt, error)
+            logger.warning("%s failed (%s), retrying in %.1fs", what, error, delay)
+            time.sleep(delay)
+
+
+def fetch_manifest(api: HfApi, repo_id: str, retry_policy: RetryPolicy) -> Dict[str, str]:
+    """Path -> sha256 of the files deployed last; empty before the first deploy"""
+    url = hf_hub_url(repo_id, MANIFEST_PATH, repo_type=REPO_TYPE, endpoint=api.endpoint)
+
+    def get():
+        response = get_session().get(url, headers=build_hf_headers(token=api.token))
+        hf_raise_for_status(response)
+        return response.json()["files"]
+
+    try:
+        return with_retries(get, retry_policy, "fetching the deploy manifest")
+    except EntryNotFoundError:
+        return {}
+
+
+def deploy(api: HfApi, repo_id: str = REPO_ID, files: List[str] = FILES_TO_UPLOAD, root: str = ".",
+           dry_run: bool = False, force: bool = False, retry_policy: Optional[RetryPolicy] = None) -> Deployment:
+    """Upload the files of ``files`` under ``root`` that changed since the last deploy, in one commit"""
+    retry_policy = retry_policy or RetryPolicy(max_attempts=DEPLOY_MAX_ATTEMPTS)
+    local, missing = {}, []
+    for path in files:
+        if os.path.exists(os.path.join(root, path)):
+            local[path] = file_sha256(os.path.join(root, path))
         else:
-            print(f"Warning: {file} not found")
+            missing.append(path)
+    deployed = {} if force else fetch_manifest(api, repo_id, retry_policy)
+    changed = [path for path in local if deployed.get(path) != local[path]]
+    unchanged = [path for path in local if path not in changed]
+    if not changed or dry_run:
+        return Deployment(changed, unchanged, missing, "")
+
+    # The manifest keeps entries of files no longer deployed: they are still in the Space
+    manifest = json.dumps({"files": {**deployed, **local}}, indent=2, sort_keys=True).encode()
+    operations = [CommitOperationAdd(path_in_repo=path, path_or_fileobj=os.path.join(root, path))
+                  for path in changed]
+    operations.append(CommitOperationAdd(path_in_repo=MANIFEST_PATH, path_or_fileobj=manifest))
+    message = f"Deploy {len(changed)} changed file{'s' if len(changed) != 1 else ''}"
+    commit = with_retries(
+        lambda: api.create_commit(repo_id=repo_id, repo_type=REPO_TYPE, operations=operations,
+                                  commit_message=message, commit_description="\n".join(changed),
+                                  num_threads=DEPLOY_UPLOAD_THREADS),
+        retry_policy, "commit")
+    return Deployment(changed, unchanged, missing, commit.commit_url)
+
+
+def upload_to_huggingface(dry_run: bool = False, force: bool = False, repo_id: str = REPO_ID) -> Deployment:
+    deployment = deploy(HfApi(), repo_id, dry_run=dry_run, force=force)
+    for path in deployment.missing:
+        print(f"Warning: {path} not found")
+    for path in deployment.changed:
+        print(f"{'Would upload' if dry_run else 'Uploaded'} {path}")
+    print(f"{len(deployment.changed)} changed, {len(deployment.unchanged)} unchanged")
+    if deployment.commit_url:
+        print(f"Committed {deployment.commit_url}")
+    return deployment
+
 
 if __name__ == "__main__":
-    print("Starting upload to Hugging Face Space...")
-    upload_to_huggingface()
-    print("Upload complete!") 
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo-id", default=REPO_ID)
+    parser.add_argument("--dry-run", action="store_true", help="list the files that would be uploaded")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the manifest, e.g. after files were edited on the Hub (unchanged ones are "
+                             "still dropped from the commit by the Hub)")
+    args = parser.parse_args()
+    print("Starting deploy to Hugging Face Space...")
+    upload_to_huggingface(args.dry_run, args.force, args.repo_id)
+    print("Deploy complete!")